@@ -1,13 +1,35 @@
 import sys
 import os
 import json
-import requests
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
 
-# Avoid complex imports that might cause deadlocks
-import vnstock
-from feature_engineering import add_technical_indicators
+from data_source import get_data_source
+from feature_engineering import add_technical_indicators, add_horizon_targets, horizon_target_column
+from strategies import evaluate_strategies, BACKTEST_STRATEGIES
+
+# Giả định giữ lệnh 3 ngày sau khi có tín hiệu BUY
+HOLD_DAYS = 3
+
+
+def simulate_strategies(df, strategies=BACKTEST_STRATEGIES, hold_days=HOLD_DAYS):
+    """
+    Lợi nhuận (%) của từng lệnh BUY, mỗi chiến lược, trên các phiên của df (đã có chỉ báo)
+
+    Returns:
+        dict tên chiến lược -> np.ndarray lợi nhuận các lệnh
+    """
+    signals = evaluate_strategies(df, strategies)
+    # Lợi suất lấy từ cùng target horizon mà model nhiều horizon học (Target_3d)
+    targets = add_horizon_targets(df[['close']].copy(), (hold_days,))
+    returns = (targets[horizon_target_column(hold_days)] / targets['close'] - 1).to_numpy() * 100
+    profits = {}
+    for name, evaluated in signals.items():
+        buy = (evaluated['type'] == 'BUY') & np.isfinite(returns)
+        profits[name] = returns[buy]
+    return profits
+
 
 def backtest_strategy(symbol='VCB', days=100):
     print(f"🔍 Đang tiến hành Backtest cho {symbol} trong {days} ngày qua...")
@@ -15,8 +37,7 @@ def backtest_strategy(symbol='VCB', days=100):
     # 1. Lấy dữ liệu
     end_date = datetime.now().strftime('%Y-%m-%d')
     start_date = (datetime.now() - timedelta(days=days+60)).strftime('%Y-%m-%d')
-    quote = vnstock.Quote(symbol=symbol, source='VCI')
-    df = quote.history(start=start_date, end=end_date, interval='1D')
+    df = get_data_source().history(symbol, start_date, end_date, interval='1D')
     
     if df.empty:
         print("❌ Không có dữ liệu để backtest")
@@ -26,43 +47,8 @@ def backtest_strategy(symbol='VCB', days=100):
     df = add_technical_indicators(df)
     df = df.dropna()
     
-    # 3. Định nghĩa các chiến lược (Logic giống hệt SignalService trong NestJS)
-    strategies = {
-        'OPTIMIZED_BOUNCE': {
-            'signals': [], 'profits': [],
-            'check': lambda r: 'BUY' if r['RSI'] < 40 and r['MACD'] > r['MACD_signal'] and r['volume_ratio'] > 1.2 else 'HOLD'
-        },
-        'AI_TREND': { # Giả lập AI Trend dựa trên momentum thực tế (vì không backtrack được AI prediction từng ngày cũ)
-            'signals': [], 'profits': [],
-            'check': lambda r: 'BUY' if r['momentum_5d'] > 0.05 and r['volume_ratio'] > 1.3 else 'HOLD'
-        },
-        'VN_EXTREME_RSI': {
-            'signals': [], 'profits': [],
-            'check': lambda r: 'BUY' if r['RSI'] < 25 and r['volume_ratio'] > 1.5 else 'HOLD'
-        },
-        'SMART_BB_BREAKOUT': {
-            'signals': [], 'profits': [],
-            'check': lambda r: 'BUY' if r['close'] > r['BB_high'] and r['volume_ratio'] > 1.6 else 'HOLD'
-        },
-        'TREND_CONFIRMATION': {
-            'signals': [], 'profits': [],
-            'check': lambda r: 'BUY' if r['EMA_12'] > r['EMA_26'] and r['SMA20'] > r['SMA50'] else 'HOLD'
-        }
-    }
-
-    # 4. Chạy mô phỏng (Giả định giữ lệnh 3 ngày sau khi có tín hiệu BUY)
-    HOLD_DAYS = 3
-    for name, config in strategies.items():
-        for i in range(len(df) - HOLD_DAYS):
-            row = df.iloc[i]
-            signal = config['check'](row)
-            
-            if signal == 'BUY':
-                entry_price = df.iloc[i]['close']
-                exit_price = df.iloc[i + HOLD_DAYS]['close']
-                profit = ((exit_price - entry_price) / entry_price) * 100
-                config['signals'].append(signal)
-                config['profits'].append(profit)
+    # 3 + 4. Chiến lược (strategies.BACKTEST_STRATEGIES) và mô phỏng vector hoá
+    strategies = {name: {'profits': profits} for name, profits in simulate_strategies(df).items()}
 
     # 5. Prepare results
     results = {
@@ -73,7 +59,7 @@ def backtest_strategy(symbol='VCB', days=100):
     
     for name, config in strategies.items():
         profits = config['profits']
-        if not profits:
+        if len(profits) == 0:
             results['strategies'][name] = {
                 'trades': 0,
                 'win_rate': 0,
@@ -81,10 +67,10 @@ def backtest_strategy(symbol='VCB', days=100):
             }
             continue
             
-        win_rate = (len([p for p in profits if p > 0]) / len(profits)) * 100
-        avg_profit = sum(profits) / len(profits)
+        win_rate = float((profits > 0).mean() * 100)
+        avg_profit = float(profits.mean())
         results['strategies'][name] = {
-            'trades': len(profits),
+            'trades': int(len(profits)),
             'win_rate': round(win_rate, 2),
             'avg_profit': round(avg_profit, 2)
         }
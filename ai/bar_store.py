@@ -0,0 +1,222 @@
+"""
+Bar Store - lưu nến OHLCV (1m/5m/15m/1D) cục bộ trong SQLite
+- Append/upsert theo (symbol, interval, time), đọc theo khoảng thời gian
+- Chỉ fetch phần dữ liệu còn thiếu từ data source (vnstock / parquet / synthetic)
+- Downsample nến nhỏ thành nến lớn (1m -> 5m/15m/1D)
+"""
+
+import os
+import sys
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from trading_calendar import trading_days_between
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BAR_STORE_PATH = os.getenv('AI_BAR_STORE_PATH', os.path.join(CURRENT_DIR, 'cache', 'bars.db'))
+
+# interval -> (số giây mỗi nến, rule của pandas.resample)
+INTERVALS = {
+    '1m': (60, '1min'),
+    '5m': (5 * 60, '5min'),
+    '15m': (15 * 60, '15min'),
+    '1D': (24 * 3600, '1D'),
+}
+INTRADAY_INTERVALS = ('1m', '5m', '15m')
+
+BAR_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def _check_interval(interval):
+    if interval not in INTERVALS:
+        raise ValueError(f"Unsupported interval: {interval} (expected one of {', '.join(INTERVALS)})")
+
+
+def _to_epoch(times):
+    """datetime (giờ VN, naive) -> số giây, giữ nguyên giờ địa phương"""
+    return pd.to_datetime(times).to_numpy(dtype='datetime64[s]').astype(np.int64)
+
+
+def resample_bars(df, interval):
+    """
+    Gộp nến nhỏ thành nến lớn hơn (vd 1m -> 5m): open đầu, high max, low min, close cuối, volume cộng
+
+    Args:
+        df: DataFrame với columns time, open, high, low, close, volume
+        interval: '5m' / '15m' / '1D'
+    """
+    _check_interval(interval)
+    rule = INTERVALS[interval][1]
+    resampled = (
+        df.set_index('time')[BAR_COLUMNS[1:]]
+        .resample(rule, label='left', closed='left')
+        .agg({'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    )
+    # Bỏ các khung không có giao dịch (nghỉ trưa, ngoài phiên)
+    return resampled.dropna(subset=['close']).reset_index()
+
+
+class BarStore:
+    """
+    Kho nến OHLCV trên SQLite (WAL, một connection mỗi thread)
+    """
+
+    def __init__(self, path=BAR_STORE_PATH):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connect().executescript('''
+            CREATE TABLE IF NOT EXISTS bars (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                time INTEGER NOT NULL,
+                open REAL, high REAL, low REAL, close REAL, volume REAL,
+                PRIMARY KEY (symbol, interval, time)
+            ) WITHOUT ROWID;
+        ''')
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def append(self, symbol, interval, df):
+        """
+        Ghi (upsert) nến vào store; nến trùng time được ghi đè (nến đang chạy được cập nhật)
+
+        Returns:
+            Số nến đã ghi
+        """
+        _check_interval(interval)
+        if df is None or df.empty:
+            return 0
+        times = _to_epoch(df['time'])
+        values = df[BAR_COLUMNS[1:]].to_numpy(dtype=np.float64)
+        rows = [(symbol, interval, int(t), *map(float, v)) for t, v in zip(times, values)]
+        conn = self._connect()
+        with conn:
+            conn.executemany('INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+        return len(rows)
+
+    def append_bar(self, symbol, interval, time, open_, high, low, close, volume):
+        """Ghi một nến (dùng cho luồng realtime khi mỗi nến đóng)"""
+        conn = self._connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                         (symbol, interval, int(_to_epoch([time])[0]), open_, high, low, close, volume))
+
+    def read(self, symbol, interval, start=None, end=None, limit=None):
+        """
+        Đọc nến trong khoảng [start, end] (end tính hết ngày nếu chỉ có ngày)
+
+        Args:
+            limit: Chỉ lấy `limit` nến cuối cùng
+
+        Returns:
+            DataFrame columns time, open, high, low, close, volume (sắp xếp theo time)
+        """
+        _check_interval(interval)
+        query = 'SELECT time, open, high, low, close, volume FROM bars WHERE symbol = ? AND interval = ?'
+        params = [symbol, interval]
+        if start is not None:
+            query += ' AND time >= ?'
+            params.append(int(_to_epoch([start])[0]))
+        if end is not None:
+            end = pd.Timestamp(end)
+            if end == end.normalize():
+                end += pd.Timedelta(days=1) - pd.Timedelta(seconds=1)
+            query += ' AND time <= ?'
+            params.append(int(_to_epoch([end])[0]))
+        if limit is not None:
+            query = f'SELECT * FROM ({query} ORDER BY time DESC LIMIT ?) ORDER BY time'
+            params.append(int(limit))
+        else:
+            query += ' ORDER BY time'
+
+        rows = self._connect().execute(query, params).fetchall()
+        df = pd.DataFrame(rows, columns=BAR_COLUMNS)
+        df['time'] = pd.to_datetime(df['time'].astype(np.int64), unit='s')
+        return df
+
+    def time_range(self, symbol, interval):
+        """(first, last) time đã lưu, hoặc (None, None)"""
+        first, last = self._connect().execute(
+            'SELECT MIN(time), MAX(time) FROM bars WHERE symbol = ? AND interval = ?', (symbol, interval)
+        ).fetchone()
+        if first is None:
+            return None, None
+        return pd.Timestamp(first, unit='s'), pd.Timestamp(last, unit='s')
+
+    def downsample(self, symbol, source_interval, target_interval, start=None, end=None):
+        """
+        Tạo nến target_interval từ nến source_interval đã lưu (vd 1m -> 5m) và ghi vào store
+
+        Returns:
+            Số nến target đã ghi
+        """
+        if INTERVALS[target_interval][0] <= INTERVALS[source_interval][0]:
+            raise ValueError(f"Cannot downsample {source_interval} into {target_interval}")
+        df = self.read(symbol, source_interval, start, end)
+        if df.empty:
+            return 0
+        return self.append(symbol, target_interval, resample_bars(df, target_interval))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_bar_store():
+    """Bar store dùng chung cho cả process"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = BarStore()
+    return _store
+
+
+def fetch_bars(symbol, start_date, end_date, interval='1D', store=None):
+    """
+    Lấy nến từ store, chỉ fetch từ data source phần còn thiếu:
+    - trước nến đầu tiên đã lưu (nếu start_date sớm hơn)
+    - từ ngày của nến cuối cùng đã lưu tới end_date (nến cuối có thể chưa hoàn tất nên fetch lại)
+
+    Returns:
+        DataFrame columns time, open, high, low, close, volume
+    """
+    _check_interval(interval)
+    store = store or get_bar_store()
+    first, last = store.time_range(symbol, interval)
+
+    ranges = []
+    if first is None:
+        ranges.append((start_date, end_date))
+    else:
+        before = (first - pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        if pd.Timestamp(start_date) < first.normalize() and trading_days_between(start_date, before):
+            ranges.append((start_date, before))
+        if last.normalize() <= pd.Timestamp(end_date):
+            ranges.append((last.strftime('%Y-%m-%d'), end_date))
+
+    if ranges:
+        from data_source import get_data_source
+        source = get_data_source()
+        for fetch_start, fetch_end in ranges:
+            df = source.history(symbol, fetch_start, fetch_end, interval=interval)
+            written = store.append(symbol, interval, df)
+            log(f"   ✓ Stored {written} {interval} bars for {symbol} ({fetch_start} → {fetch_end})")
+
+    return store.read(symbol, interval, start_date, end_date)
@@ -0,0 +1,107 @@
+"""
+Benchmark bộ nhớ: DataFrame float64 (cách cũ) vs FeatureMatrix float32
+Dữ liệu OHLCV tổng hợp (không cần mạng), nhiều mã x nhiều năm
+
+Usage:
+    python benchmark_feature_matrix.py [n_symbols] [n_years]
+"""
+
+import sys
+import time
+import tracemalloc
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+import pandas as pd
+
+from feature_engineering import add_technical_indicators, get_feature_columns, build_feature_matrix
+from feature_matrix import FeatureMatrix
+
+TRADING_DAYS_PER_YEAR = 250
+
+
+def synthetic_ohlcv(n_bars, seed):
+    """OHLCV tổng hợp theo random walk (log-normal)"""
+    rng = np.random.default_rng(seed)
+    close = 50000 * np.exp(np.cumsum(rng.normal(0, 0.015, n_bars)))
+    spread = np.abs(rng.normal(0, 0.01, n_bars))
+    return pd.DataFrame({
+        'time': pd.bdate_range('2015-01-01', periods=n_bars),
+        'open': close * (1 + rng.normal(0, 0.005, n_bars)),
+        'high': close * (1 + spread),
+        'low': close * (1 - spread),
+        'close': close,
+        'volume': rng.integers(100_000, 5_000_000, n_bars).astype(float),
+    })
+
+
+def add_static_features(df):
+    """Giả lập các cột ratios / macro / sentiment của prepare_features"""
+    for col, value in [('EPS', 5000.0), ('PE', 12.0), ('PB', 1.8), ('ROE', 0.2), ('ROA', 0.02),
+                       ('USD_VND', 25400.0), ('news_sentiment', 0.5)]:
+        df[col] = value
+    df['VNINDEX'] = df['close'].rolling(5, min_periods=1).mean()
+    df['Target'] = df['close'].shift(-1)
+    return df
+
+
+def build_legacy(raw_frames):
+    """Cách cũ: copy trong add_technical_indicators, dropna, df[cols], pd.concat, .values float64"""
+    frames = []
+    for raw in raw_frames:
+        df = add_static_features(add_technical_indicators(raw))
+        frames.append(df.dropna())
+    panel = pd.concat(frames, ignore_index=True)
+    feature_cols = get_feature_columns(panel)
+    X = panel[feature_cols].values
+    y = panel['Target'].values
+    return X, y
+
+
+def build_feature_matrix_path(raw_frames):
+    """Cách mới: chỉ báo ghi tại chỗ, mỗi mã -> buffer float32, stack một lần"""
+    matrices = []
+    for raw in raw_frames:
+        df = add_static_features(add_technical_indicators(raw, copy=False)).dropna()
+        matrices.append(build_feature_matrix(df, get_feature_columns(df)))
+    return FeatureMatrix.stack(matrices)
+
+
+def measure(fn, n_symbols, n_bars):
+    raw_frames = [synthetic_ohlcv(n_bars, seed) for seed in range(n_symbols)]
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    result = fn(raw_frames)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak, elapsed
+
+
+def run_benchmark(n_symbols=20, n_years=5):
+    n_bars = n_years * TRADING_DAYS_PER_YEAR
+    print(f"📏 Memory benchmark: {n_symbols} symbols x {n_years} years ({n_bars} bars/symbol)")
+
+    results = {}
+    for name, fn in [('DataFrame float64', build_legacy), ('FeatureMatrix float32', build_feature_matrix_path)]:
+        peak, elapsed = measure(fn, n_symbols, n_bars)
+        results[name] = (peak, elapsed)
+
+    print(f"   {'Path':<24} {'Peak (MB)':<12} {'Time (s)':<10}")
+    print(f"   {'-'*46}")
+    for name, (peak, elapsed) in results.items():
+        print(f"   {name:<24} {peak / 1e6:<12.1f} {elapsed:<10.3f}")
+
+    legacy_peak = results['DataFrame float64'][0]
+    new_peak = results['FeatureMatrix float32'][0]
+    print(f"\n   💡 Peak memory reduced by {(1 - new_peak / legacy_peak) * 100:.1f}%")
+    return results
+
+
+if __name__ == "__main__":
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    n_years = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    run_benchmark(n_symbols, n_years)
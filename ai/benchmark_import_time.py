@@ -0,0 +1,162 @@
+"""
+Benchmark import time / cold start - giữ các entry point khởi động nhanh
+
+- Import: chạy `python -X importtime -c "import <module>"` trong process mới, lấy thời gian
+  cumulative của module (gồm mọi module nó kéo theo) và so với ngân sách (ms)
+- Cold start: thời gian wall-clock của cả lệnh CLI (process mới, AI_DATA_SOURCE=synthetic,
+  cache / model trong thư mục tạm; news_worker đọc sentiment đã seed sẵn trong cache)
+
+Mỗi mục đo REPEAT lần và lấy min (bỏ nhiễu của máy); module thiếu dependency (vd pika) được bỏ qua.
+Khi một mục vượt ngân sách, in 10 module con tốn thời gian nhất để biết import nặng nào bị kéo vào.
+
+Usage:
+    python benchmark_import_time.py            # in bảng kết quả
+    python benchmark_import_time.py --check    # exit 1 nếu có mục vượt ngân sách
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_ROOT = os.path.dirname(CURRENT_DIR)
+REPEAT = 5
+
+# module -> ngân sách import (ms, cumulative); numpy ~100ms, pandas ~500ms, xgboost ~2s
+IMPORT_BUDGETS_MS = {
+    'predict': 150,
+    'news_scraper': 60,
+    'worker_service': 200,
+    'tiered_cache': 50,
+    'instrumentation': 30,
+    'profiling': 30,
+    'trading_calendar': 30,
+}
+
+# tên -> (script, args, ngân sách wall-clock ms)
+COLD_START_BUDGETS_MS = {
+    'worker.py MARKET': ('backend/src/worker/worker.py', ['MARKET'], 2500),
+    'news_worker.py VCB (cached)': ('backend/src/worker/news_worker.py', ['VCB'], 600),
+}
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def parse_importtime(stderr):
+    """
+    Returns:
+        list (module, self_us, cumulative_us, depth) theo thứ tự trong output của -X importtime
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return rows
+
+
+def measure_import(module, env):
+    """
+    Returns:
+        (cumulative ms nhỏ nhất, top module con của lần đo đó) hoặc None nếu import lỗi
+    """
+    best = None
+    for _ in range(REPEAT):
+        process = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                                 cwd=CURRENT_DIR, env=env, capture_output=True, text=True)
+        if process.returncode != 0:
+            return None
+        rows = parse_importtime(process.stderr)
+        total = next(cumulative for name, _, cumulative, depth in reversed(rows) if name == module and depth == 0)
+        if best is None or total < best[0]:
+            best = (total, sorted(rows, key=lambda row: row[1], reverse=True)[:10])
+    return best[0] / 1000, best[1]
+
+
+def measure_cold_start(script, args, env):
+    """Returns: wall-clock ms nhỏ nhất của lệnh (None nếu lệnh lỗi)"""
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        process = subprocess.run([sys.executable, os.path.join(PROJECT_ROOT, script)] + args,
+                                 cwd=PROJECT_ROOT, env=env, capture_output=True, text=True)
+        elapsed = (time.perf_counter() - start) * 1000
+        if process.returncode != 0 or '"error"' in process.stdout:
+            return None
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def make_env(workdir):
+    env = dict(os.environ)
+    env.update({
+        'AI_CACHE_PATH': os.path.join(workdir, 'cache.db'),
+        'AI_BAR_STORE_PATH': os.path.join(workdir, 'bars.db'),
+        'AI_MONITOR_PATH': os.path.join(workdir, 'monitor.db'),
+        'AI_MODELS_DIR': os.path.join(workdir, 'models'),
+        'AI_PREDICTION_LOG': '0',
+        'AI_PROFILE_EVERY': '0',
+        'AI_DATA_SOURCE': 'synthetic',
+    })
+    return env
+
+
+def seed_sentiment(env, symbol='VCB'):
+    """Ghi sẵn sentiment vào cache của workdir để news_worker không phải scrape qua mạng"""
+    code = ("from tiered_cache import get_cache; "
+            f"get_cache().set('sentiment', '{symbol}', "
+            f"{{'symbol': '{symbol}', 'sentiment': 0.5, 'timestamp': '', 'headlines': []}})")
+    subprocess.run([sys.executable, '-c', code], cwd=CURRENT_DIR, env=env, check=True)
+
+
+def main(argv):
+    workdir = tempfile.mkdtemp(prefix='ai-import-time-')
+    env = make_env(workdir)
+    results, over_budget = [], []
+    try:
+        # Lần chạy đầu compile .pyc - không tính
+        subprocess.run([sys.executable, '-c', 'import predict, news_scraper'], cwd=CURRENT_DIR, env=env,
+                       capture_output=True)
+        seed_sentiment(env)
+
+        print(f"{'entry':<32} {'ms':>9} {'budget':>8}")
+        for module, budget in IMPORT_BUDGETS_MS.items():
+            measured = measure_import(module, env)
+            if measured is None:
+                print(f"{'import ' + module:<32} {'skipped (import failed)':>18}")
+                continue
+            elapsed, top = measured
+            results.append({'entry': f'import {module}', 'ms': round(elapsed, 1), 'budget_ms': budget})
+            flag = '' if elapsed <= budget else '  ❌ over budget'
+            print(f"{'import ' + module:<32} {elapsed:>9.1f} {budget:>8}{flag}")
+            if flag:
+                over_budget.append(module)
+                for name, self_us, _, _ in top:
+                    print(f"      {self_us / 1000:>8.1f} ms  {name}")
+
+        for entry, (script, args, budget) in COLD_START_BUDGETS_MS.items():
+            elapsed = measure_cold_start(script, args, env)
+            if elapsed is None:
+                print(f"{entry:<32} {'skipped (command failed)':>18}")
+                continue
+            results.append({'entry': entry, 'ms': round(elapsed, 1), 'budget_ms': budget})
+            flag = '' if elapsed <= budget else '  ❌ over budget'
+            print(f"{entry:<32} {elapsed:>9.1f} {budget:>8}{flag}")
+            if flag:
+                over_budget.append(entry)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if '--json' in argv:
+        print(json.dumps(results, indent=2))
+    return 1 if over_budget and '--check' in argv else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
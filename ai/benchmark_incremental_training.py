@@ -0,0 +1,105 @@
+"""
+Benchmark: retrain hằng đêm cho cả universe - full refit vs boost tiếp (warm start)
+Dữ liệu OHLCV tổng hợp (không cần mạng). Mỗi "đêm" có thêm một phiên mới:
+- Full refit: tính features trên toàn bộ lịch sử + fit XGBoost từ đầu
+- Incremental: tính features trên cửa sổ gần nhất + boost thêm INCREMENTAL_ROUNDS cây trên phiên mới
+  + INCREMENTAL_REPLAY phiên cũ; full refit sau MAX_INCREMENTAL_UPDATES lần (giống incremental_update)
+So sánh thời gian mỗi đêm, MAE walk-forward (dự đoán phiên kế tiếp chưa được train), độ lệch so với
+dự đoán của full refit cùng đêm và số cây của booster
+
+Usage:
+    python benchmark_incremental_training.py [n_symbols] [nights] [n_years]
+"""
+
+import sys
+import time
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+
+from benchmark_feature_matrix import synthetic_ohlcv, add_static_features, TRADING_DAYS_PER_YEAR
+from feature_engineering import add_technical_indicators, get_feature_columns, build_feature_matrix, get_warmup_bars
+from model_training_advanced import (
+    continue_booster, incremental_rows, XGB_PARAMS,
+    INCREMENTAL_ROUNDS, INCREMENTAL_REPLAY, INCREMENTAL_WINDOW, MAX_INCREMENTAL_UPDATES
+)
+
+
+def features(raw):
+    """Features + Target như prepare_features (dòng cuối giữ lại với Target = NaN)"""
+    df = add_static_features(add_technical_indicators(raw))
+    df = df.dropna(subset=[col for col in df.columns if col != 'Target'])
+    return build_feature_matrix(df, get_feature_columns(df))
+
+
+def full_fit(X):
+    import xgboost as xgb
+    return xgb.XGBRegressor(**XGB_PARAMS).fit(X.values, X.target)
+
+
+def run_benchmark(n_symbols=10, nights=20, n_years=2):
+    n_initial = n_years * TRADING_DAYS_PER_YEAR
+    lookback = INCREMENTAL_WINDOW + get_warmup_bars() + 1
+    print(f"🔁 Incremental retraining benchmark ({n_symbols} symbols, {nights} nights, {n_years} years history, "
+          f"+{INCREMENTAL_ROUNDS} trees on new bars + {INCREMENTAL_REPLAY} replayed, "
+          f"full refit every {MAX_INCREMENTAL_UPDATES + 1} nights)")
+
+    times = {'full': 0.0, 'incremental': 0.0}
+    errors = {'full': [], 'incremental': []}
+    gaps = []  # |dự đoán incremental - dự đoán full refit| cùng đêm
+    trees = []
+    for seed in range(n_symbols):
+        raw = synthetic_ohlcv(n_initial + nights + 1, seed)
+        X = features(raw.iloc[:n_initial])
+        booster = full_fit(X.slice_rows(slice(0, -1))).get_booster()
+        updates = 0
+
+        for night in range(nights):
+            end = n_initial + night + 1  # có thêm một phiên mới
+            actual = raw['close'].iloc[end]  # giá phiên kế tiếp (chưa train)
+
+            start = time.perf_counter()
+            X = features(raw.iloc[:end])
+            model = full_fit(X.slice_rows(slice(0, -1)))
+            times['full'] += time.perf_counter() - start
+            full_prediction = model.predict(X.values[-1:])[0]
+            errors['full'].append(abs(full_prediction - actual))
+
+            start = time.perf_counter()
+            if updates >= MAX_INCREMENTAL_UPDATES:
+                X = features(raw.iloc[:end])
+                booster = full_fit(X.slice_rows(slice(0, -1))).get_booster()
+                updates = 0
+            else:
+                X = features(raw.iloc[max(0, end - lookback):end])
+                # Dòng cuối là phiên hôm nay (chưa có Target), phiên mới có Target là dòng áp chót
+                update = X.slice_rows(incremental_rows([len(X) - 2]))
+                booster = continue_booster(booster, update.values, update.target)
+                updates += 1
+            times['incremental'] += time.perf_counter() - start
+            prediction = booster.inplace_predict(X.values[-1:])[0]
+            errors['incremental'].append(abs(prediction - actual))
+            gaps.append(abs(prediction - full_prediction))
+            trees.append(booster.num_boosted_rounds())
+
+    print(f"\n   {'Mode':<13} {'Per night (s)':<15} {'Per symbol (ms)':<17} {'Walk-forward MAE':<17}")
+    print(f"   {'-'*62}")
+    for mode in times:
+        per_night = times[mode] / nights
+        print(f"   {mode:<13} {per_night:<15.3f} {per_night / n_symbols * 1000:<17.1f} "
+              f"{np.mean(errors[mode]):<17,.1f}")
+    speedup = times['full'] / times['incremental']
+    mae_change = (np.mean(errors['incremental']) / np.mean(errors['full']) - 1) * 100
+    print(f"\n   Mean |incremental - full refit| prediction: {np.mean(gaps):,.1f} "
+          f"({np.mean(gaps) / np.mean(errors['full']) * 100:.0f}% of full refit MAE)")
+    print(f"   Trees per booster: mean {np.mean(trees):.0f}, max {max(trees)} (full fit: {XGB_PARAMS['n_estimators']})")
+    print(f"\n   💡 Incremental is {speedup:.1f}x faster per night, MAE {mae_change:+.1f}% vs full refit")
+    return times, errors
+
+
+if __name__ == "__main__":
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    nights = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    n_years = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    run_benchmark(n_symbols, nights, n_years)
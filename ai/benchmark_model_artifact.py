@@ -0,0 +1,137 @@
+"""
+Benchmark: joblib pickle vs model artifact (XGBoost native UBJ + manifest)
+So sánh dung lượng file, thời gian load (cold process và in-process)
+
+Usage:
+    python benchmark_model_artifact.py [n_rows]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import subprocess
+import warnings
+warnings.filterwarnings('ignore')
+
+import numpy as np
+
+import model_artifact
+from model_artifact import save_artifact, load_artifact
+
+N_FEATURES = 30
+REPEATS = 5
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def train_models(n_rows):
+    """XGBoost + Linear Regression trên dữ liệu tổng hợp (float32)"""
+    import xgboost as xgb
+    from sklearn.linear_model import LinearRegression
+
+    rng = np.random.default_rng(42)
+    X = rng.normal(size=(n_rows, N_FEATURES)).astype(np.float32)
+    y = X @ rng.normal(size=N_FEATURES) + rng.normal(scale=0.1, size=n_rows)
+    advanced = xgb.XGBRegressor(n_estimators=100, max_depth=6, learning_rate=0.05, n_jobs=-1, verbosity=0)
+    advanced.fit(X, y)
+    simple = LinearRegression().fit(X, y)
+    return advanced, simple, X
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def cold_load_seconds(code):
+    """Thời gian chạy một process Python mới chỉ để load + predict 1 dòng"""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], check=True, cwd=CURRENT_DIR)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def warm_load_seconds(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run_benchmark(n_rows=5000):
+    import joblib
+
+    print(f"📦 Model artifact benchmark ({n_rows} rows x {N_FEATURES} features)")
+    advanced, simple, X = train_models(n_rows)
+    features = [f'f{i}' for i in range(N_FEATURES)]
+
+    workdir = tempfile.mkdtemp()
+    try:
+        # 1. joblib pickle (cách cũ: 3 file)
+        pickle_dir = os.path.join(workdir, 'pickle')
+        os.makedirs(pickle_dir)
+        joblib.dump(advanced, os.path.join(pickle_dir, 'model_X_advanced.pkl'))
+        joblib.dump(simple, os.path.join(pickle_dir, 'model_X_simple.pkl'))
+        joblib.dump(features, os.path.join(pickle_dir, 'features_X.pkl'))
+
+        # 2. Artifact (một thư mục có version)
+        artifact_path = os.path.join(workdir, 'artifact')
+        save_artifact(artifact_path, {'advanced': advanced, 'simple': simple}, features,
+                      metadata={'symbol': 'X'}, metrics={})
+
+        # Kết quả dự đoán phải giống hệt nhau
+        artifact = load_artifact(artifact_path)
+        diff = np.max(np.abs(artifact.get_model('advanced').predict(X) - advanced.predict(X)))
+        diff_lr = np.max(np.abs(artifact.get_model('simple').predict(X) - simple.predict(X)))
+
+        def load_pickle():
+            m = joblib.load(os.path.join(pickle_dir, 'model_X_advanced.pkl'))
+            joblib.load(os.path.join(pickle_dir, 'features_X.pkl'))
+            m.predict(X[:1])
+
+        def load_new():
+            # Bỏ cache theo mtime của load_artifact để đo thời gian load từ đĩa
+            model_artifact._artifacts.clear()
+            load_artifact(artifact_path).get_model('advanced').predict(X[:1])
+
+        pickle_code = (
+            "import joblib, numpy as np;"
+            f"m = joblib.load({os.path.join(pickle_dir, 'model_X_advanced.pkl')!r});"
+            f"joblib.load({os.path.join(pickle_dir, 'features_X.pkl')!r});"
+            f"m.predict(np.zeros((1, {N_FEATURES}), dtype=np.float32))"
+        )
+        artifact_code = (
+            "import numpy as np; from model_artifact import load_artifact;"
+            f"a = load_artifact({artifact_path!r});"
+            f"a.get_model('advanced').predict(np.zeros((1, {N_FEATURES}), dtype=np.float32))"
+        )
+        manifest_code = (
+            "from model_artifact import read_manifest;"
+            f"read_manifest({artifact_path!r})"
+        )
+
+        results = {
+            'joblib': (dir_size(pickle_dir), warm_load_seconds(load_pickle), cold_load_seconds(pickle_code)),
+            'artifact': (dir_size(artifact_path), warm_load_seconds(load_new), cold_load_seconds(artifact_code)),
+        }
+        manifest_cold = cold_load_seconds(manifest_code)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"   {'Format':<10} {'Size (KB)':<12} {'Load (ms)':<12} {'Cold process (ms)':<18}")
+    print(f"   {'-'*54}")
+    for name, (size, warm, cold) in results.items():
+        print(f"   {name:<10} {size / 1024:<12,.1f} {warm * 1000:<12.2f} {cold * 1000:<18.0f}")
+    print(f"\n   Metadata only (manifest.json, cold process): {manifest_cold * 1000:.0f} ms")
+    print(f"   Max prediction diff: advanced {diff:.2e}, simple {diff_lr:.2e}")
+    return results
+
+
+if __name__ == "__main__":
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    run_benchmark(n_rows)
@@ -0,0 +1,70 @@
+"""
+Benchmark: screener vector hoá trên panel chỉ báo vs duyệt từng mã bằng lambda
+(cách backtest_strategies đang làm) cho toàn thị trường
+
+Usage:
+    python benchmark_screener.py [n_symbols]
+"""
+
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from screener import IndicatorPanel, PANEL_COLUMNS, screen
+
+REPEATS = 200
+EXPRESSION = "RSI < 30 and volume_ratio > 1.5 or (close > BB_high and MACD > MACD_signal)"
+
+
+def build_panel(n_symbols, seed=42):
+    """Panel tổng hợp: giá trị chỉ báo ngẫu nhiên trong khoảng hợp lý"""
+    rng = np.random.default_rng(seed)
+    panel = IndicatorPanel()
+    for i in range(n_symbols):
+        close = rng.uniform(5_000, 150_000)
+        values = {name: close * rng.uniform(0.9, 1.1) for name in PANEL_COLUMNS}
+        values.update({
+            'RSI': rng.uniform(0, 100),
+            'volume_ratio': rng.lognormal(0, 0.5),
+            'MACD': rng.normal(0, 500),
+            'MACD_signal': rng.normal(0, 500),
+            'close': close,
+        })
+        panel.update(f'S{i:04d}', values, '2026-01-02')
+    return panel
+
+
+def timed(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, np.median(timings) * 1000, np.percentile(timings, 99) * 1000
+
+
+def run_benchmark(n_symbols=1500):
+    print(f"🔎 Screener benchmark ({n_symbols} symbols, {len(PANEL_COLUMNS)} columns)")
+    print(f"   Filter: {EXPRESSION}")
+    panel = build_panel(n_symbols)
+
+    # Cách cũ: DataFrame + lambda cho từng dòng
+    df = pd.DataFrame(panel.table(), index=panel.symbols)
+    check = lambda r: (r['RSI'] < 30 and r['volume_ratio'] > 1.5) or (r['close'] > r['BB_high'] and r['MACD'] > r['MACD_signal'])
+    rowwise, rowwise_ms, rowwise_p99 = timed(lambda: [s for s, r in df.iterrows() if check(r)])
+
+    vectorized, vector_ms, vector_p99 = timed(lambda: screen(panel, EXPRESSION, sort='-volume_ratio', limit=n_symbols))
+
+    assert sorted(m['symbol'] for m in vectorized['matches']) == sorted(rowwise)
+    print(f"\n   {'Method':<22} {'Median (ms)':<14} {'P99 (ms)':<10}")
+    print(f"   {'-'*46}")
+    print(f"   {'Row-wise lambda':<22} {rowwise_ms:<14.2f} {rowwise_p99:<10.2f}")
+    print(f"   {'Vectorized screen':<22} {vector_ms:<14.3f} {vector_p99:<10.3f}")
+    print(f"\n   Matches: {vectorized['total']} ({rowwise_ms / vector_ms:.0f}x faster, ranked + serialized)")
+
+
+if __name__ == '__main__':
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 1500
+    run_benchmark(n_symbols)
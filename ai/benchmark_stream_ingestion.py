@@ -0,0 +1,83 @@
+"""
+Benchmark: replay luồng tick của toàn bộ HOSE (~400 mã) qua IngestionService trên một core
+Đo throughput (ticks/s) khi replay từ file CSV và từ bộ nhớ, so với tốc độ đỉnh cần đáp ứng
+
+Usage:
+    python benchmark_stream_ingestion.py [n_symbols] [ticks_per_second] [minutes]
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+
+import numpy as np
+
+from stream_ingestion import IngestionService, FileReplaySource, LocalPublisher, Tick
+
+# Tốc độ khớp lệnh đỉnh của HOSE ước lượng (tick/s cho cả sàn)
+PEAK_TICKS_PER_SECOND = 5000
+SESSION_START = 9 * 3600  # 9:00, tính từ nửa đêm
+
+
+def generate_ticks(n_symbols, ticks_per_second, minutes, seed=42):
+    """Tick tổng hợp: giá random walk cho mỗi mã, mã được chọn ngẫu nhiên cho mỗi tick"""
+    rng = np.random.default_rng(seed)
+    n_ticks = int(ticks_per_second * minutes * 60)
+    day = 1_760_000_000 // 86400 * 86400
+    times = day + SESSION_START + np.sort(rng.uniform(0, minutes * 60, n_ticks))
+    symbol_idx = rng.integers(0, n_symbols, n_ticks)
+    base = rng.uniform(10_000, 100_000, n_symbols)
+    steps = rng.normal(0, 0.0005, n_ticks)
+    prices = np.round(base[symbol_idx] * np.exp(steps), -1)
+    volumes = rng.integers(1, 100, n_ticks) * 100
+    symbols = [f'S{i:03d}' for i in range(n_symbols)]
+    return [Tick(symbols[s], float(t), float(p), float(v))
+            for s, t, p, v in zip(symbol_idx, times, prices, volumes)]
+
+
+def write_csv(ticks, path):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('time,symbol,price,volume\n')
+        for tick in ticks:
+            f.write(f'{tick.time:.3f},{tick.symbol},{tick.price:.0f},{tick.volume:.0f}\n')
+
+
+def run_benchmark(n_symbols=400, ticks_per_second=PEAK_TICKS_PER_SECOND, minutes=30):
+    print(f"📡 Stream ingestion benchmark ({n_symbols} symbols, {ticks_per_second:,} ticks/s, "
+          f"{minutes} min session)")
+    ticks = generate_ticks(n_symbols, ticks_per_second, minutes)
+
+    workdir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(workdir, 'ticks.csv')
+        write_csv(ticks, path)
+
+        results = {}
+        for name, source in [('memory', ticks), ('csv replay', FileReplaySource(path))]:
+            publisher = LocalPublisher()
+            received = []
+            publisher.subscribe(lambda topic, snapshot: received.append(topic))
+            service = IngestionService(interval='1m', publisher=publisher)
+            stats = service.run(source)
+            stats['snapshots'] = publisher.published
+            results[name] = stats
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print(f"\n   {'Source':<12} {'Ticks':<12} {'Bars':<8} {'Snapshots':<11} {'Seconds':<9} {'Ticks/s':<12} {'Headroom':<9}")
+    print(f"   {'-'*76}")
+    for name, stats in results.items():
+        headroom = stats['ticks_per_second'] / ticks_per_second
+        print(f"   {name:<12} {stats['ticks']:<12,} {stats['bars']:<8,} {stats['snapshots']:<11,} "
+              f"{stats['seconds']:<9.2f} {stats['ticks_per_second']:<12,} {headroom:.1f}x")
+    print(f"\n   Per tick: {results['memory']['seconds'] / results['memory']['ticks'] * 1e6:.2f} µs "
+          f"(gồm đóng nến, cập nhật chỉ báo và publish snapshot)")
+    return results
+
+
+if __name__ == '__main__':
+    n_symbols = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    rate = int(sys.argv[2]) if len(sys.argv) > 2 else PEAK_TICKS_PER_SECOND
+    minutes = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+    run_benchmark(n_symbols, rate, minutes)
@@ -0,0 +1,284 @@
+"""
+Benchmark suite cho pipeline AI - offline, lưu baseline JSON và so sánh regression
+
+Dữ liệu lấy qua data_source: mặc định AI_DATA_SOURCE=synthetic (OHLCV tổng hợp xác định), hoặc fixture Parquet
+ghi sẵn bằng `data_source.py --record` (--fixtures DIR). Toàn bộ cache / model / monitor ghi vào một thư mục tạm,
+nên kết quả lặp lại được và không đụng dữ liệu thật.
+
+Cases:
+    technical_indicators[bars=...]   add_technical_indicators
+    prepare_features[bars=...]       prepare_features (ratios / macro / sentiment từ cache đã seed sẵn)
+    train_model[...]                 train_model xgboost / gradient_boosting / linear_regression
+    backtest_strategy[days=...]      backtest_strategy
+    get_prediction_data[cold|warm]   cache miss (fetch + features + predict) / cache hit
+    sentiment_score[headlines=...]   analyze_sentiment_vietnamese (bỏ qua nếu thiếu textblob)
+
+Usage:
+    python benchmark_suite.py                    # chạy + so sánh với baseline
+    python benchmark_suite.py --filter predict   # chỉ các case có tên chứa 'predict'
+    python benchmark_suite.py --save             # ghi kết quả làm baseline mới
+    python benchmark_suite.py --check            # exit 1 nếu có case chậm hơn baseline quá ngưỡng
+    python benchmark_suite.py --quick --threshold 0.25 --baseline path.json --output run.json
+    python benchmark_suite.py --fixtures ai/data   # dùng fixture Parquet thay cho dữ liệu tổng hợp
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import tempfile
+import platform
+import statistics
+import warnings
+from contextlib import redirect_stdout, redirect_stderr
+from datetime import datetime
+warnings.filterwarnings('ignore')
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(CURRENT_DIR, 'benchmarks', 'baseline.json')
+# Chậm hơn baseline quá ngưỡng này (tỷ lệ) -> regression
+REGRESSION_THRESHOLD = 0.15
+SYMBOL = 'VCB'
+
+# Cache / model / monitor của benchmark nằm trong thư mục tạm (phải set trước khi import các module AI)
+WORKDIR = tempfile.mkdtemp(prefix='ai-benchmark-')
+os.environ.update({
+    'AI_CACHE_PATH': os.path.join(WORKDIR, 'cache.db'),
+    'AI_BAR_STORE_PATH': os.path.join(WORKDIR, 'bars.db'),
+    'AI_MONITOR_PATH': os.path.join(WORKDIR, 'monitor.db'),
+    'AI_MODELS_DIR': os.path.join(WORKDIR, 'models'),
+    'AI_PREDICTION_LOG': '0',
+    'AI_PROFILE_EVERY': '0',
+    'AI_MODEL_MODE': 'symbol',
+    'AI_DATA_SOURCE': 'parquet' if '--fixtures' in sys.argv else 'synthetic',
+})
+if '--fixtures' in sys.argv:
+    os.environ['AI_DATA_DIR'] = os.path.abspath(sys.argv[sys.argv.index('--fixtures') + 1])
+
+from data_source import get_data_source
+from benchmark_feature_matrix import synthetic_ohlcv
+
+
+def measure(func, repeat, before=None):
+    """
+    Chạy func một lần warmup rồi `repeat` lần
+
+    Args:
+        before: Hàm chạy trước mỗi lần đo (không tính giờ), vd xoá cache cho case cold
+    """
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        if before:
+            before()
+        func()
+        times = []
+        for _ in range(repeat):
+            if before:
+                before()
+            start = time.perf_counter()
+            func()
+            times.append(time.perf_counter() - start)
+    return {
+        'median_ms': round(statistics.median(times) * 1000, 3),
+        'min_ms': round(min(times) * 1000, 3),
+        'max_ms': round(max(times) * 1000, 3),
+        'repeat': repeat,
+    }
+
+
+def _seed_offline_caches():
+    """Tỷ giá + sentiment trong cache để prepare_features không gọi API / scrape tin"""
+    from tiered_cache import get_cache
+    cache = get_cache()
+    cache.set('fx', 'USD_VND', {'rate': 25400, 'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+    cache.set('sentiment', SYMBOL, {'symbol': SYMBOL, 'sentiment': 0.5,
+                                    'timestamp': datetime.now().isoformat(), 'headlines': []})
+
+
+def _history(bars):
+    df = get_data_source().history(SYMBOL, '2000-01-01', datetime.now().strftime('%Y-%m-%d'))
+    return df.tail(bars).reset_index(drop=True)
+
+
+def _date_range(df):
+    return df['time'].iloc[0].strftime('%Y-%m-%d'), df['time'].iloc[-1].strftime('%Y-%m-%d')
+
+
+def case_technical_indicators(bars):
+    from feature_engineering import add_technical_indicators
+    raw = synthetic_ohlcv(bars, seed=0)
+    return {'func': lambda: add_technical_indicators(raw)}
+
+
+def case_prepare_features(bars):
+    from feature_engineering import prepare_features
+    raw = _history(bars)
+    start_date, end_date = _date_range(raw)
+    return {'func': lambda: prepare_features(raw, SYMBOL, start_date, end_date)}
+
+
+def case_train_model(model_type, bars=1000):
+    from feature_engineering import prepare_features, get_feature_columns, build_feature_matrix
+    from model_training_advanced import train_model
+    raw = _history(bars)
+    start_date, end_date = _date_range(raw)
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        df = prepare_features(raw, SYMBOL, start_date, end_date)
+    X = build_feature_matrix(df, get_feature_columns(df))
+    return {'func': lambda: train_model(X, model_type=model_type)}
+
+
+def case_backtest_strategy(days):
+    from backtest_strategies import backtest_strategy
+    return {'func': lambda: backtest_strategy(SYMBOL, days)}
+
+
+_model_trained = False
+
+
+def case_get_prediction_data(cache_state):
+    global _model_trained
+    from predict import get_prediction_data
+    from tiered_cache import get_cache
+    if not _model_trained:
+        from model_training_advanced import train_and_save_model
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+            train_and_save_model(SYMBOL)
+        _model_trained = True
+    case = {'func': lambda: get_prediction_data(SYMBOL)}
+    if cache_state == 'cold':
+        case['before'] = lambda: get_cache().delete('prediction', SYMBOL)
+    return case
+
+
+def case_sentiment_score(headlines):
+    try:
+        import textblob  # noqa: F401
+    except ImportError:
+        return {'skip': 'textblob not installed'}
+    import news_scraper
+    texts = [f"Cổ phiếu {SYMBOL} tăng mạnh nhờ lợi nhuận quý {i % 4 + 1} vượt kỳ vọng" if i % 2 else
+             f"{SYMBOL} giảm sàn, nhà đầu tư lo ngại nợ xấu tăng" for i in range(headlines)]
+    # Không dịch qua mạng: chỉ đo phần chấm điểm
+    return {'func': lambda: [news_scraper.analyze_sentiment_vietnamese(text, translate=False) for text in texts]}
+
+
+# (tên case, hàm setup, tham số, số lần đo)
+CASES = [
+    ('technical_indicators[bars=500]', case_technical_indicators, (500,), 20),
+    ('technical_indicators[bars=2500]', case_technical_indicators, (2500,), 10),
+    ('technical_indicators[bars=10000]', case_technical_indicators, (10000,), 5),
+    ('prepare_features[bars=500]', case_prepare_features, (500,), 10),
+    ('prepare_features[bars=2500]', case_prepare_features, (2500,), 5),
+    ('train_model[xgboost]', case_train_model, ('xgboost',), 3),
+    ('train_model[gradient_boosting]', case_train_model, ('gradient_boosting',), 3),
+    ('train_model[linear_regression]', case_train_model, ('linear_regression',), 5),
+    ('backtest_strategy[days=100]', case_backtest_strategy, (100,), 10),
+    ('backtest_strategy[days=500]', case_backtest_strategy, (500,), 5),
+    ('get_prediction_data[cold]', case_get_prediction_data, ('cold',), 5),
+    ('get_prediction_data[warm]', case_get_prediction_data, ('warm',), 50),
+    ('sentiment_score[headlines=10]', case_sentiment_score, (10,), 10),
+    ('sentiment_score[headlines=100]', case_sentiment_score, (100,), 5),
+    ('sentiment_score[headlines=1000]', case_sentiment_score, (1000,), 3),
+]
+
+
+def environment():
+    versions = {'python': platform.python_version()}
+    for module in ('numpy', 'pandas', 'xgboost', 'sklearn'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return {'machine': platform.machine(), 'processor': platform.processor() or None,
+            'cpu_count': os.cpu_count(), 'versions': versions}
+
+
+def run_suite(name_filter=None, quick=False):
+    _seed_offline_caches()
+    results = {}
+    for name, setup, args, repeat in CASES:
+        if name_filter and name_filter not in name:
+            continue
+        case = setup(*args)
+        if 'skip' in case:
+            print(f"   ⏭  {name:<36} skipped ({case['skip']})")
+            continue
+        repeat = max(1, repeat // 3) if quick else repeat
+        results[name] = measure(case['func'], repeat, case.get('before'))
+        print(f"   ✓ {name:<36} {results[name]['median_ms']:>10.2f} ms")
+    return results
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """
+    Returns:
+        list case bị regression: cả median lẫn min đều chậm hơn baseline quá threshold
+        (min ít nhiễu hơn trên máy bận, median bắt được chậm đều)
+    """
+    baseline_results = baseline.get('results', {})
+    regressions = []
+    print(f"\n   {'Case':<36} {'Baseline (ms)':>14} {'Current (ms)':>14} {'Change':>9}")
+    print(f"   {'-'*76}")
+    for name, result in results.items():
+        base = baseline_results.get(name)
+        if base is None:
+            print(f"   {name:<36} {'-':>14} {result['median_ms']:>14.2f} {'new':>9}")
+            continue
+        change = result['median_ms'] / base['median_ms'] - 1 if base['median_ms'] else 0.0
+        min_change = result['min_ms'] / base['min_ms'] - 1 if base['min_ms'] else 0.0
+        marker = ''
+        if change > threshold and min_change > threshold:
+            marker = ' ⚠'
+            regressions.append(name)
+        elif change < -threshold and min_change < -threshold:
+            marker = ' 🚀'
+        print(f"   {name:<36} {base['median_ms']:>14.2f} {result['median_ms']:>14.2f} {change:>+8.1%}{marker}")
+    return regressions
+
+
+def save_results(results, path):
+    """Ghi kết quả (gộp vào file cũ: case không chạy lần này giữ nguyên)"""
+    existing = {}
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as f:
+            existing = json.load(f).get('results', {})
+    existing.update(results)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'created_at': datetime.now().isoformat(timespec='seconds'), 'environment': environment(),
+                   'results': dict(sorted(existing.items()))}, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+
+
+def main(argv):
+    def option(flag, default=None):
+        return argv[argv.index(flag) + 1] if flag in argv else default
+
+    baseline_path = option('--baseline', BASELINE_PATH)
+    threshold = float(option('--threshold', REGRESSION_THRESHOLD))
+    print(f"⏱  AI pipeline benchmark suite ({get_data_source().name} data, workdir {WORKDIR})")
+    try:
+        results = run_suite(option('--filter'), quick='--quick' in argv)
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+
+    regressions = []
+    if os.path.exists(baseline_path):
+        with open(baseline_path, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), threshold)
+        if regressions:
+            print(f"\n   ⚠ {len(regressions)} case(s) slower than baseline by more than {threshold:.0%}")
+    else:
+        print(f"\n   No baseline at {baseline_path} (run with --save to record one)")
+
+    if option('--output'):
+        save_results(results, option('--output'))
+    if '--save' in argv:
+        save_results(results, baseline_path)
+        print(f"   💾 Baseline saved to {baseline_path}")
+    return 1 if regressions and '--check' in argv else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
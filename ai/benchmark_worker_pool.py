@@ -0,0 +1,159 @@
+"""
+Benchmark bộ nhớ: N worker độc lập vs worker pool prefork (copy-on-write, có / không gc.freeze)
+
+Train vài mã bằng dữ liệu tổng hợp (AI_DATA_SOURCE=synthetic) vào thư mục tạm, rồi mỗi cách chạy N worker:
+mỗi worker import module của mọi command, load toàn bộ model và chạy compute_prediction cho từng mã
+(đụng tới model + chạy GC như một worker thật), sau đó đo RSS / PSS / USS (Linux, smaps_rollup).
+USS của một worker = bộ nhớ mỗi worker thêm vào; tổng PSS = bộ nhớ thật cả nhóm dùng.
+
+Usage:
+    python benchmark_worker_pool.py [n_workers] [n_symbols]
+"""
+
+import os
+import gc
+import sys
+import time
+import shutil
+import signal
+import tempfile
+import subprocess
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+SYMBOLS = ['VCB', 'FPT', 'HPG', 'VNM', 'MWG', 'TCB']
+
+# Model / cache trong thư mục tạm (phải set trước khi import các module AI)
+if '--child' not in sys.argv:
+    WORKDIR = tempfile.mkdtemp(prefix='ai-worker-pool-')
+    os.environ.update({
+        'AI_CACHE_PATH': os.path.join(WORKDIR, 'cache.db'),
+        'AI_BAR_STORE_PATH': os.path.join(WORKDIR, 'bars.db'),
+        'AI_MONITOR_PATH': os.path.join(WORKDIR, 'monitor.db'),
+        'AI_MODELS_DIR': os.path.join(WORKDIR, 'models'),
+        'AI_PREDICTION_LOG': '0',
+        'AI_DATA_SOURCE': 'synthetic',
+    })
+
+from worker_pool import process_memory, prepare_master, fork_child
+
+
+def workload(symbols):
+    """Việc của một worker sau khi khởi động: predict từng mã (không qua cache)"""
+    from contextlib import redirect_stdout, redirect_stderr
+    from predict import compute_prediction
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        for symbol in symbols:
+            compute_prediction(symbol)
+    # Worker chạy lâu sẽ có lúc gc full collection (duyệt mọi object còn sống) - chạy luôn một lần
+    gc.collect()
+
+
+def wait_ready(count, ready_dir, exited, timeout=300):
+    """Chờ count worker chạy xong workload (mỗi worker tạo một file trong ready_dir)"""
+    deadline = time.monotonic() + timeout
+    while len(os.listdir(ready_dir)) < count:
+        if exited():
+            raise RuntimeError('a worker exited before becoming ready')
+        if time.monotonic() > deadline:
+            raise TimeoutError('workers did not become ready')
+        time.sleep(0.2)
+
+
+def summarize(label, master, workers):
+    total = sum(memory['pss_mb'] for memory in workers) + (master['pss_mb'] if master else 0)
+    per_worker = sum(memory['uss_mb'] for memory in workers) / len(workers)
+    print(f"{label:<26} {per_worker:>12.1f} {sum(m['rss_mb'] for m in workers) / len(workers):>10.1f} {total:>12.1f}")
+
+
+def child_ready(ready_dir):
+    open(os.path.join(ready_dir, str(os.getpid())), 'w').close()
+    signal.pause()
+
+
+def run_independent(n, symbols, ready_dir):
+    """N process Python độc lập, mỗi process tự import + load model"""
+    processes = [subprocess.Popen([sys.executable, __file__, '--child', ready_dir] + symbols, cwd=CURRENT_DIR,
+                                  stdout=subprocess.DEVNULL) for _ in range(n)]
+    try:
+        wait_ready(n, ready_dir, lambda: any(p.poll() is not None for p in processes))
+        return [process_memory(p.pid) for p in processes]
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+
+
+def run_prefork(n, symbols, ready_dir, freeze):
+    """Master load một lần rồi fork N con (chạy trong process con để mỗi lần đo bắt đầu từ heap sạch)"""
+    read_fd, write_fd = os.pipe()
+
+    def master():
+        prepare_master(freeze=freeze)
+
+        def child(slot, _):
+            workload(symbols)
+            child_ready(ready_dir)
+
+        pids = [fork_child(child, slot, 0) for slot in range(n)]
+        try:
+            wait_ready(n, ready_dir, lambda: any(os.waitpid(pid, os.WNOHANG)[0] for pid in pids))
+            result = [process_memory()] + [process_memory(pid) for pid in pids]
+            os.write(write_fd, repr(result).encode())
+        finally:
+            for pid in pids:
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                    os.waitpid(pid, 0)
+                except (ProcessLookupError, ChildProcessError):
+                    pass
+
+    pid = fork_child(master)
+    os.close(write_fd)
+    with os.fdopen(read_fd) as f:
+        data = f.read()
+    os.waitpid(pid, 0)
+    import ast
+    result = ast.literal_eval(data)
+    return result[0], result[1:]
+
+
+def main(argv):
+    if argv and argv[0] == '--child':
+        # Worker độc lập: giống một worker_service riêng lẻ
+        import worker_service
+        from model_artifact import preload_artifacts, MODELS_DIR
+        worker_service.preload()
+        preload_artifacts(MODELS_DIR)
+        workload(argv[2:])
+        child_ready(argv[1])
+        return 0
+
+    if process_memory() is None:
+        print("smaps_rollup is not available (Linux only)")
+        return 1
+
+    n_workers = int(argv[0]) if argv else 4
+    symbols = SYMBOLS[:int(argv[1]) if len(argv) > 1 else 3]
+    try:
+        print(f"Training {len(symbols)} symbols (synthetic data)...")
+        for symbol in symbols:
+            subprocess.run([sys.executable, os.path.join(CURRENT_DIR, 'model_training_advanced.py'), symbol],
+                           cwd=CURRENT_DIR, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        print(f"\n{n_workers} workers, {len(symbols)} symbols")
+        print(f"{'mode':<26} {'USS/worker':>12} {'RSS/worker':>10} {'total PSS':>12}   (MB)")
+        for label, run in (
+            ('independent processes', lambda ready: (None, run_independent(n_workers, symbols, ready))),
+            ('prefork', lambda ready: run_prefork(n_workers, symbols, ready, freeze=False)),
+            ('prefork + gc.freeze', lambda ready: run_prefork(n_workers, symbols, ready, freeze=True)),
+        ):
+            ready_dir = tempfile.mkdtemp(dir=WORKDIR)
+            master, workers = run(ready_dir)
+            summarize(label, master, workers)
+    finally:
+        shutil.rmtree(WORKDIR, ignore_errors=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
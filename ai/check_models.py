@@ -2,15 +2,15 @@
 Quick test script để xem kết quả training
 """
 
-import joblib
 import os
+from model_artifact import list_artifacts, MODELS_DIR
 
 print("\n" + "="*60)
 print("📊 CHECKING TRAINED MODELS")
 print("="*60)
 
 # Check files
-models_dir = "models"
+models_dir = MODELS_DIR
 if os.path.exists(models_dir):
     files = os.listdir(models_dir)
     print(f"\n✓ Found {len(files)} files in models directory:")
@@ -20,35 +20,59 @@ if os.path.exists(models_dir):
 else:
     print("\n❌ Models directory not found!")
 
-# Try loading models
+# Artifacts: chỉ đọc manifest.json, không load model
 print("\n" + "="*60)
-print("🔍 LOADING MODELS")
+print("📦 MODEL ARTIFACTS")
 print("="*60)
 
-try:
-    model_advanced = joblib.load('models/model_VCB_advanced.pkl')
-    print(f"\n✓ Advanced Model loaded successfully")
-    print(f"   Type: {type(model_advanced).__name__}")
-    if hasattr(model_advanced, 'n_estimators'):
-        print(f"   Estimators: {model_advanced.n_estimators}")
-except Exception as e:
-    print(f"\n❌ Error loading advanced model: {e}")
-
-try:
-    model_simple = joblib.load('models/model_VCB_simple.pkl')
-    print(f"\n✓ Simple Model loaded successfully")
-    print(f"   Type: {type(model_simple).__name__}")
-except Exception as e:
-    print(f"\n❌ Error loading simple model: {e}")
-
-try:
-    features = joblib.load('models/features_VCB.pkl')
-    print(f"\n✓ Feature list loaded successfully")
-    print(f"   Total features: {len(features)}")
-    print(f"\n   Features:")
-    for i, f in enumerate(features, 1):
-        print(f"   {i:2d}. {f}")
-except Exception as e:
-    print(f"\n❌ Error loading features: {e}")
+artifacts = list_artifacts(models_dir)
+if not artifacts:
+    print("\n⚠ No model artifacts found, checking legacy .pkl files")
+
+for name, manifest in artifacts:
+    metadata = manifest.get('metadata', {})
+    print(f"\n✓ {name} (format v{manifest['format_version']}, created {manifest['created_at'][:19]})")
+    print(f"   Mode:           {metadata.get('mode', 'symbol')}")
+    print(f"   Last bar:       {metadata.get('last_bar_date', metadata.get('end_date', 'N/A'))}")
+    print(f"   Samples:        {metadata.get('n_samples', 'N/A')}")
+    print(f"   Features:       {len(manifest['features'])}")
+    for model_name, entry in manifest['models'].items():
+        metrics = manifest.get('metrics', {}).get(model_name, {})
+        mae = f"{metrics['mae']:,.2f}" if 'mae' in metrics else 'N/A'
+        print(f"   {model_name:<15} {entry['kind']:<10} MAE: {mae}")
+
+# Legacy pickle models (trước khi có artifact)
+if not artifacts:
+    import joblib
+
+    print("\n" + "="*60)
+    print("🔍 LOADING MODELS")
+    print("="*60)
+
+    try:
+        model_advanced = joblib.load('models/model_VCB_advanced.pkl')
+        print(f"\n✓ Advanced Model loaded successfully")
+        print(f"   Type: {type(model_advanced).__name__}")
+        if hasattr(model_advanced, 'n_estimators'):
+            print(f"   Estimators: {model_advanced.n_estimators}")
+    except Exception as e:
+        print(f"\n❌ Error loading advanced model: {e}")
+
+    try:
+        model_simple = joblib.load('models/model_VCB_simple.pkl')
+        print(f"\n✓ Simple Model loaded successfully")
+        print(f"   Type: {type(model_simple).__name__}")
+    except Exception as e:
+        print(f"\n❌ Error loading simple model: {e}")
+
+    try:
+        features = joblib.load('models/features_VCB.pkl')
+        print(f"\n✓ Feature list loaded successfully")
+        print(f"   Total features: {len(features)}")
+        print(f"\n   Features:")
+        for i, f in enumerate(features, 1):
+            print(f"   {i:2d}. {f}")
+    except Exception as e:
+        print(f"\n❌ Error loading features: {e}")
 
 print("\n" + "="*60 + "\n")
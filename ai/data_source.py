@@ -0,0 +1,289 @@
+"""
+Data Source - một điểm lấy dữ liệu thị trường cho toàn bộ pipeline (predict, features, backtest, training)
+
+Backend chọn bằng AI_DATA_SOURCE:
+- vnstock   (mặc định): API thật, chỉ import vnstock khi fetch lần đầu
+- parquet:  file cục bộ <AI_DATA_DIR>/<interval>/<SYMBOL>.parquet (+ ratios/<SYMBOL>.parquet),
+            ghi sẵn bằng `python data_source.py --record ...` -> chạy / benchmark không cần mạng
+- synthetic: dữ liệu tổng hợp xác định (GBM + volume, seed theo mã), cùng mã luôn ra cùng chuỗi giá;
+            nến intraday nối open -> close của phiên ngày bằng Brownian bridge
+
+Mọi backend trả về cùng cấu trúc: history() -> DataFrame time, open, high, low, close, volume
+
+Usage:
+    python data_source.py --record VCB FPT HPG [--years 3] [--interval 1D]
+"""
+
+import os
+import sys
+import zlib
+import threading
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_SOURCE = os.getenv('AI_DATA_SOURCE', 'vnstock')
+DATA_DIR = os.getenv('AI_DATA_DIR', os.path.join(CURRENT_DIR, 'data'))
+VNSTOCK_PROVIDER = os.getenv('AI_VNSTOCK_PROVIDER', 'VCI')
+
+HISTORY_COLUMNS = ['time', 'open', 'high', 'low', 'close', 'volume']
+RATIO_COLUMNS = ['eps', 'pe', 'pb', 'roe', 'roa']
+
+# Dữ liệu tổng hợp bắt đầu từ ngày này (cố định để cùng mã luôn ra cùng chuỗi giá)
+SYNTHETIC_START = '2015-01-01'
+# Phút trong phiên theo từng khung nến intraday (sáng 9:00-11:30, chiều 13:00-14:45)
+SYNTHETIC_SESSIONS = (('09:00', '11:29'), ('13:00', '14:44'))
+SYNTHETIC_FREQ = {'1m': '1min', '5m': '5min', '15m': '15min'}
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def _end_of_day(end):
+    """end là ngày (YYYY-MM-DD) -> lấy hết các nến trong ngày đó"""
+    return pd.Timestamp(end) + pd.Timedelta(days=1)
+
+
+class VnstockSource:
+    """API vnstock (import lười - process không fetch thì không tốn thời gian import)"""
+
+    name = 'vnstock'
+
+    def __init__(self, provider=VNSTOCK_PROVIDER):
+        self.provider = provider
+        self._module = None
+
+    @property
+    def vnstock(self):
+        if self._module is None:
+            # vnstock in banner ra stdout khi import -> chuyển sang stderr (stdout của worker là JSON)
+            with redirect_stdout(sys.stderr):
+                import vnstock
+            self._module = vnstock
+        return self._module
+
+    def history(self, symbol, start, end, interval='1D'):
+        quote = self.vnstock.Quote(symbol=symbol, source=self.provider)
+        return quote.history(start=start, end=end, interval=interval)
+
+    def financial_ratios(self, symbol):
+        company = self.vnstock.Company(symbol=symbol, source=self.provider)
+        return company.finance.ratio()
+
+    def list_symbols(self):
+        listing = self.vnstock.Listing(source=self.provider).all_symbols()
+        column = 'symbol' if 'symbol' in listing.columns else listing.columns[0]
+        return listing[column].astype(str).tolist()
+
+
+class ParquetSource:
+    """File Parquet cục bộ: <root>/<interval>/<SYMBOL>.parquet, <root>/ratios/<SYMBOL>.parquet"""
+
+    name = 'parquet'
+
+    def __init__(self, root=DATA_DIR):
+        self.root = root
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def path(self, symbol, interval='1D'):
+        return os.path.join(self.root, interval, f'{symbol}.parquet')
+
+    def _read(self, path):
+        with self._lock:
+            if path not in self._frames:
+                self._frames[path] = pd.read_parquet(path) if os.path.exists(path) else None
+            return self._frames[path]
+
+    def history(self, symbol, start, end, interval='1D'):
+        df = self._read(self.path(symbol, interval))
+        if df is None:
+            return pd.DataFrame(columns=HISTORY_COLUMNS)
+        mask = (df['time'] >= pd.Timestamp(start)) & (df['time'] < _end_of_day(end))
+        return df.loc[mask].reset_index(drop=True)
+
+    def financial_ratios(self, symbol):
+        df = self._read(os.path.join(self.root, 'ratios', f'{symbol}.parquet'))
+        return df if df is not None else pd.DataFrame(columns=RATIO_COLUMNS)
+
+    def list_symbols(self):
+        directory = os.path.join(self.root, '1D')
+        if not os.path.isdir(directory):
+            return []
+        return sorted(name[:-len('.parquet')] for name in os.listdir(directory) if name.endswith('.parquet'))
+
+    def write(self, symbol, df, interval='1D'):
+        """Ghi (ghi đè) lịch sử của một mã"""
+        path = self.path(symbol, interval)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df = df[HISTORY_COLUMNS].copy()
+        df['time'] = pd.to_datetime(df['time'])
+        df.sort_values('time').to_parquet(path + '.tmp', index=False)
+        os.replace(path + '.tmp', path)
+        with self._lock:
+            self._frames.pop(path, None)
+        return path
+
+    def write_ratios(self, symbol, df):
+        path = os.path.join(self.root, 'ratios', f'{symbol}.parquet')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_parquet(path, index=False)
+        with self._lock:
+            self._frames.pop(path, None)
+        return path
+
+
+class SyntheticSource:
+    """OHLCV tổng hợp xác định theo mã (GBM + volume) - không cần mạng"""
+
+    name = 'synthetic'
+
+    def __init__(self, start=SYNTHETIC_START):
+        self.start = start
+        self._daily = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _rng(*keys):
+        return np.random.default_rng(zlib.crc32(':'.join(map(str, keys)).encode()))
+
+    def _daily_series(self, symbol, end):
+        """Chuỗi ngày từ self.start, nối dài khi cần (phần đã sinh không đổi)"""
+        end = pd.Timestamp(end).normalize()
+        with self._lock:
+            df = self._daily.get(symbol)
+            if df is not None and df['time'].iloc[-1] >= end - pd.offsets.BDay(1):
+                return df
+            days = pd.bdate_range(self.start, max(end, pd.Timestamp.now().normalize()))
+            n = len(days)
+            # Mỗi cột một generator riêng: nối dài chuỗi không làm đổi các phiên đã sinh
+            level = self._rng(symbol, 'level').uniform(10_000, 90_000)
+            close = level * np.exp(np.cumsum(self._rng(symbol, 'close').normal(0.0002, 0.015, n)))
+            open_ = np.concatenate([[close[0]], close[:-1]]) * (1 + self._rng(symbol, 'open').normal(0, 0.005, n))
+            spread = np.abs(self._rng(symbol, 'spread').normal(0, 0.01, n))
+            df = pd.DataFrame({
+                'time': days,
+                'open': open_,
+                'high': np.maximum(open_, close) * (1 + spread),
+                'low': np.minimum(open_, close) * (1 - spread),
+                'close': close,
+                'volume': self._rng(symbol, 'volume').integers(100_000, 5_000_000, n).astype(float),
+            })
+            self._daily[symbol] = df
+            return df
+
+    def _intraday(self, symbol, daily, interval):
+        """Nến intraday của các phiên trong `daily`: Brownian bridge (log giá) từ open tới close"""
+        freq = SYNTHETIC_FREQ[interval]
+        frames = []
+        for day in daily.itertuples(index=False):
+            date = day.time.strftime('%Y-%m-%d')
+            times = pd.DatetimeIndex(np.concatenate([
+                pd.date_range(f'{date} {start}', f'{date} {end}', freq=freq).values
+                for start, end in SYNTHETIC_SESSIONS]))
+            n = len(times)
+            rng = self._rng(symbol, date, interval)
+            steps = rng.normal(0, 0.002, n).cumsum()
+            bridge = steps - np.linspace(0, 1, n) * steps[-1]
+            close = np.exp(np.log(day.open) + np.linspace(0, 1, n) * np.log(day.close / day.open) + bridge)
+            open_ = np.concatenate([[day.open], close[:-1]])
+            spread = np.abs(rng.normal(0, 0.001, n))
+            frames.append(pd.DataFrame({
+                'time': times,
+                'open': open_,
+                'high': np.maximum(open_, close) * (1 + spread),
+                'low': np.minimum(open_, close) * (1 - spread),
+                'close': close,
+                'volume': np.round(rng.dirichlet(np.ones(n)) * day.volume),
+            }))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=HISTORY_COLUMNS)
+
+    def history(self, symbol, start, end, interval='1D'):
+        df = self._daily_series(symbol, end)
+        mask = (df['time'] >= pd.Timestamp(start).normalize()) & (df['time'] < _end_of_day(end))
+        daily = df.loc[mask].reset_index(drop=True)
+        if interval == '1D':
+            return daily
+        bars = self._intraday(symbol, daily, interval)
+        return bars[(bars['time'] >= pd.Timestamp(start)) & (bars['time'] < _end_of_day(end))].reset_index(drop=True)
+
+    def financial_ratios(self, symbol):
+        rng = self._rng(symbol, 'ratios')
+        return pd.DataFrame([{'eps': rng.uniform(1000, 8000), 'pe': rng.uniform(6, 25), 'pb': rng.uniform(0.8, 4),
+                              'roe': rng.uniform(0.05, 0.3), 'roa': rng.uniform(0.01, 0.1)}])
+
+    def list_symbols(self):
+        from model_training_advanced import DEFAULT_SYMBOLS
+        return list(DEFAULT_SYMBOLS)
+
+
+SOURCES = {
+    'vnstock': VnstockSource,
+    'parquet': ParquetSource,
+    'synthetic': SyntheticSource,
+}
+
+_source = None
+_source_lock = threading.Lock()
+
+
+def get_data_source():
+    """Data source dùng chung cho cả process (AI_DATA_SOURCE)"""
+    global _source
+    if _source is None:
+        with _source_lock:
+            if _source is None:
+                if DATA_SOURCE not in SOURCES:
+                    raise ValueError(f"Unknown AI_DATA_SOURCE '{DATA_SOURCE}' (expected one of {', '.join(SOURCES)})")
+                _source = SOURCES[DATA_SOURCE]()
+    return _source
+
+
+def record(symbols, years=3, interval='1D', source=None, target=None):
+    """
+    Ghi lịch sử (+ financial ratios) từ một source (mặc định vnstock) ra ParquetSource
+
+    Returns:
+        Số mã đã ghi
+    """
+    source = source or VnstockSource()
+    target = target or ParquetSource()
+    end = datetime.now()
+    start = (end - timedelta(days=365 * years)).strftime('%Y-%m-%d')
+    written = 0
+    for symbol in symbols:
+        try:
+            df = source.history(symbol, start, end.strftime('%Y-%m-%d'), interval=interval)
+            path = target.write(symbol, df, interval)
+            log(f"💾 {symbol}: {len(df)} {interval} bars -> {path}")
+            if interval == '1D':
+                ratios = source.financial_ratios(symbol)
+                if not ratios.empty:
+                    target.write_ratios(symbol, ratios)
+            written += 1
+        except Exception as e:
+            log(f"⚠ Could not record {symbol}: {e}")
+    return written
+
+
+if __name__ == '__main__':
+    if '--record' not in sys.argv:
+        print(__doc__)
+        sys.exit(1)
+
+    options, symbols = {}, []
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg in ('--years', '--interval'):
+            options[arg] = next(args)
+        elif not arg.startswith('--'):
+            symbols.append(arg.upper())
+    interval = options.get('--interval', '1D')
+    if interval == '1D' and 'VNINDEX' not in symbols:
+        symbols.append('VNINDEX')  # add_macro_data cần VN-Index
+    record(symbols, int(options.get('--years', 3)), interval)
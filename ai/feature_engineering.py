@@ -6,46 +6,97 @@ Thêm technical indicators, financial ratios, và macro data
 import pandas as pd
 import numpy as np
 import sys
-import os
-import json
-import time
 import requests
 from datetime import datetime
-from contextlib import redirect_stdout
 from ta.trend import MACD, EMAIndicator
 from ta.momentum import RSIIndicator
 from ta.volatility import BollingerBands
 from ta.volume import VolumeWeightedAveragePrice
+from trading_calendar import start_date_for_bars
+from instrumentation import timed
+from data_source import get_data_source
+
+# Cửa sổ của các chỉ báo kỹ thuật (dùng chung cho tính toán và lookback)
+RSI_WINDOW = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BB_WINDOW = 20
+EMA_WINDOWS = (12, 26)
+VOLUME_SMA_WINDOW = 20
+VWAP_WINDOW = 14
+MOMENTUM_WINDOWS = (1, 5, 10)
+SMA_WINDOWS = (5, 20, 50)
+
+# Các cột do add_technical_indicators thêm vào (theo đúng thứ tự)
+TECHNICAL_INDICATOR_COLUMNS = (
+    ['RSI', 'MACD', 'MACD_signal', 'MACD_diff',
+     'BB_high', 'BB_mid', 'BB_low', 'BB_width', 'BB_position']
+    + [f'EMA_{window}' for window in EMA_WINDOWS]
+    + ['volume_sma', 'volume_ratio', 'VWAP']
+    + [f'momentum_{window}d' for window in MOMENTUM_WINDOWS]
+    + [f'SMA{window}' for window in SMA_WINDOWS]
+)
+
+# Các horizon dự đoán (số phiên tới trước). Horizon 1 là cột 'Target' như trước,
+# các horizon khác là 'Target_<h>d'
+HORIZONS = (1, 3, 5, 10)
+
+# Số phiên dự phòng cho mã bị tạm ngừng giao dịch / thiếu dữ liệu
+LOOKBACK_SAFETY_BARS = 5
+
+# Các cột theo mức giá tuyệt đối - với pooled model phải chia cho close
+# để so sánh được giữa các mã có thị giá khác nhau
+PRICE_LEVEL_COLUMNS = [
+    'MACD', 'MACD_signal', 'MACD_diff', 'BB_high', 'BB_mid', 'BB_low', 'BB_width',
+    'EMA_12', 'EMA_26', 'VWAP', 'SMA5', 'SMA20', 'SMA50',
+]
+
+# Ngành của các mã VN30 (dùng làm feature cho pooled model)
+SECTORS = {
+    'VCB': 'bank', 'TCB': 'bank', 'VPB': 'bank', 'MBB': 'bank', 'ACB': 'bank',
+    'CTG': 'bank', 'BID': 'bank', 'HDB': 'bank', 'STB': 'bank', 'TPB': 'bank',
+    'VIC': 'real_estate', 'VHM': 'real_estate', 'VRE': 'real_estate', 'KBC': 'real_estate',
+    'HPG': 'materials', 'GVR': 'materials',
+    'FPT': 'technology',
+    'VNM': 'consumer', 'MSN': 'consumer', 'SAB': 'consumer', 'MWG': 'consumer',
+    'GAS': 'energy', 'PLX': 'energy', 'POW': 'energy', 'BSR': 'energy', 'REE': 'energy',
+    'SSI': 'financial_services',
+}
+SECTOR_IDS = {name: i for i, name in enumerate(sorted(set(SECTORS.values())))}
 
 # Custom logger to stderr
 def log(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
 
-def add_technical_indicators(df):
+@timed('technical_indicators')
+def add_technical_indicators(df, copy=True):
     """
     Thêm các chỉ báo kỹ thuật vào DataFrame
     
     Args:
         df: DataFrame với columns: time, open, high, low, close, volume
+        copy: False để ghi thẳng các cột chỉ báo vào df (không copy)
         
     Returns:
         DataFrame với technical indicators
     """
-    df = df.copy()
+    if copy:
+        df = df.copy()
     
     # 1. RSI (Relative Strength Index)
-    rsi = RSIIndicator(close=df['close'], window=14)
+    rsi = RSIIndicator(close=df['close'], window=RSI_WINDOW)
     df['RSI'] = rsi.rsi()
     
     # 2. MACD (Moving Average Convergence Divergence)
-    macd = MACD(close=df['close'])
+    macd = MACD(close=df['close'], window_slow=MACD_SLOW, window_fast=MACD_FAST, window_sign=MACD_SIGNAL)
     df['MACD'] = macd.macd()
     df['MACD_signal'] = macd.macd_signal()
     df['MACD_diff'] = macd.macd_diff()
     
     # 3. Bollinger Bands
-    bollinger = BollingerBands(close=df['close'], window=20, window_dev=2)
+    bollinger = BollingerBands(close=df['close'], window=BB_WINDOW, window_dev=2)
     df['BB_high'] = bollinger.bollinger_hband()
     df['BB_mid'] = bollinger.bollinger_mavg()
     df['BB_low'] = bollinger.bollinger_lband()
@@ -53,13 +104,11 @@ def add_technical_indicators(df):
     df['BB_position'] = (df['close'] - df['BB_low']) / (df['BB_high'] - df['BB_low'])
     
     # 4. EMA (Exponential Moving Average)
-    ema_12 = EMAIndicator(close=df['close'], window=12)
-    ema_26 = EMAIndicator(close=df['close'], window=26)
-    df['EMA_12'] = ema_12.ema_indicator()
-    df['EMA_26'] = ema_26.ema_indicator()
+    for window in EMA_WINDOWS:
+        df[f'EMA_{window}'] = EMAIndicator(close=df['close'], window=window).ema_indicator()
     
     # 5. Volume indicators
-    df['volume_sma'] = df['volume'].rolling(window=20).mean()
+    df['volume_sma'] = df['volume'].rolling(window=VOLUME_SMA_WINDOW).mean()
     df['volume_ratio'] = df['volume'] / df['volume_sma']
     
     # VWAP (Volume Weighted Average Price)
@@ -68,42 +117,94 @@ def add_technical_indicators(df):
             high=df['high'], 
             low=df['low'], 
             close=df['close'], 
-            volume=df['volume']
+            volume=df['volume'],
+            window=VWAP_WINDOW
         )
         df['VWAP'] = vwap.volume_weighted_average_price()
     
     # 6. Price momentum
-    df['momentum_1d'] = df['close'].pct_change(1)
-    df['momentum_5d'] = df['close'].pct_change(5)
-    df['momentum_10d'] = df['close'].pct_change(10)
+    for window in MOMENTUM_WINDOWS:
+        df[f'momentum_{window}d'] = df['close'].pct_change(window)
     
     # 7. Simple Moving Averages (giữ lại từ model cũ)
-    df['SMA5'] = df['close'].rolling(window=5).mean()
-    df['SMA20'] = df['close'].rolling(window=20).mean()
-    df['SMA50'] = df['close'].rolling(window=50).mean()
+    for window in SMA_WINDOWS:
+        df[f'SMA{window}'] = df['close'].rolling(window=window).mean()
     
     return df
 
 
-def add_financial_ratios(df, symbol, vnstock):
+def get_warmup_bars():
+    """
+    Số phiên đầu tiên bị NaN do warmup của các chỉ báo kỹ thuật
+
+    Rolling(window) cần window-1 phiên trước đó; pct_change(n) cần n phiên;
+    MACD signal là EMA của MACD nên cộng dồn warmup của hai lớp EMA;
+    RSI tính trên diff() nên cần thêm 1 phiên.
+    """
+    warmups = [
+        RSI_WINDOW,
+        (MACD_SLOW - 1) + (MACD_SIGNAL - 1),
+        BB_WINDOW - 1,
+        max(EMA_WINDOWS) - 1,
+        VOLUME_SMA_WINDOW - 1,
+        VWAP_WINDOW - 1,
+        max(MOMENTUM_WINDOWS),
+        max(SMA_WINDOWS) - 1,
+    ]
+    return max(warmups)
+
+
+def get_required_bars(rows=1):
+    """
+    Số phiên cần fetch để có `rows` dòng cuối đầy đủ features
+    """
+    return get_warmup_bars() + rows + LOOKBACK_SAFETY_BARS
+
+
+def get_lookback_start_date(end_date, rows=1):
+    """
+    Ngày bắt đầu fetch tối thiểu (theo lịch giao dịch HOSE/HNX)
+    để có `rows` dòng cuối đầy đủ features tính đến end_date
+    """
+    return start_date_for_bars(end_date, get_required_bars(rows))
+
+
+def horizon_target_column(horizon):
+    """Tên cột target của một horizon: 'Target' (1 phiên) hoặc 'Target_<h>d'"""
+    return 'Target' if horizon == 1 else f'Target_{horizon}d'
+
+
+def add_horizon_targets(df, horizons=HORIZONS):
+    """
+    Giá đóng cửa sau h phiên cho mọi horizon trong một lần gather trên mảng close
+    (ma trận chỉ số (n_rows, n_horizons)), thay vì mỗi horizon một lần shift
+
+    Các phiên cuối chưa đủ h phiên phía sau nhận NaN
+    """
+    close = df['close'].to_numpy(dtype=np.float64)
+    padded = np.concatenate([close, np.full(max(horizons), np.nan)])
+    targets = padded[np.arange(len(close))[:, None] + np.asarray(horizons)[None, :]]
+    for j, horizon in enumerate(horizons):
+        df[horizon_target_column(horizon)] = targets[:, j]
+    return df
+
+
+@timed('financial_ratios')
+def add_financial_ratios(df, symbol, source=None):
     """
-    Thêm các chỉ số tài chính từ vnstock
+    Thêm các chỉ số tài chính từ data source
     
     Args:
         df: DataFrame
         symbol: Mã cổ phiếu
-        vnstock: vnstock module
+        source: Data source (mặc định get_data_source())
         
     Returns:
         DataFrame với financial ratios
     """
     try:
-        # Sử dụng vnstock để lấy financial ratios
-        from vnstock import Company
-        company = Company(symbol=symbol, source='VCI')
-        
         # Lấy financial ratios
-        ratios = company.finance.ratio()
+        ratios = (source or get_data_source()).financial_ratios(symbol)
         
         if not ratios.empty:
             # Lấy ratios mới nhất
@@ -139,23 +240,15 @@ def get_usd_vnd_rate(cache_hours: int = 24) -> float:
     """
     Lấy tỷ giá USD/VND từ open.er-api.com với cơ chế cache
     """
-    cache_dir = "ai/.cache"
-    os.makedirs(cache_dir, exist_ok=True)
-    cache_file = os.path.join(cache_dir, "usd_vnd_rate.json")
+    from tiered_cache import get_cache
+    cache = get_cache()
     
-    # 1. Kiểm tra cache
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            cached_time = data.get('timestamp', 0)
-            if time.time() - cached_time < cache_hours * 3600:
-                rate = data.get('rate')
-                log(f"   ✓ Using cached USD/VND rate: {rate:,.0f} (age: {(time.time() - cached_time)/3600:.1f}h)")
-                return float(rate)
-        except Exception as e:
-            log(f"   ⚠ Cache read error: {e}")
+    # 1. Kiểm tra cache (nhận cả bản stale để dùng khi API lỗi)
+    cached = cache.get('fx', 'USD_VND', max_age=cache_hours * 3600, allow_stale=True)
+    if cached is not None and not cached.stale:
+        rate = cached.value['rate']
+        log(f"   ✓ Using cached USD/VND rate: {rate:,.0f} (age: {cached.age/3600:.1f}h)")
+        return float(rate)
 
     # 2. Fetch mới từ API
     log("   🌐 Fetching latest USD/VND rate from API...")
@@ -168,12 +261,10 @@ def get_usd_vnd_rate(cache_hours: int = 24) -> float:
             
             if rate:
                 # Lưu vào cache
-                with open(cache_file, 'w', encoding='utf-8') as f:
-                    json.dump({
-                        'rate': rate,
-                        'timestamp': time.time(),
-                        'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                    }, f, indent=2)
+                cache.set('fx', 'USD_VND', {
+                    'rate': rate,
+                    'date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
                 
                 log(f"   ✓ New USD/VND rate fetched: {rate:,.0f}")
                 return float(rate)
@@ -182,13 +273,18 @@ def get_usd_vnd_rate(cache_hours: int = 24) -> float:
     except Exception as e:
         log(f"   ⚠ Error fetching exchange rate: {e}")
 
-    # 3. Fallback
+    # 3. Fallback: tỷ giá cũ trong cache, nếu không có thì giá trị cố định
+    if cached is not None:
+        log(f"   ⚠ Using stale USD/VND rate: {cached.value['rate']:,.0f} (age: {cached.age/3600:.1f}h)")
+        return float(cached.value['rate'])
+    
     fallback_rate = 25400  # Cập nhật giá trị gần nhất thay vì 24000
     log(f"   ⚠ Using fallback USD/VND rate: {fallback_rate:,.0f}")
     return float(fallback_rate)
 
 
-def add_macro_data(df, start_date, end_date, vnstock):
+@timed('macro_data')
+def add_macro_data(df, start_date, end_date, source=None):
     """
     Thêm dữ liệu vĩ mô (VN-Index, tỷ giá)
     
@@ -196,22 +292,19 @@ def add_macro_data(df, start_date, end_date, vnstock):
         df: DataFrame
         start_date: Ngày bắt đầu
         end_date: Ngày kết thúc
-        vnstock: vnstock module
+        source: Data source (mặc định get_data_source())
         
     Returns:
         DataFrame với macro data
     """
     try:
         # Lấy VN-Index data
-        from vnstock import Quote
-        vnindex = Quote(symbol='VNINDEX', source='VCI')
-        vnindex_data = vnindex.history(start=start_date, end=end_date, interval='1D')
+        vnindex_data = (source or get_data_source()).history('VNINDEX', start_date, end_date, interval='1D')
         
         if not vnindex_data.empty:
-            # Merge VN-Index vào df chính
-            vnindex_data = vnindex_data[['time', 'close']].rename(columns={'close': 'VNINDEX'})
-            df = pd.merge(df, vnindex_data, on='time', how='left')
-            df['VNINDEX'] = df['VNINDEX'].fillna(method='ffill').fillna(method='bfill')
+            # Map VN-Index theo ngày vào df chính (thêm cột tại chỗ, không merge/copy cả frame)
+            vnindex_close = vnindex_data.set_index('time')['close']
+            df['VNINDEX'] = df['time'].map(vnindex_close).ffill().bfill()
             
             log("✓ VN-Index data added successfully")
         
@@ -230,6 +323,7 @@ def add_macro_data(df, start_date, end_date, vnstock):
     return df
 
 
+@timed('sentiment')
 def add_market_sentiment(df, symbol):
     """
     Thêm sentiment analysis từ tin tức
@@ -260,55 +354,158 @@ def add_market_sentiment(df, symbol):
     return df
 
 
-def prepare_features(df, symbol, start_date, end_date, vnstock):
+def prepare_features(df, symbol, start_date, end_date, source=None, inference=False):
     """
     Pipeline hoàn chỉnh để chuẩn bị tất cả features
     
     Args:
-        df: Raw DataFrame từ vnstock
+        df: Raw DataFrame từ data source
         symbol: Mã cổ phiếu
         start_date: Ngày bắt đầu
         end_date: Ngày kết thúc
-        vnstock: vnstock module
+        source: Data source cho ratios / VN-Index (mặc định get_data_source())
+        inference: True khi dự đoán - giữ lại phiên cuối cùng (Target = NaN),
+            chỉ bỏ các dòng warmup của chỉ báo
         
     Returns:
-        DataFrame với tất cả features
+        DataFrame với tất cả features (các cột được thêm tại chỗ vào df)
     """
     log("\n📊 Adding features...")
     
     # 1. Technical Indicators
     log("1️⃣ Calculating technical indicators...")
-    df = add_technical_indicators(df)
+    df = add_technical_indicators(df, copy=False)
     
     # 2. Financial Ratios
     log("2️⃣ Fetching financial ratios...")
-    df = add_financial_ratios(df, symbol, vnstock)
+    df = add_financial_ratios(df, symbol, source)
     
     # 3. Macro Data
     log("3️⃣ Adding macro economic data...")
-    df = add_macro_data(df, start_date, end_date, vnstock)
+    df = add_macro_data(df, start_date, end_date, source)
     
     # 4. Market Sentiment (placeholder)
     log("4️⃣ Adding market sentiment...")
     df = add_market_sentiment(df, symbol)
     
-    # 5. Target variable (giá ngày mai)
-    df['Target'] = df['close'].shift(-1)
+    # 5. Target variables (giá sau 1 / 3 / 5 / 10 phiên)
+    df = add_horizon_targets(df)
     
-    # 6. Drop NaN values
+    # 6. Drop NaN values (horizon dài thiếu target ở các phiên cuối nhưng vẫn giữ cho Target 1 phiên)
+    target_cols = [horizon_target_column(h) for h in HORIZONS]
     initial_rows = len(df)
-    df = df.dropna()
+    if inference:
+        df = df.dropna(subset=[col for col in df.columns if col not in target_cols])
+    else:
+        df = df.dropna(subset=[col for col in df.columns if col not in target_cols[1:]])
     dropped_rows = initial_rows - len(df)
     log(f"\n✓ Features prepared! Dropped {dropped_rows} rows with NaN values")
-    log(f"✓ Total features: {len(df.columns) - 1} (excluding Target)")
+    log(f"✓ Total features: {len(df.columns) - len(target_cols)} (excluding targets)")
     
     return df
 
 
+def prepare_intraday_features(df, inference=False):
+    """
+    Features cho nến intraday (1m/5m/15m): chỉ báo kỹ thuật + vị trí trong phiên
+    
+    Dữ liệu ngày (financial ratios, VN-Index, tỷ giá, sentiment) không đổi trong phiên
+    nên không đưa vào; Target là giá đóng cửa của nến kế tiếp trong cùng phiên
+    (nến cuối phiên không có Target để tránh học khoảng trống qua đêm)
+    
+    Args:
+        df: DataFrame nến intraday (time, open, high, low, close, volume)
+        inference: True khi dự đoán - giữ lại nến cuối cùng (Target = NaN)
+    """
+    df = add_technical_indicators(df, copy=False)
+    
+    times = pd.to_datetime(df['time'])
+    df['minute_of_day'] = times.dt.hour * 60 + times.dt.minute
+    
+    days = times.dt.normalize()
+    df['Target'] = df['close'].shift(-1).where(days.shift(-1) == days)
+    
+    initial_rows = len(df)
+    if inference:
+        df = df.dropna(subset=[col for col in df.columns if col != 'Target'])
+    else:
+        df = df.dropna()
+    log(f"✓ Intraday features prepared! Dropped {initial_rows - len(df)} rows with NaN values")
+    return df
+
+
 def get_feature_columns(df):
     """
-    Lấy danh sách các cột features (exclude time, Target)
+    Lấy danh sách các cột features (exclude time, các cột Target)
     """
-    exclude_cols = ['time', 'Target', 'open', 'high', 'low', 'volume']
+    exclude_cols = ['time', 'open', 'high', 'low', 'volume']
+    exclude_cols += [horizon_target_column(h) for h in HORIZONS]
+    exclude_cols += [f'{horizon_target_column(h)}_return' for h in HORIZONS]
     feature_cols = [col for col in df.columns if col not in exclude_cols]
     return feature_cols
+
+
+def add_pooled_features(df, symbol, symbol_ids):
+    """
+    Chuẩn hoá features để train một model chung cho nhiều mã (pooled):
+    - Cột theo mức giá -> tỷ lệ so với close (*_rel)
+    - volume_sma -> log1p
+    - Thêm symbol_id / sector_id
+    - Target_return = Target / close - 1 (lợi suất thay vì giá tuyệt đối), tương tự Target_<h>d_return
+
+    Args:
+        df: DataFrame từ prepare_features (cột được thêm tại chỗ)
+        symbol: Mã cổ phiếu
+        symbol_ids: dict symbol -> id lúc train (mã lạ nhận -1)
+    """
+    for col in PRICE_LEVEL_COLUMNS:
+        if col in df.columns:
+            df[f'{col}_rel'] = df[col] / df['close']
+    if 'volume_sma' in df.columns:
+        df['log_volume_sma'] = np.log1p(df['volume_sma'])
+    df['symbol_id'] = symbol_ids.get(symbol, -1)
+    df['sector_id'] = SECTOR_IDS.get(SECTORS.get(symbol), -1)
+    for horizon in HORIZONS:
+        col = horizon_target_column(horizon)
+        if col in df.columns:
+            df[f'{col}_return'] = df[col] / df['close'] - 1
+    return df
+
+
+def get_pooled_feature_columns(df):
+    """
+    Features cho pooled model: bỏ các cột theo mức giá tuyệt đối (close, SMA, EMA, ...)
+    """
+    level_cols = set(PRICE_LEVEL_COLUMNS) | {'close', 'volume_sma'}
+    return [col for col in get_feature_columns(df) if col not in level_cols]
+
+
+def build_feature_matrix(df, feature_cols, target_col='Target', rows=None):
+    """
+    Chuyển DataFrame features sang FeatureMatrix float32 liên tục
+    để đưa thẳng vào XGBoost / sklearn
+
+    Args:
+        df: DataFrame từ prepare_features
+        feature_cols: Danh sách cột features (thứ tự cột của model)
+        target_col: Cột target, None khi chỉ dự đoán
+        rows: slice dòng cần lấy (vd slice(-1, None) cho phiên mới nhất)
+    """
+    from feature_matrix import FeatureMatrix
+    if target_col is not None and target_col not in df.columns:
+        target_col = None
+    return FeatureMatrix.from_frame(df, feature_cols, target_col=target_col, rows=rows)
+
+
+def build_horizon_targets(df, horizons, relative=False, rows=None):
+    """
+    Ma trận target float32 (n_rows, n_horizons) cùng thứ tự dòng với build_feature_matrix
+
+    Args:
+        horizons: Các horizon cần lấy (cột đã có từ add_horizon_targets)
+        relative: True để lấy lợi suất (Target_<h>d_return, pooled model)
+    """
+    suffix = '_return' if relative else ''
+    cols = [f'{horizon_target_column(h)}{suffix}' for h in horizons]
+    values = df[cols].to_numpy(dtype=np.float32)
+    return np.ascontiguousarray(values if rows is None else values[rows])
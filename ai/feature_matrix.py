@@ -0,0 +1,142 @@
+"""
+Feature Matrix - ma trận features float32 liên tục (C-contiguous)
+Truyền thẳng vào XGBoost / sklearn mà không cần copy thêm
+"""
+
+import os
+import json
+import numpy as np
+
+DTYPE = np.float32
+
+
+class FeatureMatrix:
+    """
+    Buffer NumPy float32 2 chiều kèm chỉ mục cột
+
+    Attributes:
+        values: np.ndarray (n_rows, n_features), float32, C-contiguous
+        columns: Danh sách tên features theo thứ tự cột
+        target: np.ndarray float32 (n_rows,) hoặc None
+    """
+
+    def __init__(self, values, columns, target=None):
+        self.values = values
+        self.columns = list(columns)
+        self.target = target
+        self._index = {name: i for i, name in enumerate(self.columns)}
+
+    @classmethod
+    def from_frame(cls, df, columns, target_col=None, rows=None):
+        """
+        Ghi trực tiếp từng cột của DataFrame vào một buffer float32 cấp phát sẵn
+        (tránh bản copy float64 trung gian của df[columns].values)
+
+        Args:
+            df: DataFrame đã có features
+            columns: Danh sách cột features
+            target_col: Tên cột target (vd 'Target') hoặc None
+            rows: slice / mảng index để chỉ lấy một phần dòng (vd slice(-1, None))
+        """
+        rows = slice(None) if rows is None else rows
+        n_rows = len(np.arange(len(df))[rows])
+        values = np.empty((n_rows, len(columns)), dtype=DTYPE)
+        for j, col in enumerate(columns):
+            values[:, j] = df[col].to_numpy()[rows]
+
+        target = None
+        if target_col is not None:
+            target = np.ascontiguousarray(df[target_col].to_numpy()[rows], dtype=DTYPE)
+
+        return cls(values, columns, target)
+
+    @classmethod
+    def stack(cls, matrices):
+        """
+        Ghép nhiều FeatureMatrix (cùng columns) theo dòng vào một buffer cấp phát một lần
+        """
+        columns = matrices[0].columns
+        n_rows = sum(len(m) for m in matrices)
+        values = np.empty((n_rows, len(columns)), dtype=DTYPE)
+        has_target = all(m.target is not None for m in matrices)
+        target = np.empty(n_rows, dtype=DTYPE) if has_target else None
+
+        offset = 0
+        for m in matrices:
+            if m.columns != columns:
+                raise ValueError("Cannot stack FeatureMatrix objects with different columns")
+            values[offset:offset + len(m)] = m.values
+            if has_target:
+                target[offset:offset + len(m)] = m.target
+            offset += len(m)
+
+        return cls(values, columns, target)
+
+    def __len__(self):
+        return self.values.shape[0]
+
+    def __array__(self, dtype=None, copy=None):
+        if dtype is None or np.dtype(dtype) == self.values.dtype:
+            return self.values
+        return self.values.astype(dtype)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def nbytes(self):
+        target_bytes = self.target.nbytes if self.target is not None else 0
+        return self.values.nbytes + target_bytes
+
+    def column(self, name):
+        """View (không copy) của một cột theo tên"""
+        return self.values[:, self._index[name]]
+
+    def slice_rows(self, rows):
+        """
+        FeatureMatrix con theo dòng. Với slice, values/target là view của buffer gốc
+        """
+        target = self.target[rows] if self.target is not None else None
+        return FeatureMatrix(self.values[rows], self.columns, target)
+
+    def split(self, test_size=0.2):
+        """
+        Chia train/test theo thời gian (giống train_test_split(shuffle=False))
+        nhưng trả về view thay vì copy
+        """
+        n_test = int(np.ceil(len(self) * test_size))
+        n_train = len(self) - n_test
+        return self.slice_rows(slice(0, n_train)), self.slice_rows(slice(n_train, None))
+
+    def to_dmatrix(self, **kwargs):
+        """
+        Tạo xgb.DMatrix trực tiếp từ buffer float32 (XGBoost không copy lại dữ liệu đầu vào)
+        """
+        import xgboost as xgb
+        return xgb.DMatrix(self.values, label=self.target, feature_names=self.columns, **kwargs)
+
+    def save(self, path):
+        """
+        Lưu ra thư mục: values.npy, target.npy (nếu có) và columns.json
+        """
+        os.makedirs(path, exist_ok=True)
+        np.save(os.path.join(path, 'values.npy'), self.values)
+        if self.target is not None:
+            np.save(os.path.join(path, 'target.npy'), self.target)
+        with open(os.path.join(path, 'columns.json'), 'w', encoding='utf-8') as f:
+            json.dump(self.columns, f)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """
+        Đọc FeatureMatrix đã lưu. mmap=True sẽ memory-map file .npy (chỉ đọc)
+        nên chỉ những trang thực sự truy cập mới được nạp vào RAM
+        """
+        mmap_mode = 'r' if mmap else None
+        values = np.load(os.path.join(path, 'values.npy'), mmap_mode=mmap_mode)
+        target_path = os.path.join(path, 'target.npy')
+        target = np.load(target_path, mmap_mode=mmap_mode) if os.path.exists(target_path) else None
+        with open(os.path.join(path, 'columns.json'), 'r', encoding='utf-8') as f:
+            columns = json.load(f)
+        return cls(values, columns, target)
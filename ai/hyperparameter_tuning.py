@@ -155,7 +155,6 @@ def main():
     # Import dependencies
     sys.path.insert(0, 'ai')
     
-    import vnstock
     from datetime import datetime, timedelta
     from feature_engineering import prepare_features, get_feature_columns
     from model_training_advanced import fetch_data
@@ -165,7 +164,7 @@ def main():
     end_date = datetime.now().strftime('%Y-%m-%d')
     start_date = (datetime.now() - timedelta(days=args.days)).strftime('%Y-%m-%d')
     
-    df_raw = fetch_data(args.symbol, start_date, end_date, vnstock)
+    df_raw = fetch_data(args.symbol, start_date, end_date)
     
     if df_raw.empty:
         print("❌ No data fetched")
@@ -173,7 +172,7 @@ def main():
     
     # Prepare features
     print("\n🔧 Preparing features...")
-    df_processed = prepare_features(df_raw, args.symbol, start_date, end_date, vnstock)
+    df_processed = prepare_features(df_raw, args.symbol, start_date, end_date)
     
     feature_cols = get_feature_columns(df_processed)
     X = df_processed[feature_cols]
@@ -104,7 +104,6 @@ def main():
     args = parser.parse_args()
     
     sys.path.insert(0, 'ai')
-    import vnstock
     from datetime import timedelta
     from feature_engineering import prepare_features, get_feature_columns
     from model_training_advanced import fetch_data
@@ -112,10 +111,10 @@ def main():
     end_date = datetime.now().strftime('%Y-%m-%d')
     start_date = (datetime.now() - timedelta(days=730)).strftime('%Y-%m-%d')
     
-    df_raw = fetch_data(args.symbol, start_date, end_date, vnstock)
+    df_raw = fetch_data(args.symbol, start_date, end_date)
     if df_raw.empty: return
     
-    df_processed = prepare_features(df_raw, args.symbol, start_date, end_date, vnstock)
+    df_processed = prepare_features(df_raw, args.symbol, start_date, end_date)
     feature_cols = get_feature_columns(df_processed)
     X = df_processed[feature_cols]
     y = df_processed['Target']
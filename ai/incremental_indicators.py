@@ -0,0 +1,172 @@
+"""
+Incremental Indicators - cập nhật chỉ báo kỹ thuật theo từng nến (O(1) mỗi nến)
+Cho ra đúng các cột như feature_engineering.add_technical_indicators (cùng công thức với thư viện `ta`),
+dùng cho nến intraday / luồng realtime thay vì tính lại toàn bộ lịch sử mỗi lần có nến mới
+"""
+
+import math
+from collections import deque
+
+from feature_engineering import (
+    RSI_WINDOW, MACD_FAST, MACD_SLOW, MACD_SIGNAL, BB_WINDOW, EMA_WINDOWS,
+    VOLUME_SMA_WINDOW, VWAP_WINDOW, MOMENTUM_WINDOWS, SMA_WINDOWS,
+)
+
+NAN = float('nan')
+
+# Tính lại tổng của cửa sổ trượt sau mỗi N lần cập nhật để không tích luỹ sai số float
+RESYNC_EVERY = 1000
+
+
+class EMA:
+    """EMA kiểu ewm(adjust=False): bắt đầu từ giá trị đầu tiên, hợp lệ sau `window` giá trị"""
+
+    __slots__ = ('alpha', 'window', 'value', 'count')
+
+    def __init__(self, window, alpha=None):
+        self.window = window
+        self.alpha = alpha if alpha is not None else 2.0 / (window + 1)
+        self.value = None
+        self.count = 0
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        self.count += 1
+        return self.value if self.count >= self.window else NAN
+
+
+class RollingSum:
+    """Tổng của `window` giá trị gần nhất"""
+
+    __slots__ = ('window', 'values', 'total', 'updates')
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(x)
+        self.total += x
+        self.updates += 1
+        if self.updates % RESYNC_EVERY == 0:
+            self.total = math.fsum(self.values)
+        return self.total if len(self.values) == self.window else NAN
+
+
+class IndicatorState:
+    """
+    Trạng thái chỉ báo của một mã trên một khung nến.
+    update() nhận một nến đã đóng và trả về dict features (NaN khi chưa đủ warmup)
+    """
+
+    def __init__(self):
+        self.rsi_up = EMA(RSI_WINDOW, alpha=1.0 / RSI_WINDOW)
+        self.rsi_down = EMA(RSI_WINDOW, alpha=1.0 / RSI_WINDOW)
+        self.macd_fast = EMA(MACD_FAST)
+        self.macd_slow = EMA(MACD_SLOW)
+        self.macd_signal = EMA(MACD_SIGNAL)
+        self.emas = {window: EMA(window) for window in EMA_WINDOWS}
+        self.smas = {window: RollingSum(window) for window in SMA_WINDOWS}
+        self.bb_closes = deque(maxlen=BB_WINDOW)
+        self.bb_sum = RollingSum(BB_WINDOW)
+        self.volume_sum = RollingSum(VOLUME_SMA_WINDOW)
+        self.vwap_pv = RollingSum(VWAP_WINDOW)
+        self.vwap_volume = RollingSum(VWAP_WINDOW)
+        self.closes = deque(maxlen=max(MOMENTUM_WINDOWS) + 1)
+        self.bars = 0
+        self.last = None
+
+    def update(self, high, low, close, volume):
+        """
+        Cập nhật với một nến đã đóng
+
+        Returns:
+            dict tên feature -> giá trị (cùng tên cột với add_technical_indicators)
+        """
+        features = {}
+        previous_close = self.closes[-1] if self.closes else None
+        self.closes.append(close)
+        self.bars += 1
+
+        # 1. RSI (Wilder smoothing, nến đầu tiên có diff = 0)
+        diff = close - previous_close if previous_close is not None else 0.0
+        up = self.rsi_up.update(diff if diff > 0 else 0.0)
+        down = self.rsi_down.update(-diff if diff < 0 else 0.0)
+        if down == 0:
+            features['RSI'] = 100.0
+        else:
+            features['RSI'] = 100 - 100 / (1 + up / down)
+
+        # 2. MACD - signal là EMA của MACD, bắt đầu từ giá trị MACD hợp lệ đầu tiên
+        fast = self.macd_fast.update(close)
+        slow = self.macd_slow.update(close)
+        macd = fast - slow
+        signal = self.macd_signal.update(macd) if not math.isnan(macd) else NAN
+        features['MACD'] = macd
+        features['MACD_signal'] = signal
+        features['MACD_diff'] = macd - signal
+
+        # 3. Bollinger Bands (độ lệch chuẩn ddof=0)
+        self.bb_closes.append(close)
+        total = self.bb_sum.update(close)
+        if math.isnan(total):
+            mid = std = NAN
+        else:
+            mid = total / BB_WINDOW
+            std = math.sqrt(sum((x - mid) ** 2 for x in self.bb_closes) / BB_WINDOW)
+        features['BB_high'] = mid + 2 * std
+        features['BB_mid'] = mid
+        features['BB_low'] = mid - 2 * std
+        features['BB_width'] = features['BB_high'] - features['BB_low']
+        width = features['BB_width']
+        features['BB_position'] = (close - features['BB_low']) / width if width else NAN
+
+        # 4. EMA
+        for window, ema in self.emas.items():
+            features[f'EMA_{window}'] = ema.update(close)
+
+        # 5. Volume + VWAP
+        volume_sma = self.volume_sum.update(volume) / VOLUME_SMA_WINDOW
+        features['volume_sma'] = volume_sma
+        features['volume_ratio'] = volume / volume_sma if volume_sma else NAN
+        typical_price = (high + low + close) / 3.0
+        total_pv = self.vwap_pv.update(typical_price * volume)
+        total_volume = self.vwap_volume.update(volume)
+        features['VWAP'] = total_pv / total_volume if total_volume else NAN
+
+        # 6. Momentum
+        for window in MOMENTUM_WINDOWS:
+            if len(self.closes) > window:
+                features[f'momentum_{window}d'] = close / self.closes[-1 - window] - 1
+            else:
+                features[f'momentum_{window}d'] = NAN
+
+        # 7. SMA
+        for window, rolling in self.smas.items():
+            features[f'SMA{window}'] = rolling.update(close) / window
+
+        self.last = features
+        return features
+
+    @property
+    def ready(self):
+        """Đã đủ warmup cho mọi chỉ báo"""
+        return self.last is not None and not any(math.isnan(v) for v in self.last.values())
+
+    @classmethod
+    def from_frame(cls, df):
+        """
+        Khởi tạo trạng thái từ lịch sử nến (DataFrame time/open/high/low/close/volume)
+        """
+        state = cls()
+        for high, low, close, volume in zip(df['high'].to_numpy(), df['low'].to_numpy(),
+                                            df['close'].to_numpy(), df['volume'].to_numpy()):
+            state.update(float(high), float(low), float(close), float(volume))
+        return state
@@ -0,0 +1,291 @@
+"""
+Instrumentation - đo thời gian từng stage của pipeline (span), histogram theo stage và counter
+
+- span('quote_history') (context manager) / @timed('financial_ratios') (decorator)
+- Histogram thời gian theo stage + counter (vd cache hit/miss) trong process, export dạng
+  Prometheus text (HTTP endpoint AI_METRICS_PORT) hoặc file JSON (AI_METRICS_FILE)
+- collect_timings(): gom thời gian các stage của một request (trường `timings` trong response)
+
+Khi AI_METRICS=0 (mặc định) và không có collect_timings đang chạy, span chỉ tốn một lần đọc
+contextvar rồi trả về context rỗng dùng chung
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+import functools
+from contextlib import contextmanager
+from contextvars import ContextVar
+from collections import defaultdict
+
+METRICS_ENABLED = os.getenv('AI_METRICS', '0') == '1'
+METRICS_PORT = int(os.getenv('AI_METRICS_PORT', 0))
+METRICS_FILE = os.getenv('AI_METRICS_FILE')
+METRICS_FILE_INTERVAL = float(os.getenv('AI_METRICS_FILE_INTERVAL', 15))
+
+# Bucket (giây) của histogram, giống mặc định của client Prometheus + các mức dài cho fetch mạng
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_timings = ContextVar('timings', default=None)
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ('stage', 'timings', 'start')
+
+    def __init__(self, stage, timings):
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        if METRICS_ENABLED:
+            _registry.observe(self.stage, elapsed)
+        if self.timings is not None:
+            self.timings[self.stage] = round(self.timings.get(self.stage, 0.0) + elapsed * 1000, 3)
+        return False
+
+
+class Registry:
+    """Histogram theo stage + counter có label, thread-safe"""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}  # stage -> [bucket counts..., +Inf count, sum]
+        self._counters = defaultdict(float)  # (name, labels tuple) -> value
+        self._collectors = []
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = [0] * (len(self.buckets) + 1) + [0.0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[i] += 1
+                    break
+            else:
+                histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+
+    def increment(self, name, value=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += value
+
+    def register_collector(self, collector):
+        """collector() -> list (name, labels dict, value) được đọc lúc export (vd thống kê của cache)"""
+        self._collectors.append(collector)
+
+    def _collected(self):
+        samples = []
+        for collector in self._collectors:
+            try:
+                samples.extend(collector())
+            except Exception as e:
+                log(f"⚠ Metrics collector error: {e}")
+        return samples
+
+    def snapshot(self):
+        """
+        Returns:
+            dict {stages: {stage: {count, sum_ms, mean_ms, p50_ms, p95_ms, buckets}}, counters: [...]}
+        """
+        with self._lock:
+            histograms = {stage: list(values) for stage, values in self._histograms.items()}
+            counters = dict(self._counters)
+
+        stages = {}
+        for stage, values in sorted(histograms.items()):
+            counts, total = values[:-1], values[-1]
+            n = sum(counts)
+            stages[stage] = {
+                'count': n,
+                'sum_ms': round(total * 1000, 3),
+                'mean_ms': round(total * 1000 / n, 3) if n else None,
+                'p50_ms': self._quantile(counts, n, 0.5),
+                'p95_ms': self._quantile(counts, n, 0.95),
+                'buckets': {str(bound): count for bound, count in zip(self.buckets + ('+Inf',), counts)},
+            }
+        samples = [{'name': name, 'labels': dict(labels), 'value': value}
+                   for (name, labels), value in sorted(counters.items())]
+        samples += [{'name': name, 'labels': labels, 'value': value} for name, labels, value in self._collected()]
+        return {'stages': stages, 'counters': samples}
+
+    def _quantile(self, counts, n, q):
+        """Cận trên (ms) của bucket chứa quantile q"""
+        if not n:
+            return None
+        target, cumulative = q * n, 0
+        for bound, count in zip(self.buckets, counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound * 1000
+        return None
+
+    def prometheus_text(self, prefix='ai'):
+        """Định dạng Prometheus text exposition"""
+        with self._lock:
+            histograms = {stage: list(values) for stage, values in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = [f'# TYPE {prefix}_stage_duration_seconds histogram']
+        for stage, values in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values[:-1]):
+                cumulative += count
+                lines.append(f'{prefix}_stage_duration_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_stage_duration_seconds_sum{{stage="{stage}"}} {values[-1]:.6f}')
+            lines.append(f'{prefix}_stage_duration_seconds_count{{stage="{stage}"}} {cumulative}')
+
+        samples = [(name, dict(labels), value) for (name, labels), value in sorted(counters.items())]
+        samples += self._collected()
+        declared = set()
+        for name, labels, value in samples:
+            metric = f'{prefix}_{name}'
+            if metric not in declared:
+                lines.append(f'# TYPE {metric} {"counter" if name.endswith("_total") else "gauge"}')
+                declared.add(metric)
+            label_text = ','.join(f'{key}="{val}"' for key, val in labels.items())
+            lines.append(f'{metric}{{{label_text}}} {value}' if label_text else f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+_registry = Registry()
+
+
+def get_registry():
+    return _registry
+
+
+def span(stage):
+    """
+    Đo thời gian một stage:
+
+        with span('quote_history'):
+            df = quote.history(...)
+    """
+    timings = _timings.get()
+    if timings is None and not METRICS_ENABLED:
+        return _NOOP
+    return _Span(stage, timings)
+
+
+def timed(stage):
+    """Decorator: đo toàn bộ thời gian chạy của hàm như một stage"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def increment(name, value=1, **labels):
+    """Tăng counter (chỉ khi AI_METRICS=1)"""
+    if METRICS_ENABLED:
+        _registry.increment(name, value, **labels)
+
+
+@contextmanager
+def collect_timings(enabled=True):
+    """
+    Gom thời gian (ms) các stage chạy trong block này (cùng thread / context):
+
+        with collect_timings() as timings:
+            result = get_prediction_data(symbol)
+        result = {**result, 'timings': timings}
+
+    enabled=False: không đo gì, yield dict rỗng (để caller không phải rẽ nhánh)
+    """
+    timings = {}
+    if not enabled:
+        yield timings
+        return
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
+
+
+def write_metrics_file(path=METRICS_FILE):
+    """Ghi snapshot metrics ra file JSON (tmp + rename)"""
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(dict(_registry.snapshot(), pid=os.getpid(), written_at=time.time()), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def start_exporters(port=METRICS_PORT, path=METRICS_FILE, interval=METRICS_FILE_INTERVAL):
+    """
+    Khởi động export nền (khi AI_METRICS=1):
+    - port: HTTP endpoint /metrics (Prometheus text) và /metrics.json
+    - path: file JSON được ghi lại mỗi `interval` giây
+    """
+    if not METRICS_ENABLED:
+        return
+    if port:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    body, content_type = json.dumps(_registry.snapshot()).encode(), 'application/json'
+                elif self.path.startswith('/metrics'):
+                    body, content_type = _registry.prometheus_text().encode(), 'text/plain; version=0.0.4'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('0.0.0.0', port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        log(f"📈 Metrics endpoint on :{port}/metrics")
+
+    if path:
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_metrics_file(path)
+                except OSError as e:
+                    log(f"⚠ Could not write metrics file: {e}")
+        threading.Thread(target=run, name='metrics-file', daemon=True).start()
+        log(f"📈 Writing metrics to {path} every {interval:.0f}s")
@@ -0,0 +1,357 @@
+"""
+Model Artifact - định dạng lưu model gọn, load nhanh, có version
+Thay cho joblib pickle (model_{symbol}_advanced.pkl / _simple.pkl / features_{symbol}.pkl)
+
+Cấu trúc một artifact (thư mục):
+    models/artifacts/{name}/
+        manifest.json                 - format_version, features, metadata, metrics, danh sách models
+        advanced-{version}.ubj        - XGBoost booster (định dạng native UBJSON)
+        simple-{version}.json         - Linear Regression (coef + intercept)
+
+Đọc manifest.json không cần import xgboost/sklearn; model chỉ được load khi predict lần đầu.
+Mỗi lần lưu ghi file model mới (tên theo version) rồi mới thay manifest (atomic), nên reader luôn thấy
+trọn một bản: bản cũ (manifest cũ + file cũ) hoặc bản mới. File của bản trước nữa mới bị xoá.
+"""
+
+import os
+import json
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+ARTIFACT_FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+MODELS_DIR = os.getenv('AI_MODELS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+
+
+def artifact_dir(models_dir, name):
+    """Đường dẫn thư mục artifact (name = symbol hoặc 'pooled')"""
+    return os.path.join(models_dir, 'artifacts', name)
+
+
+def _library_versions():
+    versions = {'numpy': np.__version__}
+    try:
+        import xgboost as xgb
+        versions['xgboost'] = xgb.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+def _save_model(model, path_prefix):
+    """
+    Lưu một estimator theo định dạng native, trả về (kind, filename)
+    """
+    # XGBRegressor / BoosterModel (get_booster) hoặc xgb.Booster trả về từ xgb.train
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    if hasattr(booster, 'save_model'):
+        filename = os.path.basename(path_prefix) + '.ubj'
+        booster.save_model(path_prefix + '.ubj')
+        return 'xgboost', filename
+
+    if hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+        filename = os.path.basename(path_prefix) + '.json'
+        with open(path_prefix + '.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'coef': np.asarray(model.coef_, dtype=np.float64).tolist(),
+                'intercept': float(model.intercept_),
+            }, f)
+        return 'linear', filename
+
+    # Estimator sklearn khác (vd GradientBoostingRegressor khi thiếu XGBoost)
+    import joblib
+    filename = os.path.basename(path_prefix) + '.joblib'
+    joblib.dump(model, path_prefix + '.joblib')
+    return 'joblib', filename
+
+
+def save_artifact(path, models, features, metadata=None, metrics=None):
+    """
+    Lưu models + features + metadata + metrics vào một thư mục artifact
+
+    Args:
+        path: Thư mục artifact (xem artifact_dir)
+        models: dict tên -> estimator, vd {'advanced': xgb_model, 'simple': lr_model}
+        features: Danh sách features theo thứ tự cột
+        metadata: dict thông tin training (symbol, ngày, số mẫu, ...)
+        metrics: dict tên model -> {mae, rmse, r2}
+    """
+    os.makedirs(path, exist_ok=True)
+    try:
+        previous = read_manifest(path)
+    except ValueError:
+        previous = None
+
+    # Tên file theo version: không ghi đè file model mà manifest hiện tại (và reader đang load) trỏ tới
+    version = datetime.now().strftime('%Y%m%d%H%M%S%f')
+    entries = {}
+    for name, model in models.items():
+        if model is None:
+            continue
+        kind, filename = _save_model(model, os.path.join(path, f'{name}-{version}'))
+        entries[name] = {'kind': kind, 'file': filename}
+
+    manifest = {
+        'format_version': ARTIFACT_FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(),
+        'features': list(features),
+        'models': entries,
+        'metadata': metadata or {},
+        'metrics': metrics or {},
+        'libraries': _library_versions(),
+    }
+
+    # Ghi manifest sau cùng, atomic (tmp + rename) để reader không thấy artifact dở dang
+    fd, tmp_path = tempfile.mkstemp(dir=path, suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp_path, os.path.join(path, MANIFEST_FILE))
+
+    _remove_stale_models(path, entries, previous)
+    return manifest
+
+
+def _remove_stale_models(path, entries, previous):
+    """
+    Xoá file model không còn manifest nào trỏ tới; giữ file của bản trước cho reader
+    vừa đọc manifest cũ và chưa kịp load model
+    """
+    keep = {entry['file'] for entry in entries.values()}
+    if previous is not None:
+        keep.update(entry.get('file') for entry in previous.get('models', {}).values())
+    for filename in os.listdir(path):
+        if filename == MANIFEST_FILE or filename in keep:
+            continue
+        if filename.endswith(('.ubj', '.json', '.joblib')):
+            try:
+                os.remove(os.path.join(path, filename))
+            except OSError:
+                pass
+
+
+def read_manifest(path):
+    """
+    Đọc manifest (features, metadata, metrics) mà không load model
+
+    Returns:
+        dict hoặc None nếu không có artifact
+    """
+    manifest_path = os.path.join(path, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('format_version', 0) > ARTIFACT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format version {manifest['format_version']} at {path}")
+    return manifest
+
+
+def list_artifacts(models_dir):
+    """Danh sách (name, manifest) của mọi artifact trong models_dir"""
+    root = os.path.join(models_dir, 'artifacts')
+    if not os.path.isdir(root):
+        return []
+    result = []
+    for name in sorted(os.listdir(root)):
+        manifest = read_manifest(os.path.join(root, name))
+        if manifest is not None:
+            result.append((name, manifest))
+    return result
+
+
+class BoosterModel:
+    """XGBoost booster load từ file native, predict bằng inplace_predict (không cần DMatrix)"""
+
+    def __init__(self, path, features):
+        import xgboost as xgb
+        self.booster = xgb.Booster()
+        self.booster.load_model(path)
+        self.features = features
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float32)
+        return self.booster.inplace_predict(X, validate_features=False)
+
+    def get_booster(self):
+        return self.booster
+
+    @property
+    def feature_importances_(self):
+        # Giống XGBRegressor.feature_importances_ (importance_type='gain', chuẩn hoá tổng = 1)
+        scores = self.booster.get_score(importance_type='gain')
+        names = self.booster.feature_names or [f'f{i}' for i in range(len(self.features))]
+        values = np.array([scores.get(name, 0.0) for name in names], dtype=np.float32)
+        total = values.sum()
+        return values / total if total > 0 else values
+
+
+class LinearModel:
+    """Linear Regression chỉ cần NumPy"""
+
+    def __init__(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            params = json.load(f)
+        self.coef_ = np.asarray(params['coef'], dtype=np.float64)
+        self.intercept_ = params['intercept']
+
+    def predict(self, X):
+        return np.asarray(X, dtype=np.float64) @ self.coef_ + self.intercept_
+
+
+class ModelArtifact:
+    """
+    Artifact đã đọc manifest; từng model chỉ được load (và cache) khi gọi get_model()
+    """
+
+    def __init__(self, path, manifest):
+        self.path = path
+        self.manifest = manifest
+        self._models = {}
+
+    @property
+    def features(self):
+        return self.manifest['features']
+
+    @property
+    def metadata(self):
+        return self.manifest.get('metadata', {})
+
+    @property
+    def metrics(self):
+        return self.manifest.get('metrics', {})
+
+    def has_model(self, name):
+        return name in self.manifest.get('models', {})
+
+    def get_model(self, name='advanced'):
+        if name not in self._models:
+            entry = self.manifest['models'][name]
+            file_path = os.path.join(self.path, entry['file'])
+            if entry['kind'] == 'xgboost':
+                self._models[name] = BoosterModel(file_path, self.features)
+            elif entry['kind'] == 'linear':
+                self._models[name] = LinearModel(file_path)
+            else:
+                import joblib
+                self._models[name] = joblib.load(file_path)
+        return self._models[name]
+
+    def quantile_model(self):
+        """(model, quantiles) của quantile head hoặc (None, None)"""
+        if not self.has_model('quantile'):
+            return None, None
+        return self.get_model('quantile'), self.metrics.get('quantile', {}).get('quantiles')
+
+    def horizon_model(self):
+        """(model, horizons) của booster nhiều horizon hoặc (None, None)"""
+        if not self.has_model('horizons'):
+            return None, None
+        return self.get_model('horizons'), self.metrics.get('horizons', {}).get('horizons')
+
+
+# Artifact đã mở (load_artifact / preload_artifacts): path -> (mtime của manifest, ModelArtifact).
+# Booster load lazy nên mỗi process chỉ load mỗi model một lần cho tới khi manifest đổi.
+# Worker pool preload ở process master, các process con dùng chung bộ nhớ này (copy-on-write sau fork)
+_artifacts = {}
+
+
+def _manifest_mtime(path):
+    return os.stat(os.path.join(path, MANIFEST_FILE)).st_mtime_ns
+
+
+def preload_artifacts(models_dir):
+    """
+    Load sẵn mọi artifact trong models_dir cùng toàn bộ model của chúng; sau đó load_artifact trả về
+    bản đã load (artifact được train lại - manifest đổi mtime - thì đọc lại từ đĩa như bình thường)
+
+    Returns:
+        Số model đã load
+    """
+    loaded = 0
+    for name, manifest in list_artifacts(models_dir):
+        path = artifact_dir(models_dir, name)
+        artifact = ModelArtifact(path, manifest)
+        for model_name in manifest.get('models', {}):
+            artifact.get_model(model_name)
+            loaded += 1
+        _artifacts[path] = (_manifest_mtime(path), artifact)
+    return loaded
+
+
+def load_artifact(path):
+    """
+    Mở artifact (chỉ đọc manifest). Trả về None nếu không tồn tại
+
+    Cache theo (path, mtime của manifest): gọi lại trả về cùng instance (các booster đã load),
+    artifact được train lại - manifest đổi mtime - thì đọc lại từ đĩa
+    """
+    try:
+        mtime = _manifest_mtime(path)
+    except OSError:
+        _artifacts.pop(path, None)
+        return None
+    cached = _artifacts.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+    manifest = read_manifest(path)
+    if manifest is None:
+        return None
+    artifact = ModelArtifact(path, manifest)
+    _artifacts[path] = (mtime, artifact)
+    return artifact
+
+
+def load_symbol_models(models_dir, symbol):
+    """
+    Load (advanced_model, simple_model, features) cho một mã
+
+    Ưu tiên artifact mới; fallback sang file joblib cũ nếu chưa migrate.
+    simple_model có thể là None.
+
+    Raises:
+        FileNotFoundError nếu không có model nào cho symbol
+    """
+    artifact = load_artifact(artifact_dir(models_dir, symbol))
+    if artifact is not None:
+        simple = artifact.get_model('simple') if artifact.has_model('simple') else None
+        return artifact.get_model('advanced'), simple, artifact.features
+
+    advanced_path = os.path.join(models_dir, f'model_{symbol}_advanced.pkl')
+    if not os.path.exists(advanced_path):
+        raise FileNotFoundError(f"No model found for {symbol} in {models_dir}")
+
+    import joblib
+    simple_path = os.path.join(models_dir, f'model_{symbol}_simple.pkl')
+    simple = joblib.load(simple_path) if os.path.exists(simple_path) else None
+    features = joblib.load(os.path.join(models_dir, f'features_{symbol}.pkl'))
+    return joblib.load(advanced_path), simple, features
+
+
+def has_symbol_model(models_dir, symbol):
+    """Kiểm tra mã đã có model (artifact hoặc pickle cũ) mà không load"""
+    return (os.path.exists(os.path.join(artifact_dir(models_dir, symbol), MANIFEST_FILE))
+            or os.path.exists(os.path.join(models_dir, f'model_{symbol}_advanced.pkl')))
+
+
+def load_quantile_model(models_dir, name):
+    """
+    Load quantile model (một booster nhiều output) của artifact nếu có
+
+    Returns:
+        (model, quantiles) hoặc (None, None)
+    """
+    artifact = load_artifact(artifact_dir(models_dir, name))
+    return artifact.quantile_model() if artifact is not None else (None, None)
+
+
+def load_horizon_model(models_dir, name):
+    """
+    Load model nhiều horizon (một booster nhiều output) của artifact nếu có
+
+    Returns:
+        (model, horizons) hoặc (None, None)
+    """
+    artifact = load_artifact(artifact_dir(models_dir, name))
+    return artifact.horizon_model() if artifact is not None else (None, None)
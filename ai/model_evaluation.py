@@ -0,0 +1,162 @@
+"""
+Model Evaluation - đánh giá out-of-sample dạng vector hoá
+Dự đoán cả cửa sổ đánh giá trong một lần predict, metrics tính bằng phép toán mảng,
+chạy song song cho toàn bộ các mã đã train (dùng làm gate trước khi promote model)
+"""
+
+import os
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from trading_calendar import trading_days_between
+from model_artifact import list_artifacts, read_manifest, artifact_dir, load_symbol_models, MODELS_DIR
+
+# Số phiên đánh giá khi model không có metadata ngày train (pickle cũ)
+EVAL_WINDOW = 20
+EVAL_WORKERS = int(os.getenv('AI_EVAL_WORKERS', 8))
+
+
+def regression_metrics(actual, predicted, previous_close):
+    """
+    MAE, RMSE và directional accuracy (đúng chiều tăng/giảm so với giá hôm trước)
+
+    Args:
+        actual: np.ndarray giá thực tế ngày t+1
+        predicted: np.ndarray giá dự đoán ngày t+1
+        previous_close: np.ndarray giá đóng cửa ngày t
+    """
+    actual = np.asarray(actual, dtype=np.float64)
+    predicted = np.asarray(predicted, dtype=np.float64)
+    previous_close = np.asarray(previous_close, dtype=np.float64)
+    errors = actual - predicted
+    return {
+        'mae': float(np.mean(np.abs(errors))),
+        'rmse': float(np.sqrt(np.mean(errors ** 2))),
+        'directional_accuracy': float(np.mean(
+            np.sign(predicted - previous_close) == np.sign(actual - previous_close)
+        )),
+    }
+
+
+def list_trained_symbols(models_dir=MODELS_DIR):
+    """Các mã đã có model riêng (artifact hoặc pickle cũ)"""
+    symbols = {name for name, manifest in list_artifacts(models_dir)
+               if manifest.get('metadata', {}).get('mode', 'symbol') == 'symbol'}
+    if os.path.isdir(models_dir):
+        symbols |= {f[len('model_'):-len('_advanced.pkl')] for f in os.listdir(models_dir)
+                    if f.startswith('model_') and f.endswith('_advanced.pkl')}
+    return sorted(symbols)
+
+
+def load_evaluation_frame(symbol, rows, end_date=None):
+    """
+    Fetch + featurize đúng số phiên cần cho cửa sổ đánh giá.
+    Nến thô lấy qua bar store (chỉ fetch phần còn thiếu), nên chạy lại trong ngày chỉ tốn phần featurize.
+    """
+    from bar_store import fetch_bars
+    from feature_engineering import prepare_features, get_lookback_start_date
+
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+    start_date = get_lookback_start_date(end_date, rows=rows)
+    df_raw = fetch_bars(symbol, start_date, end_date, interval='1D')
+    if df_raw.empty:
+        return None
+
+    return prepare_features(df_raw, symbol, start_date, end_date, inference=True)
+
+
+def evaluate_symbol(symbol, models_dir=MODELS_DIR, df_processed=None, window=None):
+    """
+    Đánh giá advanced + simple model của một mã trên cửa sổ out-of-sample
+
+    Cửa sổ = các phiên sau last_bar_date trong manifest (dữ liệu model chưa thấy);
+    với pickle cũ hoặc khi truyền window thì lấy `window` phiên cuối có Target.
+
+    Returns:
+        dict metrics (advanced / simple / naive) + n_samples, hoặc {'error': ...}
+    """
+    from feature_engineering import build_feature_matrix
+
+    try:
+        model_advanced, model_simple, feature_cols = load_symbol_models(models_dir, symbol)
+    except Exception as e:
+        return {'symbol': symbol, 'error': f'Could not load model: {e}'}
+
+    manifest = read_manifest(artifact_dir(models_dir, symbol)) or {}
+    last_bar_date = manifest.get('metadata', {}).get('last_bar_date')
+
+    if window is None and last_bar_date:
+        rows = len(trading_days_between(last_bar_date, datetime.now())) + 1
+    else:
+        rows = (window or EVAL_WINDOW) + 1
+
+    if df_processed is None:
+        try:
+            df_processed = load_evaluation_frame(symbol, rows)
+        except Exception as e:
+            return {'symbol': symbol, 'error': f'Could not fetch data: {e}'}
+        if df_processed is None:
+            return {'symbol': symbol, 'error': 'No data available'}
+
+    # Chỉ các dòng có Target (giá ngày hôm sau) và sau ngày train cuối cùng
+    mask = df_processed['Target'].notna().to_numpy()
+    if window is None and last_bar_date:
+        mask = mask & (df_processed['time'].astype(str).str[:10] > last_bar_date).to_numpy()
+    else:
+        mask = mask & (np.arange(len(df_processed)) >= len(df_processed) - rows)
+    rows_idx = np.flatnonzero(mask)
+
+    if len(rows_idx) == 0:
+        return {'symbol': symbol, 'error': 'No out-of-sample rows yet'}
+
+    X = build_feature_matrix(df_processed, feature_cols, rows=rows_idx)
+    previous_close = df_processed['close'].to_numpy()[rows_idx]
+
+    # Một lần predict cho toàn bộ cửa sổ
+    result = {
+        'symbol': symbol,
+        'n_samples': int(len(X)),
+        'start': str(df_processed['time'].iloc[rows_idx[0]])[:10],
+        'end': str(df_processed['time'].iloc[rows_idx[-1]])[:10],
+        'advanced': regression_metrics(X.target, model_advanced.predict(X.values), previous_close),
+        # Baseline ngây thơ: giá ngày mai = giá hôm nay
+        'naive': regression_metrics(X.target, previous_close, previous_close),
+    }
+    if model_simple is not None:
+        result['simple'] = regression_metrics(
+            X.target, model_simple.predict(X.values.astype(np.float64)), previous_close
+        )
+
+    # Gate: model chỉ được promote nếu thắng baseline ngây thơ
+    result['promote'] = result['advanced']['mae'] < result['naive']['mae']
+    return result
+
+
+def evaluate_universe(symbols=None, models_dir=MODELS_DIR, max_workers=EVAL_WORKERS, window=None):
+    """
+    Đánh giá song song mọi mã đã train
+
+    Returns:
+        dict symbol -> kết quả evaluate_symbol
+    """
+    symbols = symbols or list_trained_symbols(models_dir)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda s: evaluate_symbol(s, models_dir, window=window), symbols)
+    return {r['symbol']: r for r in results}
+
+
+def print_report(results):
+    """In bảng so sánh cho toàn bộ universe"""
+    print(f"   {'Symbol':<8} {'N':<5} {'MAE adv':<12} {'MAE simple':<12} {'MAE naive':<12} "
+          f"{'Dir acc':<9} {'Promote':<8}")
+    print(f"   {'-'*70}")
+    for symbol, r in results.items():
+        if 'error' in r:
+            print(f"   {symbol:<8} ⚠ {r['error']}")
+            continue
+        simple_mae = f"{r['simple']['mae']:,.0f}" if 'simple' in r else 'N/A'
+        print(f"   {symbol:<8} {r['n_samples']:<5} {r['advanced']['mae']:<12,.0f} {simple_mae:<12} "
+              f"{r['naive']['mae']:<12,.0f} {r['advanced']['directional_accuracy']:<9.1%} "
+              f"{'✅' if r['promote'] else '❌'}")
@@ -10,17 +10,15 @@ def get_ml_libs():
     from sklearn.model_selection import train_test_split
     from sklearn.metrics import mean_absolute_error, mean_squared_error
     import joblib
-    import vnstock
-    return pd, np, LinearRegression, train_test_split, mean_absolute_error, mean_squared_error, joblib, vnstock
+    from data_source import get_data_source
+    return pd, np, LinearRegression, train_test_split, mean_absolute_error, mean_squared_error, joblib, get_data_source()
 
-def fetch_data(symbol, start_date, end_date, vnstock):
+def fetch_data(symbol, start_date, end_date, source):
     """
-    Fetch historical data using vnstock 3.x API
+    Fetch historical data từ data source (AI_DATA_SOURCE)
     """
     print(f"Fetching data for {symbol} from {start_date} to {end_date}...")
-    # Use vnstock 3.x API with Quote class
-    quote = vnstock.Quote(symbol=symbol, source='VCI')
-    df = quote.history(start=start_date, end=end_date, interval='1D')
+    df = source.history(symbol, start_date, end_date, interval='1D')
     return df
 
 def preprocess_data(df, pd):
@@ -74,7 +72,7 @@ if __name__ == "__main__":
     
     print("Loading libraries...")
     try:
-        pd, np, LR, tts, mae, mse, joblib, vnstock = get_ml_libs()
+        pd, np, LR, tts, mae, mse, joblib, source = get_ml_libs()
     except Exception as e:
         print(f"Error loading libraries: {e}")
         sys.exit(1)
@@ -85,7 +83,7 @@ if __name__ == "__main__":
     start_date = (datetime.now() - timedelta(days=365*2)).strftime('%Y-%m-%d') # 2 years of data
     
     # 1. Fetch
-    df_raw = fetch_data(symbol, start_date, end_date, vnstock)
+    df_raw = fetch_data(symbol, start_date, end_date, source)
     
     if df_raw.empty:
         print("No data fetched. Check symbol or internet connection.")
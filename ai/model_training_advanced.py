@@ -9,8 +9,56 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
-# Import vnstock trước để tránh deadlock
-import vnstock
+# Danh sách các mã cổ phiếu phổ biến (Top VN30)
+DEFAULT_SYMBOLS = [
+    # Top 10 by market cap
+    "VCB", "FPT", "HPG", "VIC", "VNM", "TCB", "MSN", "VPB", "MBB", "ACB",
+    # Additional VN30 stocks
+    "VHM", "GAS", "CTG", "BID", "VRE", "PLX", "POW", "SSI", "GVR", "SAB"
+]
+
+TRAINING_DAYS = 365 * 2
+# Nến intraday: nguồn dữ liệu chỉ giữ lịch sử ngắn, và mỗi ngày đã có hàng trăm nến
+INTRADAY_TRAINING_DAYS = 60
+
+# Các mức quantile cho khoảng dự đoán (low / median / high)
+QUANTILES = (0.1, 0.5, 0.9)
+
+# Tham số XGBoost mặc định khi full fit (train_model(model_type='xgboost'))
+XGB_PARAMS = {
+    'n_estimators': 100,
+    'learning_rate': 0.05,
+    'max_depth': 6,
+    'subsample': 0.8,
+    'colsample_bytree': 0.8,
+    'gamma': 0.1,
+    'random_state': 42,
+    'n_jobs': -1,
+    'verbosity': 0
+}
+
+# Retrain tăng dần (--incremental): số cây boost thêm mỗi lần, số phiên đã train được trộn lại (replay)
+# cùng các phiên mới, cửa sổ gần nhất để lấy mẫu replay, số lần update tối đa trước khi bắt buộc full refit,
+# và ngưỡng drift (MAE của model hiện tại trên các phiên mới / MAE test lúc full fit)
+INCREMENTAL_ROUNDS = int(os.getenv('AI_INCREMENTAL_ROUNDS', 5))
+INCREMENTAL_REPLAY = int(os.getenv('AI_INCREMENTAL_REPLAY', 30))
+INCREMENTAL_WINDOW = int(os.getenv('AI_INCREMENTAL_WINDOW', 120))
+MAX_INCREMENTAL_UPDATES = int(os.getenv('AI_MAX_INCREMENTAL_UPDATES', 10))
+DRIFT_MAE_RATIO = float(os.getenv('AI_DRIFT_MAE_RATIO', 2.0))
+
+# Tham số cây khi boost tiếp: giống full fit (XGB_PARAMS, tên theo xgb.train), chỉ khác learning_rate
+# (cao hơn để vài cây vẫn theo kịp mức giá mới - benchmark_incremental_training.py).
+# objective / quantile_alpha / số output đã lưu sẵn trong booster
+INCREMENTAL_PARAMS = {
+    'learning_rate': float(os.getenv('AI_INCREMENTAL_LEARNING_RATE', 0.3)),
+    'max_depth': XGB_PARAMS['max_depth'],
+    'subsample': XGB_PARAMS['subsample'],
+    'colsample_bytree': XGB_PARAMS['colsample_bytree'],
+    'gamma': XGB_PARAMS['gamma'],
+    'seed': XGB_PARAMS['random_state'],
+    'verbosity': XGB_PARAMS['verbosity'],
+}
+
 
 # Lazy imports cho ML libraries
 def get_ml_libs():
@@ -29,36 +77,43 @@ def get_ml_libs():
     return pd, np, GradientBoostingRegressor, LinearRegression, train_test_split, cross_val_score, mean_absolute_error, mean_squared_error, r2_score, StandardScaler, joblib, xgb
 
 
-def fetch_data(symbol, start_date, end_date, vnstock):
+def fetch_data(symbol, start_date, end_date, source=None):
     """
-    Fetch historical data using vnstock 3.x API
+    Fetch historical data từ data source (AI_DATA_SOURCE: vnstock / parquet / synthetic)
     """
+    from data_source import get_data_source
     print(f"📥 Fetching data for {symbol} from {start_date} to {end_date}...")
-    quote = vnstock.Quote(symbol=symbol, source='VCI')
-    df = quote.history(start=start_date, end=end_date, interval='1D')
+    df = (source or get_data_source()).history(symbol, start_date, end_date, interval='1D')
     print(f"✓ Fetched {len(df)} days of data")
     return df
 
 
-def train_model(X, y, model_type='gradient_boosting'):
+def train_model(X, y=None, model_type='gradient_boosting', X_test=None):
     """
     Train model với XGBoost, Gradient Boosting hoặc Linear Regression
     
     Args:
-        X: Features
-        y: Target
+        X: FeatureMatrix (float32, có sẵn target) hoặc DataFrame features
+        y: Target (bỏ qua nếu X là FeatureMatrix)
         model_type: 'xgboost', 'gradient_boosting' hoặc 'linear_regression'
+        X_test: FeatureMatrix test có sẵn (X là tập train). Mặc định lấy 20% dòng cuối của X
     """
     from sklearn.ensemble import GradientBoostingRegressor
     from sklearn.linear_model import LinearRegression
-    from sklearn.model_selection import train_test_split
     from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
     import numpy as np
+    from feature_matrix import FeatureMatrix, DTYPE
     
-    # Split data (80% train, 20% test)
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, random_state=42, shuffle=False
-    )
+    if not isinstance(X, FeatureMatrix):
+        X = FeatureMatrix(np.ascontiguousarray(X, dtype=DTYPE), list(X.columns),
+                          np.ascontiguousarray(y, dtype=DTYPE))
+    
+    # Split data (80% train, 20% test) - view theo thời gian, không copy buffer
+    if X_test is not None:
+        train, test = X, X_test
+    else:
+        train, test = X.split(test_size=0.2)
+    X_train, X_test, y_train, y_test = train.values, test.values, train.target, test.target
     
     print(f"\n🤖 Training {model_type} model...")
     print(f"   Training samples: {len(X_train)}")
@@ -72,17 +127,7 @@ def train_model(X, y, model_type='gradient_boosting'):
             print(f"   ✓ Using Advanced Gradient Boosting (XGBoost)")
             
             # Default XGBoost params
-            xgb_params = {
-                'n_estimators': 100,
-                'learning_rate': 0.05,
-                'max_depth': 6,
-                'subsample': 0.8,
-                'colsample_bytree': 0.8,
-                'gamma': 0.1,
-                'random_state': 42,
-                'n_jobs': -1,
-                'verbosity': 0
-            }
+            xgb_params = dict(XGB_PARAMS)
             
             # Try to load tuned params for xgboost
             params_file = "ai/best_params_xgboost.json"
@@ -145,6 +190,9 @@ def train_model(X, y, model_type='gradient_boosting'):
             
     elif model_type == 'linear_regression':
         model = LinearRegression()
+        # Cây quyết định vốn làm việc trên float32; riêng OLS cần float64
+        # vì các features (SMA/EMA/BB) gần cộng tuyến
+        X_train, X_test = X_train.astype(np.float64), X_test.astype(np.float64)
     
     # Train
     model.fit(X_train, y_train)
@@ -182,64 +230,257 @@ def train_model(X, y, model_type='gradient_boosting'):
     return model, test_mae, test_rmse, test_r2
 
 
-def train_and_save_model(symbol):
+def train_quantile_model(X, quantiles=QUANTILES, X_test=None):
     """
-    Train and save model for a specific symbol
+    Train một XGBoost booster nhiều output cho các quantile (vd 10/50/90) trên cùng FeatureMatrix
+    với point model (cùng buffer float32, cùng cách split) - một lần fit cho mọi quantile
+
+    Returns:
+        (model, metrics) với metrics = {coverage, pinball, width} trên tập test, hoặc (None, {}) nếu thiếu XGBoost
     """
-    print(f"\n{'#'*60}")
-    print(f"🚀 STARTING TRAINING FOR {symbol}")
-    print(f"{'#'*60}")
+    import numpy as np
+    try:
+        import xgboost as xgb
+    except ImportError:
+        print("   ⚠ XGBoost not installed. Skipping quantile model.")
+        return None, {}
     
-    # Imports needed
+    if X_test is not None:
+        train, test = X, X_test
+    else:
+        train, test = X.split(test_size=0.2)
+    
+    print(f"\n📐 Training quantile model ({', '.join(f'{q:.0%}' for q in quantiles)})...")
+    model = xgb.XGBRegressor(
+        objective='reg:quantileerror',
+        quantile_alpha=np.array(quantiles),
+        tree_method='hist',
+        n_estimators=100,
+        learning_rate=0.05,
+        max_depth=6,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42,
+        n_jobs=-1,
+        verbosity=0,
+    )
+    model.fit(train.values, train.target)
+    
+    # Một lần predict cho mọi quantile; sort để tránh quantile bị chéo nhau
+    predicted = np.sort(model.predict(test.values), axis=1)
+    actual = test.target[:, None]
+    alphas = np.array(quantiles)[None, :]
+    errors = actual - predicted
+    metrics = {
+        'quantiles': list(quantiles),
+        # Tỷ lệ giá thực tế nằm trong [quantile thấp nhất, quantile cao nhất]
+        'coverage': float(np.mean((test.target >= predicted[:, 0]) & (test.target <= predicted[:, -1]))),
+        'pinball': float(np.mean(np.maximum(alphas * errors, (alphas - 1) * errors))),
+        'width': float(np.mean(predicted[:, -1] - predicted[:, 0])),
+    }
+    print(f"   Interval coverage: {metrics['coverage']:.1%} (expected {quantiles[-1] - quantiles[0]:.0%}), "
+          f"mean width: {metrics['width']:,.2f}")
+    return model, metrics
+
+
+def train_horizon_model(X, Y, horizons, X_test=None, Y_test=None):
+    """
+    Train một XGBoost booster nhiều output cho các horizon dài (vd 3/5/10 phiên) trên cùng
+    FeatureMatrix với point model (horizon 1 phiên) - một lần fit cho mọi horizon
+
+    Args:
+        X: FeatureMatrix features
+        Y: Ma trận target (n_rows, n_horizons) từ build_horizon_targets
+        horizons: Các horizon theo thứ tự cột của Y
+
+    Returns:
+        (model, metrics) với metrics = {horizons, mae theo horizon} trên tập test, hoặc (None, {}) nếu thiếu XGBoost
+    """
+    import numpy as np
     try:
-        from feature_engineering import prepare_features, get_feature_columns
-        import joblib
-    except ImportError as e:
-        print(f"❌ Import Error: {e}")
-        return False
-        
-    end_date = datetime.now().strftime('%Y-%m-%d')
-    start_date = (datetime.now() - timedelta(days=365*2)).strftime('%Y-%m-%d')
+        import xgboost as xgb
+    except ImportError:
+        print("   ⚠ XGBoost not installed. Skipping multi-horizon model.")
+        return None, {}
+    
+    if X_test is None:
+        X, X_test = X.split(test_size=0.2)
+        Y, Y_test = Y[:len(X)], Y[len(X):]
+    
+    # Các phiên cuối chưa có giá sau h phiên -> bỏ khỏi train / test
+    train_rows = np.flatnonzero(np.isfinite(Y).all(axis=1))
+    test_rows = np.flatnonzero(np.isfinite(Y_test).all(axis=1))
+    if len(train_rows) == 0 or len(test_rows) == 0:
+        print("   ⚠ Not enough rows with long-horizon targets. Skipping multi-horizon model.")
+        return None, {}
+    
+    print(f"\n🔭 Training multi-horizon model ({', '.join(f'{h}d' for h in horizons)})...")
+    model = xgb.XGBRegressor(
+        tree_method='hist',
+        n_estimators=100,
+        learning_rate=0.05,
+        max_depth=6,
+        subsample=0.8,
+        colsample_bytree=0.8,
+        random_state=42,
+        n_jobs=-1,
+        verbosity=0,
+    )
+    model.fit(X.values[train_rows], Y[train_rows])
+    
+    # Một lần predict cho mọi horizon
+    predicted = model.predict(X_test.values[test_rows]).reshape(len(test_rows), -1)
+    mae = np.mean(np.abs(Y_test[test_rows] - predicted), axis=0)
+    metrics = {
+        'horizons': list(horizons),
+        'mae': {f'{h}d': float(value) for h, value in zip(horizons, mae)},
+    }
+    print("   Test MAE: " + ", ".join(f"{name}: {value:,.4g}" for name, value in metrics['mae'].items()))
+    return model, metrics
+
+
+def continue_booster(model, values, target, rounds=INCREMENTAL_ROUNDS):
+    """
+    Boost tiếp `rounds` cây từ booster hiện có trên dữ liệu mới (continuation qua xgb_model)
+    thay vì fit lại từ đầu. Dùng được cho point / quantile / nhiều horizon vì objective và số output
+    nằm trong booster
+
+    Args:
+        model: XGBRegressor, BoosterModel (artifact) hoặc xgb.Booster
+        values: Ma trận features float32
+        target: Target (n_rows,) hoặc (n_rows, n_outputs)
+
+    Returns:
+        xgb.Booster mới (booster cũ giữ nguyên)
+    """
+    import xgboost as xgb
+    booster = model.get_booster() if hasattr(model, 'get_booster') else model
+    dtrain = xgb.DMatrix(values, label=target)
+    return xgb.train(INCREMENTAL_PARAMS, dtrain, num_boost_round=rounds, xgb_model=booster)
+
+
+def incremental_rows(new_rows, replay=INCREMENTAL_REPLAY, seed=42):
+    """
+    Các dòng dùng để boost tiếp: toàn bộ phiên mới + tối đa `replay` phiên đã train (lấy ngẫu nhiên
+    trong các dòng đứng trước phiên mới đầu tiên) để cây mới không chỉ khớp vài phiên gần nhất
+
+    Args:
+        new_rows: Chỉ số (tăng dần) các dòng chưa được train
+
+    Returns:
+        np.ndarray chỉ số dòng, tăng dần
+    """
+    import numpy as np
+    new_rows = np.asarray(new_rows)
+    seen = np.arange(new_rows[0]) if len(new_rows) else np.arange(0)
+    sample = np.random.default_rng(seed).choice(seen, size=min(replay, len(seen)), replace=False)
+    return np.sort(np.concatenate([sample, new_rows]).astype(np.intp))
+
+
+def load_symbol_features(symbol, start_date, end_date, interval='1D'):
+    """
+    Fetch dữ liệu + tính toàn bộ features cho một mã
+
+    Args:
+        interval: '1D' (mặc định) hoặc nến intraday '1m' / '5m' / '15m' (qua bar store)
+
+    Returns:
+        DataFrame đã xử lý, hoặc None nếu lỗi / không có dữ liệu
+    """
+    from feature_engineering import prepare_features, prepare_intraday_features
     
     # 1. Fetch raw data
     try:
-        df_raw = fetch_data(symbol, start_date, end_date, vnstock)
+        if interval == '1D':
+            df_raw = fetch_data(symbol, start_date, end_date)
+        else:
+            from bar_store import fetch_bars
+            print(f"📥 Fetching {interval} bars for {symbol} from {start_date} to {end_date}...")
+            df_raw = fetch_bars(symbol, start_date, end_date, interval=interval)
+            print(f"✓ Loaded {len(df_raw)} {interval} bars")
     except Exception as e:
         print(f"❌ Error fetching data for {symbol}: {e}")
-        return False
+        return None
 
     if df_raw.empty:
         print(f"❌ No data fetched for {symbol}. Skipping...")
-        return False
+        return None
     
     # 2. Prepare features (technical indicators, ratios, macro data)
     try:
-        df_processed = prepare_features(df_raw, symbol, start_date, end_date, vnstock)
+        if interval == '1D':
+            df_processed = prepare_features(df_raw, symbol, start_date, end_date)
+        else:
+            df_processed = prepare_intraday_features(df_raw)
     except Exception as e:
         print(f"❌ Error preparing features for {symbol}: {e}")
-        return False
+        return None
     
     if df_processed.empty:
         print(f"❌ Feature preparation failed for {symbol}. Skipping...")
+        return None
+    
+    return df_processed
+
+
+def train_and_save_model(symbol, interval='1D'):
+    """
+    Train and save model for a specific symbol
+
+    Args:
+        interval: '1D' hoặc nến intraday ('1m' / '5m' / '15m') -> artifact '<symbol>_<interval>'
+    """
+    print(f"\n{'#'*60}")
+    print(f"🚀 STARTING TRAINING FOR {symbol}" + (f" ({interval})" if interval != '1D' else ''))
+    print(f"{'#'*60}")
+    
+    # Imports needed
+    try:
+        from feature_engineering import (
+            HORIZONS, get_feature_columns, build_feature_matrix, build_horizon_targets
+        )
+        from model_artifact import save_artifact, artifact_dir, MODELS_DIR
+        from model_monitor import feature_stats
+    except ImportError as e:
+        print(f"❌ Import Error: {e}")
+        return False
+        
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    training_days = TRAINING_DAYS if interval == '1D' else INTRADAY_TRAINING_DAYS
+    start_date = (datetime.now() - timedelta(days=training_days)).strftime('%Y-%m-%d')
+    
+    # 1-2. Fetch raw data + prepare features
+    df_processed = load_symbol_features(symbol, start_date, end_date, interval=interval)
+    if df_processed is None:
         return False
     
-    # 3. Get feature columns
+    # 3. Get feature columns -> ma trận float32 liên tục (đưa thẳng vào XGBoost)
     feature_cols = get_feature_columns(df_processed)
-    X = df_processed[feature_cols]
-    y = df_processed['Target']
+    X = build_feature_matrix(df_processed, feature_cols)
     
     print(f"\n✓ Dataset ready for {symbol}:")
     print(f"   Total samples: {len(X)}")
     print(f"   Features: {len(feature_cols)}")
     
     # 4. Train XGBoost model (Advanced Gradient Boosting)
-    model_gb, mae_gb, rmse_gb, r2_gb = train_model(X, y, model_type='xgboost')
+    model_gb, mae_gb, rmse_gb, r2_gb = train_model(X, model_type='xgboost')
     
     # 5. Train Linear Regression for comparison
     print("\n" + "="*60)
     print("📊 COMPARISON WITH LINEAR REGRESSION")
     print("="*60)
-    model_lr, mae_lr, rmse_lr, r2_lr = train_model(X, y, model_type='linear_regression')
+    model_lr, mae_lr, rmse_lr, r2_lr = train_model(X, model_type='linear_regression')
+    
+    # Khoảng dự đoán: quantile model trên cùng feature matrix
+    model_q, metrics_q = train_quantile_model(X)
+    
+    # Nhiều horizon (3/5/10 phiên): booster nhiều output trên cùng feature matrix,
+    # horizon 1 phiên là model advanced
+    model_h, metrics_h = None, {}
+    if interval == '1D':
+        long_horizons = [h for h in HORIZONS if h > 1]
+        model_h, metrics_h = train_horizon_model(X, build_horizon_targets(df_processed, long_horizons),
+                                                 long_horizons)
     
     # Compare models
     print(f"\n🏆 MODEL COMPARISON ({symbol}):")
@@ -254,32 +495,51 @@ def train_and_save_model(symbol):
     print(f"   {'R² Score':<15} {r2_gb:<18.4f} {r2_lr:<18.4f} {r2_improvement:+.1f}%")
     
     # 6. Save models
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    models_dir = os.path.join(current_dir, 'models')
+    models_dir = MODELS_DIR
     os.makedirs(models_dir, exist_ok=True)
     
-    model_path_gb = os.path.join(models_dir, f"model_{symbol}_advanced.pkl")
-    model_path_lr = os.path.join(models_dir, f"model_{symbol}_simple.pkl")
-    
-    joblib.dump(model_gb, model_path_gb)
-    joblib.dump(model_lr, model_path_lr)
-    
-    # Save feature columns for later use
-    feature_path = os.path.join(models_dir, f"features_{symbol}.pkl")
-    joblib.dump(feature_cols, feature_path)
+    # Một artifact: XGBoost booster native + LR + features + metadata + metrics
+    artifact_path = artifact_dir(models_dir, symbol if interval == '1D' else f'{symbol}_{interval}')
+    save_artifact(
+        artifact_path,
+        models={'advanced': model_gb, 'simple': model_lr, 'quantile': model_q, 'horizons': model_h},
+        features=feature_cols,
+        metadata={
+            'symbol': symbol,
+            'mode': 'symbol' if interval == '1D' else 'intraday',
+            'interval': interval,
+            'target': 'price',
+            'start_date': start_date,
+            'end_date': end_date,
+            'last_bar_date': str(df_processed.iloc[-1]['time'])[:10],
+            'last_bar_time': str(df_processed.iloc[-1]['time']),
+            'n_samples': len(X),
+            'advanced_type': type(model_gb).__name__,
+            'simple_type': type(model_lr).__name__,
+            'last_full_fit': end_date,
+            'incremental_updates': 0,
+            'horizon_incremental_updates': 0,
+            'horizon_skipped_updates': 0,
+            'feature_stats': feature_stats(X.values),
+        },
+        metrics={
+            'advanced': {'mae': float(mae_gb), 'rmse': float(rmse_gb), 'r2': float(r2_gb)},
+            'simple': {'mae': float(mae_lr), 'rmse': float(rmse_lr), 'r2': float(r2_lr)},
+            'quantile': metrics_q,
+            'horizons': metrics_h,
+        },
+    )
     
     print(f"\n💾 Models saved for {symbol}:")
-    print(f"   ✓ {model_path_gb}")
-    print(f"   ✓ {model_path_lr}")
-    print(f"   ✓ {feature_path}")
+    print(f"   ✓ {artifact_path}")
     
     # 7. Make prediction for latest data
-    print(f"\n🔮 PREDICTION FOR NEXT DAY ({symbol}):")
+    print(f"\n🔮 PREDICTION FOR NEXT {'DAY' if interval == '1D' else 'BAR'} ({symbol}):")
     print(f"   {'-'*40}")
     
-    latest_features = X.iloc[-1:].values
+    latest_features = X.values[-1:]
     prediction_gb = model_gb.predict(latest_features)[0]
-    prediction_lr = model_lr.predict(latest_features)[0]
+    prediction_lr = model_lr.predict(latest_features.astype('float64'))[0]
     latest_close = df_processed.iloc[-1]['close']
     
     print(f"   Latest Close Price: {latest_close:,.0f} VND")
@@ -288,6 +548,274 @@ def train_and_save_model(symbol):
     
     return True
 
+def _full_refit_reason(artifact):
+    """Lý do phải full refit thay vì update tăng dần (None nếu update được)"""
+    if artifact is None:
+        return 'no trained model'
+    metadata = artifact.metadata
+    if metadata.get('mode') != 'symbol' or 'last_bar_time' not in metadata:
+        return 'model has no last trained bar'
+    if artifact.manifest['models'].get('advanced', {}).get('kind') != 'xgboost':
+        return 'model is not an XGBoost booster'
+    if metadata.get('incremental_updates', 0) >= MAX_INCREMENTAL_UPDATES:
+        return f'{MAX_INCREMENTAL_UPDATES} incremental updates since last full fit'
+    return None
+
+
+def incremental_update(symbol):
+    """
+    Retrain tăng dần model ngày của một mã: chỉ fetch + tính features cho các phiên mới
+    (kèm INCREMENTAL_WINDOW phiên gần nhất + warmup chỉ báo), rồi boost tiếp các booster hiện có
+    (advanced / quantile / horizons) trên các phiên mới + INCREMENTAL_REPLAY phiên cũ trong cửa sổ
+    (incremental_rows). Linear Regression giữ nguyên
+
+    Full refit (train_and_save_model) khi chưa có model, model không phải booster, đã update
+    MAX_INCREMENTAL_UPDATES lần, features thay đổi, hoặc drift: MAE của model hiện tại trên các phiên mới
+    vượt DRIFT_MAE_RATIO x MAE test lúc full fit
+
+    Returns:
+        'incremental' / 'full' / 'up_to_date', hoặc False nếu lỗi
+    """
+    import numpy as np
+    import pandas as pd
+    from feature_engineering import get_lookback_start_date, build_feature_matrix, build_horizon_targets
+    from model_artifact import load_artifact, save_artifact, artifact_dir, MODELS_DIR
+    
+    def full_refit(reason):
+        print(f"   ↻ Full refit for {symbol}: {reason}")
+        return 'full' if train_and_save_model(symbol) else False
+    
+    models_dir = MODELS_DIR
+    path = artifact_dir(models_dir, symbol)
+    artifact = load_artifact(path)
+    reason = _full_refit_reason(artifact)
+    if reason:
+        return full_refit(reason)
+    
+    metadata = dict(artifact.metadata)
+    print(f"\n🔁 INCREMENTAL UPDATE FOR {symbol} (last trained bar: {metadata['last_bar_date']})")
+    
+    # 1. Chỉ fetch từ (phiên đã train cuối - cửa sổ - warmup) tới hôm nay
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    start_date = get_lookback_start_date(metadata['last_bar_date'], rows=INCREMENTAL_WINDOW)
+    df = load_symbol_features(symbol, start_date, end_date)
+    if df is None:
+        return False
+    if any(col not in df.columns for col in artifact.features):
+        return full_refit('feature set changed')
+    
+    new_rows = np.flatnonzero((pd.to_datetime(df['time']) > pd.Timestamp(metadata['last_bar_time'])).to_numpy())
+    if len(new_rows) == 0:
+        print(f"   ✓ {symbol} is up to date")
+        return 'up_to_date'
+    
+    X = build_feature_matrix(df, artifact.features)
+    new = X.slice_rows(new_rows)
+    rows = incremental_rows(new_rows)
+    update = X.slice_rows(rows)
+    
+    # 2. Drift check: model hiện tại trên các phiên chưa từng thấy
+    recent_mae = float(np.mean(np.abs(artifact.get_model('advanced').predict(new.values) - new.target)))
+    baseline_mae = artifact.metrics.get('advanced', {}).get('mae')
+    print(f"   New bars: {len(new_rows)}, MAE on new bars: {recent_mae:,.2f}"
+          + (f" (full fit test MAE: {baseline_mae:,.2f})" if baseline_mae else ''))
+    if baseline_mae and recent_mae > DRIFT_MAE_RATIO * baseline_mae:
+        return full_refit(f'drift (MAE {recent_mae:,.2f} > {DRIFT_MAE_RATIO}x {baseline_mae:,.2f})')
+    
+    # 3. Boost tiếp từng booster trên các phiên mới + mẫu replay
+    models = {name: artifact.get_model(name) for name in artifact.manifest['models']}
+    models['advanced'] = continue_booster(models['advanced'], update.values, update.target)
+    if 'quantile' in models:
+        models['quantile'] = continue_booster(models['quantile'], update.values, update.target)
+    # Target h phiên của một dòng chỉ có sau h phiên: các phiên mới chưa có target dài, nên booster nhiều
+    # horizon boost trên các dòng vừa đủ target kể từ lần train trước (+ replay); chưa có dòng nào thì bỏ qua
+    long_horizons = artifact.metrics.get('horizons', {}).get('horizons')
+    horizon_rows = []
+    if 'horizons' in models and long_horizons:
+        Y = build_horizon_targets(df, long_horizons)
+        known = np.isfinite(Y).all(axis=1)
+        labeled = np.flatnonzero(known & (np.arange(len(df)) + max(long_horizons) > new_rows[0]))
+        if len(labeled):
+            horizon_rows = incremental_rows(labeled)
+            models['horizons'] = continue_booster(models['horizons'], X.slice_rows(horizon_rows).values,
+                                                  Y[horizon_rows])
+    
+    metadata.update({
+        'end_date': end_date,
+        'last_bar_date': str(df.iloc[-1]['time'])[:10],
+        'last_bar_time': str(df.iloc[-1]['time']),
+        'n_samples': metadata.get('n_samples', 0) + len(new_rows),
+        'incremental_updates': metadata.get('incremental_updates', 0) + 1,
+        'recent_mae': recent_mae,
+    })
+    if 'horizons' in models:
+        key = 'horizon_incremental_updates' if len(horizon_rows) else 'horizon_skipped_updates'
+        metadata[key] = metadata.get(key, 0) + 1
+    save_artifact(path, models=models, features=artifact.features, metadata=metadata, metrics=artifact.metrics)
+    print(f"   ✓ Boosted {INCREMENTAL_ROUNDS} more trees on {len(new_rows)} new + {len(rows) - len(new_rows)} replayed bars "
+          f"(update {metadata['incremental_updates']}/{MAX_INCREMENTAL_UPDATES})")
+    if 'horizons' in models:
+        print(f"   ✓ Horizons: boosted on {len(horizon_rows)} bars with all targets known" if len(horizon_rows)
+              else "   ⚠ Horizons: skipped (no bar got its longest-horizon target since the last update)")
+    return 'incremental'
+
+
+def train_and_save_pooled_model(symbols, compare=False):
+    """
+    Train một XGBoost model chung (pooled) trên panel features của tất cả các mã
+
+    - Features chuẩn hoá theo close + symbol_id / sector_id
+    - Target là lợi suất ngày mai (Target_return), giá dự đoán = close * (1 + return)
+    - Một lần fit đa luồng trên ma trận lớn thay vì N lần fit nhỏ
+
+    Args:
+        symbols: Danh sách mã cổ phiếu
+        compare: True để train thêm model riêng từng mã và báo cáo trade-off
+    """
+    import time
+    import json
+    import pickle
+    import numpy as np
+    from feature_engineering import (
+        HORIZONS, get_feature_columns, get_pooled_feature_columns, add_pooled_features,
+        build_feature_matrix, build_horizon_targets
+    )
+    from feature_matrix import FeatureMatrix
+    from model_artifact import save_artifact, artifact_dir, MODELS_DIR
+    from model_monitor import feature_stats
+    
+    print(f"\n{'#'*60}")
+    print(f"🚀 STARTING POOLED TRAINING ({len(symbols)} symbols)")
+    print(f"{'#'*60}")
+    
+    end_date = datetime.now().strftime('%Y-%m-%d')
+    start_date = (datetime.now() - timedelta(days=TRAINING_DAYS)).strftime('%Y-%m-%d')
+    symbol_ids = {symbol: i for i, symbol in enumerate(symbols)}
+    
+    # 1. Build panel: mỗi mã một FeatureMatrix, split theo thời gian rồi stack
+    frames, base_cols, train_parts, test_parts = {}, {}, {}, {}
+    long_horizons = [h for h in HORIZONS if h > 1]
+    horizon_train, horizon_test = [], []
+    for symbol in symbols:
+        df = load_symbol_features(symbol, start_date, end_date)
+        if df is None:
+            continue
+        base_cols[symbol] = get_feature_columns(df)
+        frames[symbol] = add_pooled_features(df, symbol, symbol_ids)
+    
+    if not frames:
+        print("❌ No data for pooled training")
+        return False
+    
+    # Cột features = hợp của mọi mã (giữ thứ tự xuất hiện); mã thiếu cột nào (vd không lấy được
+    # chỉ số tài chính) thì cột đó là NaN - XGBoost coi là missing - thay vì phụ thuộc vào mã đầu tiên
+    feature_cols = list(dict.fromkeys(col for df in frames.values() for col in get_pooled_feature_columns(df)))
+    for symbol, df in frames.items():
+        missing = [col for col in feature_cols if col not in df.columns]
+        if missing:
+            print(f"   ⚠ {symbol} missing {len(missing)} pooled features (filled with NaN): {', '.join(missing)}")
+            frames[symbol] = df = df.reindex(columns=list(df.columns) + missing)
+        X_symbol = build_feature_matrix(df, feature_cols, target_col='Target_return')
+        train_parts[symbol], test_parts[symbol] = X_symbol.split(test_size=0.2)
+        Y_symbol = build_horizon_targets(df, long_horizons, relative=True)
+        horizon_train.append(Y_symbol[:len(train_parts[symbol])])
+        horizon_test.append(Y_symbol[len(train_parts[symbol]):])
+    
+    X_train = FeatureMatrix.stack(list(train_parts.values()))
+    X_test = FeatureMatrix.stack(list(test_parts.values()))
+    
+    print(f"\n✓ Pooled panel ready: {len(X_train) + len(X_test)} rows x {len(feature_cols)} features "
+          f"({X_train.nbytes / 1e6:.1f} MB train)")
+    
+    # 2. Một lần fit đa luồng
+    fit_start = time.perf_counter()
+    model, mae_ret, rmse_ret, r2_ret = train_model(X_train, model_type='xgboost', X_test=X_test)
+    pooled_fit_seconds = time.perf_counter() - fit_start
+    model_q, metrics_q = train_quantile_model(X_train, X_test=X_test)
+    model_h, metrics_h = train_horizon_model(X_train, np.concatenate(horizon_train), long_horizons,
+                                             X_test=X_test, Y_test=np.concatenate(horizon_test))
+    
+    # 3. Đánh giá theo giá (VND) cho từng mã, so sánh với model riêng nếu cần
+    report = {
+        'trained_date': end_date,
+        'symbols': list(frames.keys()),
+        'pooled': {
+            'fit_seconds': round(pooled_fit_seconds, 3),
+            'model_bytes': len(pickle.dumps(model)),
+            'test_return_mae': float(mae_ret),
+            'test_return_rmse': float(rmse_ret),
+        },
+        'per_symbol': {},
+    }
+    per_symbol_fit_seconds, per_symbol_bytes = 0.0, 0
+    
+    for symbol, test in test_parts.items():
+        df = frames[symbol]
+        close = df['close'].to_numpy()[-len(test):]
+        actual = df['Target'].to_numpy()[-len(test):]
+        pred_price = close * (1 + model.predict(test.values))
+        row = {'pooled_mae': float(np.mean(np.abs(actual - pred_price)))}
+        
+        if compare:
+            X_symbol = build_feature_matrix(df, base_cols[symbol])
+            fit_start = time.perf_counter()
+            model_symbol, mae_symbol, _, _ = train_model(X_symbol, model_type='xgboost')
+            per_symbol_fit_seconds += time.perf_counter() - fit_start
+            per_symbol_bytes += len(pickle.dumps(model_symbol))
+            row['per_symbol_mae'] = float(mae_symbol)
+        
+        report['per_symbol'][symbol] = row
+    
+    if compare:
+        report['separate_models'] = {
+            'fit_seconds': round(per_symbol_fit_seconds, 3),
+            'model_bytes': per_symbol_bytes,
+            'model_count': len(test_parts),
+        }
+    
+    # 4. Save model + metadata
+    models_dir = MODELS_DIR
+    os.makedirs(models_dir, exist_ok=True)
+    
+    save_artifact(
+        artifact_dir(models_dir, 'pooled'),
+        models={'advanced': model, 'quantile': model_q, 'horizons': model_h},
+        features=feature_cols,
+        metadata={
+            'mode': 'pooled',
+            'target': 'return',
+            'symbol_ids': symbol_ids,
+            'start_date': start_date,
+            'end_date': end_date,
+            'n_samples': len(X_train) + len(X_test),
+            'feature_stats': feature_stats(X_train.values),
+        },
+        metrics={
+            'advanced': {'mae': float(mae_ret), 'rmse': float(rmse_ret), 'r2': float(r2_ret)},
+            'quantile': metrics_q,
+            'horizons': metrics_h,
+        },
+    )
+    with open(os.path.join(models_dir, 'pooled_report.json'), 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    
+    # 5. Trade-off report
+    print(f"\n🏆 POOLED vs PER-SYMBOL (test MAE, VND):")
+    print(f"   {'Symbol':<8} {'Pooled':<14} {'Per-symbol':<14}")
+    print(f"   {'-'*36}")
+    for symbol, row in report['per_symbol'].items():
+        per_symbol = f"{row['per_symbol_mae']:,.0f}" if 'per_symbol_mae' in row else 'N/A'
+        print(f"   {symbol:<8} {row['pooled_mae']:<14,.0f} {per_symbol:<14}")
+    print(f"\n   Pooled:     1 model,  fit {pooled_fit_seconds:.2f}s, {report['pooled']['model_bytes'] / 1024:,.0f} KB")
+    if compare:
+        separate = report['separate_models']
+        print(f"   Per-symbol: {separate['model_count']} models, fit {separate['fit_seconds']:.2f}s, "
+              f"{separate['model_bytes'] / 1024:,.0f} KB")
+    print(f"\n💾 Pooled model saved to {models_dir}")
+    
+    return True
+
+
 if __name__ == "__main__":
     # Create models directory
     # os.makedirs("models", exist_ok=True) # Handled inside function now
@@ -309,7 +837,7 @@ if __name__ == "__main__":
     
     # Import feature engineering
     try:
-        from feature_engineering import prepare_features, get_feature_columns
+        import feature_engineering  # noqa: F401
         print("✓ Feature engineering module imported")
     except ImportError as e:
         print(f"❌ Error importing feature_engineering: {e}")
@@ -317,30 +845,42 @@ if __name__ == "__main__":
         sys.exit(1)
     
     # Check for command line arguments
-    if len(sys.argv) > 1:
+    # --pooled: một model chung cho tất cả các mã; --compare: so sánh với model riêng từng mã
+    # --interval=5m: train trên nến intraday (1m / 5m / 15m)
+    flags = {arg for arg in sys.argv[1:] if arg.startswith('--')}
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    interval = next((f.split('=')[1] for f in flags if f.startswith('--interval=')), '1D')
+    # --incremental: boost tiếp model ngày hiện có trên các phiên mới (full refit khi cần)
+    incremental = '--incremental' in flags and interval == '1D'
+    
+    if '--pooled' in flags:
+        symbols = [s.upper() for s in args] or DEFAULT_SYMBOLS
+        print(f"\n🎯 Training mode: Pooled ({', '.join(symbols)})")
+        train_and_save_pooled_model(symbols, compare='--compare' in flags)
+    
+    elif args:
         # Train specific symbol(s)
-        target_symbols = [s.upper() for s in sys.argv[1:]]
+        target_symbols = [s.upper() for s in args]
         print(f"\n🎯 Training mode: Specific symbols ({', '.join(target_symbols)})")
         
         for symbol in target_symbols:
-             train_and_save_model(symbol)
+            if incremental:
+                incremental_update(symbol)
+            else:
+                train_and_save_model(symbol, interval=interval)
              
     else:
         # Default batch training
-        # Settings
-        # Danh sách các mã cổ phiếu phổ biến (Top VN30)
-        symbols = [
-            # Top 10 by market cap
-            "VCB", "FPT", "HPG", "VIC", "VNM", "TCB", "MSN", "VPB", "MBB", "ACB",
-            # Additional VN30 stocks
-            "VHM", "GAS", "CTG", "BID", "VRE", "PLX", "POW", "SSI", "GVR", "SAB"
-        ] 
+        symbols = DEFAULT_SYMBOLS
         
         print(f"\n🎯 Training mode: Batch (Top 20 VN30)")
         print(f"   Symbols to train: {', '.join(symbols)}")
 
         for symbol in symbols:
-            train_and_save_model(symbol)
+            if incremental:
+                incremental_update(symbol)
+            else:
+                train_and_save_model(symbol, interval=interval)
         
     print(f"\n{'='*60}")
     print("✅ TRAINING PROCESS COMPLETED!")
@@ -3,11 +3,10 @@ News Sentiment Analyzer for Vietnamese Stocks
 Scrapes news from financial websites and analyzes sentiment
 """
 
-import os
-import json
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, Optional
+from functools import lru_cache
 import warnings
 import sys
 warnings.filterwarnings('ignore')
@@ -16,55 +15,42 @@ warnings.filterwarnings('ignore')
 def log(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
-# Lazy imports
-def get_libs():
+# Lazy imports - tách phần scrape (requests, bs4) và phần chấm điểm (textblob, googletrans):
+# chỉ import khi dùng tới, một lần cho cả process (Translator cũng chỉ tạo một lần)
+@lru_cache(maxsize=None)
+def _http_libs():
     import requests
     from bs4 import BeautifulSoup
+    return requests, BeautifulSoup
+
+@lru_cache(maxsize=None)
+def _sentiment_libs():
     from textblob import TextBlob
     try:
         from googletrans import Translator
         translator = Translator()
     except:
         translator = None
-    return requests, BeautifulSoup, TextBlob, translator
-
-# Cache directory
-CACHE_DIR = "ai/.cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
-
-
-def get_cache_filename(symbol: str) -> str:
-    """Get cache filename for a symbol"""
-    return os.path.join(CACHE_DIR, f"sentiment_{symbol}.json")
+    return TextBlob, translator
 
+def get_libs():
+    return _http_libs() + _sentiment_libs()
 
 def load_cached_sentiment(symbol: str, max_age_hours: int = 24) -> Optional[float]:
     """Load sentiment from cache if fresh enough"""
-    cache_file = get_cache_filename(symbol)
-    
-    if not os.path.exists(cache_file):
-        return None
+    from tiered_cache import get_cache
     
-    try:
-        with open(cache_file, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        # Check if cache is still fresh
-        cached_time = datetime.fromisoformat(data['timestamp'])
-        age = datetime.now() - cached_time
-        
-        if age.total_seconds() < max_age_hours * 3600:
-            log(f"   ✓ Using cached sentiment (age: {age.total_seconds()/3600:.1f}h)")
-            return data['sentiment']
-    except Exception as e:
-        log(f"   ⚠ Cache read error: {e}")
+    cached = get_cache().get('sentiment', symbol, max_age=max_age_hours * 3600)
+    if cached is not None:
+        log(f"   ✓ Using cached sentiment (age: {cached.age/3600:.1f}h)")
+        return cached.value['sentiment']
     
     return None
 
 
 def save_sentiment_cache(symbol: str, sentiment: float, headlines: list = None):
     """Save sentiment to cache"""
-    cache_file = get_cache_filename(symbol)
+    from tiered_cache import get_cache
     
     data = {
         'symbol': symbol,
@@ -72,92 +58,102 @@ def save_sentiment_cache(symbol: str, sentiment: float, headlines: list = None):
         'timestamp': datetime.now().isoformat(),
         'headlines': headlines[:5] if headlines else []  # Save top 5
     }
-    
-    try:
-        with open(cache_file, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-    except Exception as e:
-        log(f"   ⚠ Cache write error: {e}")
+    get_cache().set('sentiment', symbol, data)
 
 
-def scrape_cafef_headlines(symbol: str, max_headlines: int = 5) -> list:
-    """
-    Scrape headlines from CafeF
-    Note: This is a simplified version. Real implementation may need adjustments
-    based on website structure.
-    """
-    requests, BeautifulSoup, _, _ = get_libs()
+# Trang tìm kiếm tin theo mã: URL, thẻ + class chứa tiêu đề (chỉnh theo cấu trúc site thực tế)
+NEWS_SOURCES = {
+    'CafeF': ("https://cafef.vn/tim-kiem/{symbol}.chn", ['h3', 'h4', 'a'], ['title', 'news-title']),
+    'VnExpress': ("https://vnexpress.net/tim-kiem?q={symbol}", ['h3', 'h2'], 'title-news'),
+}
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+REQUEST_TIMEOUT = 10
+
+
+def parse_headlines(source: str, html, max_headlines: int = 5) -> list:
+    """Lấy tiêu đề (dài hơn 10 ký tự) từ HTML trang tìm kiếm của một nguồn tin"""
+    _, BeautifulSoup = _http_libs()
+    _, tags, class_ = NEWS_SOURCES[source]
+    soup = BeautifulSoup(html, 'html.parser')
+    headlines = []
+    for tag in soup.find_all(tags, class_=class_, limit=max_headlines):
+        text = tag.get_text().strip()
+        if text and len(text) > 10:  # Minimum length
+            headlines.append(text)
+    return headlines
+
+
+def _scrape_headlines(source: str, symbol: str, max_headlines: int = 5) -> list:
+    requests, _ = _http_libs()
     headlines = []
-    
     try:
-        # Search URL for the symbol
-        search_url = f"https://cafef.vn/tim-kiem/{symbol}.chn"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
+        url = NEWS_SOURCES[source][0].format(symbol=symbol)
+        response = requests.get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT)
         if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find headlines - adjust selector based on actual site structure
-            title_tags = soup.find_all(['h3', 'h4', 'a'], class_=['title', 'news-title'], limit=max_headlines)
-            
-            for tag in title_tags:
-                text = tag.get_text().strip()
-                if text and len(text) > 10:  # Minimum length
-                    headlines.append(text)
+            headlines = parse_headlines(source, response.content, max_headlines)
         
         # Rate limiting
         time.sleep(1)
         
     except Exception as e:
-        log(f"   ⚠ CafeF scraping error: {e}")
+        log(f"   ⚠ {source} scraping error: {e}")
     
     return headlines
 
 
+def scrape_cafef_headlines(symbol: str, max_headlines: int = 5) -> list:
+    """
+    Scrape headlines from CafeF
+    Note: This is a simplified version. Real implementation may need adjustments
+    based on website structure.
+    """
+    return _scrape_headlines('CafeF', symbol, max_headlines)
+
+
 def scrape_vnexpress_headlines(symbol: str, max_headlines: int = 5) -> list:
     """
     Scrape headlines from VnExpress Financial section
     """
-    requests, BeautifulSoup, _, _ = get_libs()
-    headlines = []
+    return _scrape_headlines('VnExpress', symbol, max_headlines)
+
+
+async def fetch_news_pages_async(session, symbol: str) -> Dict:
+    """
+    Tải đồng thời trang tìm kiếm của mọi nguồn tin (aiohttp.ClientSession, không chiếm thread)
+
+    Returns:
+        dict nguồn -> HTML (bytes), hoặc None nếu lỗi / status khác 200
+    """
+    import asyncio
+    import aiohttp
     
-    try:
-        search_url = f"https://vnexpress.net/tim-kiem?q={symbol}"
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        
-        response = requests.get(search_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find headlines
-            title_tags = soup.find_all(['h3', 'h2'], class_='title-news', limit=max_headlines)
-            
-            for tag in title_tags:
-                text = tag.get_text().strip()
-                if text and len(text) > 10:
-                    headlines.append(text)
-        
-        time.sleep(1)
-        
-    except Exception as e:
-        log(f"   ⚠ VnExpress scraping error: {e}")
+    timeout = aiohttp.ClientTimeout(total=REQUEST_TIMEOUT)
     
-    return headlines
+    async def fetch(source):
+        try:
+            url = NEWS_SOURCES[source][0].format(symbol=symbol)
+            async with session.get(url, headers=REQUEST_HEADERS, timeout=timeout) as response:
+                return await response.read() if response.status == 200 else None
+        except Exception as e:
+            log(f"   ⚠ {source} scraping error: {e}")
+            return None
+    
+    pages = await asyncio.gather(*(fetch(source) for source in NEWS_SOURCES))
+    return dict(zip(NEWS_SOURCES, pages))
 
 
-def analyze_sentiment_vietnamese(text: str) -> float:
+def analyze_sentiment_vietnamese(text: str, translate: bool = True) -> float:
     """
     Analyze sentiment of Vietnamese text
     Returns value between 0 (negative) and 1 (positive)
+
+    translate=False: chấm điểm trực tiếp, không dịch qua googletrans (gọi mạng)
     """
-    _, _, TextBlob, translator = get_libs()
+    TextBlob, translator = _sentiment_libs()
+    if not translate:
+        translator = None
     
     if not text:
         return 0.5
@@ -248,42 +244,63 @@ def get_stock_sentiment_score(symbol: str, cache_hours: int = 24, max_headlines:
     return avg_sentiment
 
 
+def load_cached_news(symbol: str) -> Optional[Dict]:
+    """News data còn fresh trong cache (tối đa 12 giờ và chưa sang nến ngày mới)"""
+    from tiered_cache import get_cache
+    cached = get_cache().get('sentiment', symbol, max_age=12 * 3600)
+    return cached.value if cached is not None else None
+
+
+def build_news_data(symbol: str, headlines: list) -> Dict:
+    """Chấm sentiment cho các tiêu đề, lưu cache và trả về kết quả cho Backend"""
+    sentiment = 0.5
+    if headlines:
+        sentiments = [analyze_sentiment_vietnamese(h) for h in headlines]
+        sentiment = sum(sentiments) / len(sentiments)
+        
+    result = {
+        "symbol": symbol,
+        "sentiment": sentiment,
+        "timestamp": datetime.now().isoformat(),
+        "headlines": headlines
+    }
+    
+    # Save to cache
+    save_sentiment_cache(symbol, sentiment, headlines)
+    return result
+
+
+def news_data_from_pages(symbol: str, pages: Dict) -> Dict:
+    """get_news_data từ các trang đã tải sẵn (fetch_news_pages_async)"""
+    headlines = []
+    for source, html in pages.items():
+        if not html:
+            continue
+        try:
+            headlines.extend(parse_headlines(source, html, 5))
+        except Exception as e:
+            log(f"   ⚠ {source} scraping error: {e}")
+    try:
+        return build_news_data(symbol, headlines)
+    except Exception as e:
+        return {"error": str(e)}
+
+
 def get_news_data(symbol: str) -> Dict:
     """
     Get full news data including sentiment and headlines for Backend
     """
     try:
         # Check cache first
-        cache_file = get_cache_filename(symbol)
-        if os.path.exists(cache_file):
-            with open(cache_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Check freshness (e.g. 12 hours)
-            cached_time = datetime.fromisoformat(data['timestamp'])
-            if (datetime.now() - cached_time).total_seconds() < 12 * 3600:
-                return data
+        cached = load_cached_news(symbol)
+        if cached is not None:
+            return cached
         
         # Scrape fresh if no cache or stale
         all_headlines = []
         all_headlines.extend(scrape_cafef_headlines(symbol, 5))
         all_headlines.extend(scrape_vnexpress_headlines(symbol, 5))
-        
-        sentiment = 0.5
-        if all_headlines:
-            sentiments = [analyze_sentiment_vietnamese(h) for h in all_headlines]
-            sentiment = sum(sentiments) / len(sentiments)
-            
-        result = {
-            "symbol": symbol,
-            "sentiment": sentiment,
-            "timestamp": datetime.now().isoformat(),
-            "headlines": all_headlines
-        }
-        
-        # Save to cache
-        save_sentiment_cache(symbol, sentiment, all_headlines)
-        return result
+        return build_news_data(symbol, all_headlines)
         
     except Exception as e:
         return {"error": str(e)}
@@ -1,25 +1,109 @@
-import joblib
 import os
 import sys
+import time
+import threading
+from collections import Counter
 from datetime import datetime, timedelta
 from contextlib import redirect_stdout, redirect_stderr
 from io import StringIO
 
-# Suppress vnstock output by redirecting to stderr
-import io
-with redirect_stdout(sys.stderr):
-    import vnstock
+# Chỉ import module nhẹ ở đây (cache, log, calendar): request trúng cache và get_market_overview
+# không phải trả giá import numpy / pandas / ta / xgboost. Module nặng import trong hàm cần dùng
+from tiered_cache import get_cache
+from prediction_log import record_prediction
+from instrumentation import span, increment
+from trading_calendar import is_market_open, last_completed_bar_date
+
+# Số điểm lịch sử trả về cho biểu đồ
+HISTORY_POINTS = 30
+
+# 'symbol' (model riêng từng mã, fallback sang pooled) hoặc 'pooled' (luôn dùng model chung)
+MODEL_MODE = os.getenv('AI_MODEL_MODE', 'symbol')
+
+# Artifact pooled model đang dùng (dùng chung cho mọi mã; chỉ để log khi load bản mới)
+_pooled_model = None
+
+# Proactive refresher: giữ ấm cache cho N mã được hỏi nhiều nhất trong giờ giao dịch
+REFRESH_TOP_N = int(os.getenv('AI_PREDICTION_REFRESH_TOP', 20))
+REFRESH_INTERVAL = int(os.getenv('AI_PREDICTION_REFRESH_INTERVAL', 5 * 60))  # seconds
+
+# Số lần mỗi mã được yêu cầu dự đoán (trong process)
+_request_counts = Counter()
+_request_lock = threading.Lock()
+
+# Tên trước đây import ở đầu module (vd `from predict import MODELS_DIR`) - giờ resolve lười
+# qua __getattr__ của module, chỉ import module nguồn khi có người đọc tới
+_LAZY_ATTRIBUTES = {
+    'prepare_features': 'feature_engineering',
+    'get_lookback_start_date': 'feature_engineering',
+    'build_feature_matrix': 'feature_engineering',
+    'add_pooled_features': 'feature_engineering',
+    'load_artifact': 'model_artifact',
+    'artifact_dir': 'model_artifact',
+    'load_symbol_models': 'model_artifact',
+    'has_symbol_model': 'model_artifact',
+    'load_quantile_model': 'model_artifact',
+    'load_horizon_model': 'model_artifact',
+    'MODELS_DIR': 'model_artifact',
+    'get_monitor': 'model_monitor',
+    'feature_hash': 'prediction_log',
+    'get_data_source': 'data_source',
+}
+
+
+def __getattr__(name):
+    module = _LAZY_ATTRIBUTES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    import importlib
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value
+    return value
 
-try:
-    import xgboost as xgb
-except ImportError:
-    xgb = None
-from feature_engineering import prepare_features
 
 # Custom logger to stderr
 def log(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
 
+
+def load_pooled_model(models_dir):
+    """
+    Mở artifact của pooled model (load_artifact cache theo mtime của manifest: train lại thì load lại)
+
+    Returns:
+        ModelArtifact (model 'advanced' đã load) hoặc None nếu chưa train
+    """
+    global _pooled_model
+    from model_artifact import load_artifact, artifact_dir
+    artifact = load_artifact(artifact_dir(models_dir, 'pooled'))
+    if artifact is not None and artifact is not _pooled_model:
+        artifact.get_model('advanced')
+        log(f"✓ Loaded pooled model ({len(artifact.metadata['symbol_ids'])} symbols)")
+    _pooled_model = artifact
+    return artifact
+
+def interval_confidence(close, prediction, quantile_values, quantiles):
+    """
+    Xác suất (%) giá thực tế đi đúng chiều dự đoán so với close
+
+    CDF tại close được nội suy tuyến tính giữa các quantile (ngoại suy theo độ dốc ở hai đầu,
+    giới hạn trong [0, 1])
+    """
+    import numpy as np
+    q = np.asarray(quantile_values, dtype=np.float64)
+    a = np.asarray(quantiles, dtype=np.float64)
+    if close < q[0]:
+        span = q[1] - q[0]
+        cdf = a[0] - (q[0] - close) * (a[1] - a[0]) / span if span > 0 else 0.0
+    elif close > q[-1]:
+        span = q[-1] - q[-2]
+        cdf = a[-1] + (close - q[-1]) * (a[-1] - a[-2]) / span if span > 0 else 1.0
+    else:
+        cdf = np.interp(close, q, a)
+    prob_up = 1 - min(max(cdf, 0.0), 1.0)
+    return round(float(100 * (prob_up if prediction >= close else 1 - prob_up)), 1)
+
+
 def predict_stock(symbol='VCB'):
     """
     Dự đoán giá cổ phiếu cho ngày mai
@@ -28,10 +112,13 @@ def predict_stock(symbol='VCB'):
     log(f"🔮 DỰ ĐOÁN GIÁ CỔ PHI ẾU {symbol}")
     log("="*60)
     
+    from feature_engineering import prepare_features, get_lookback_start_date, build_feature_matrix
+    from model_artifact import load_symbol_models, MODELS_DIR
+    from data_source import get_data_source
+    
     # 1. Load model
     try:
-        model = joblib.load(f'models/model_{symbol}_advanced.pkl')
-        features_list = joblib.load(f'models/features_{symbol}.pkl')
+        model, _, features_list = load_symbol_models(MODELS_DIR, symbol)
         log(f"✓ Loaded advanced model with {len(features_list)} features")
     except Exception as e:
         log(f"❌ Error: {e}")
@@ -41,10 +128,9 @@ def predict_stock(symbol='VCB'):
     # 2. Fetch latest data
     log(f"\n📥 Fetching latest data...")
     end_date = datetime.now().strftime('%Y-%m-%d')
-    start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
+    start_date = get_lookback_start_date(end_date)
     
-    quote = vnstock.Quote(symbol=symbol, source='VCI')
-    df_raw = quote.history(start=start_date, end=end_date, interval='1D')
+    df_raw = get_data_source().history(symbol, start_date, end_date, interval='1D')
     
     if df_raw.empty:
         log("❌ No data available")
@@ -52,11 +138,10 @@ def predict_stock(symbol='VCB'):
     
     # 3. Prepare features
     log(f"🔧 Calculating technical indicators...")
-    df_processed = prepare_features(df_raw, symbol, start_date, end_date, vnstock)
+    df_processed = prepare_features(df_raw, symbol, start_date, end_date, inference=True)
     
-    # 4. Get latest features
-    X = df_processed[features_list]
-    latest_features = X.iloc[-1:].values
+    # 4. Get latest features (chỉ dòng cuối, float32)
+    latest_features = build_feature_matrix(df_processed, features_list, target_col=None, rows=slice(-1, None)).values
     
     # 5. Make prediction
     prediction = model.predict(latest_features)[0]
@@ -128,35 +213,82 @@ def predict_stock(symbol='VCB'):
 def get_prediction_data(symbol='VCB'):
     """
     Lấy dữ liệu dự đoán dưới dạng dictionary cho Backend
-    With intelligent caching to improve performance
+    
+    Stale-while-revalidate: entry hết hạn vẫn được trả về ngay (kèm 'stale' và
+    'cache_age_minutes'), đồng thời refresh ở thread nền (mỗi mã tối đa một refresh).
+    Mỗi kết quả được ghi vào prediction log (buffer trong bộ nhớ, flush nền)
     """
+    start = time.perf_counter()
+    with span('get_prediction_data'):
+        result = _serve_prediction(symbol)
+    record_prediction(symbol, result, (time.perf_counter() - start) * 1000)
+    return result
+
+
+def _serve_prediction(symbol):
+    """Cache (stale-while-revalidate) -> compute_prediction"""
+    with _request_lock:
+        _request_counts[symbol] += 1
+    
     try:
-        # Check cache first
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        cache_dir = os.path.join(current_dir, 'cache')
-        os.makedirs(cache_dir, exist_ok=True)
-        cache_file = os.path.join(cache_dir, f'prediction_{symbol}.json')
-        
-        # Cache TTL: 30 minutes
-        cache_ttl = 30 * 60  # seconds
+        cache = get_cache()
+        cached = cache.get('prediction', symbol, allow_stale=True)
+        if cached is not None:
+            if cached.stale:
+                cache.refresh_in_background('prediction', symbol, lambda: _refresh_prediction(symbol))
+            log(f"✓ Using {'stale' if cached.stale else 'cached'} prediction for {symbol} "
+                f"(age: {int(cached.age/60)}min)")
+            increment('prediction_requests_total', result='stale' if cached.stale else 'hit')
+            cached_result = cached.value
+            cached_result['cached'] = True
+            cached_result['stale'] = cached.stale
+            cached_result['cache_age_minutes'] = int(cached.age / 60)
+            return cached_result
         
-        if os.path.exists(cache_file):
-            cache_age = datetime.now().timestamp() - os.path.getmtime(cache_file)
-            if cache_age < cache_ttl:
-                # Cache is fresh, return it
-                log(f"✓ Using cached prediction for {symbol} (age: {int(cache_age/60)}min)")
-                import json
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cached_result = json.load(f)
-                    cached_result['cached'] = True
-                    cached_result['cache_age_minutes'] = int(cache_age / 60)
-                    return cached_result
+        increment('prediction_requests_total', result='miss')
+        bar_date = last_completed_bar_date()
+        result = compute_prediction(symbol)
+        if 'error' not in result and 'status' not in result:
+            cache.set('prediction', symbol, result, bar_date=bar_date)
+            log(f"✓ Cached prediction for {symbol}")
+        return result
         
+    except Exception as e:
+        return {"error": str(e)}
+
+
+def _refresh_prediction(symbol):
+    """compute_prediction cho background refresh; None nếu lỗi (giữ nguyên entry cũ)"""
+    result = compute_prediction(symbol)
+    if 'error' in result or 'status' in result:
+        log(f"⚠ Background refresh for {symbol} failed: {result.get('error', result.get('status'))}")
+        return None
+    log(f"✓ Refreshed cached prediction for {symbol}")
+    return result
+
+
+def compute_prediction(symbol='VCB'):
+    """
+    Fetch dữ liệu + tính features + predict (không qua cache)
+    """
+    import numpy as np
+    from feature_engineering import prepare_features, get_lookback_start_date, build_feature_matrix, add_pooled_features
+    from model_artifact import load_artifact, artifact_dir, load_symbol_models, has_symbol_model, MODELS_DIR
+    from model_monitor import get_monitor
+    from prediction_log import feature_hash
+    from bar_store import fetch_bars, get_bar_store
+    
+    try:
         # Load model and features
-        model_path = os.path.join(current_dir, 'models', f'model_{symbol}_advanced.pkl')
-        features_path = os.path.join(current_dir, 'models', f'features_{symbol}.pkl')
+        models_dir = MODELS_DIR
+        symbol_model_exists = has_symbol_model(models_dir, symbol)
+        
+        pooled = None
+        if MODEL_MODE == 'pooled' or not symbol_model_exists:
+            with span('model_load'):
+                pooled = load_pooled_model(models_dir)
         
-        if not os.path.exists(model_path):
+        if pooled is None and not symbol_model_exists:
              # Try to train on demand
              try:
                 return {"status": "training_required", "symbol": symbol}
@@ -164,30 +296,82 @@ def get_prediction_data(symbol='VCB'):
              except Exception as train_error:
                  return {"error": f"Model not found and training failed: {train_error}", "training": True}
 
-        model = joblib.load(model_path)
-        features_list = joblib.load(features_path)
+        # Một artifact cho cả lần predict: advanced / quantile / horizons / metadata lấy từ cùng instance
+        if pooled is not None:
+            artifact = pooled
+        else:
+            with span('model_load'):
+                artifact = load_artifact(artifact_dir(models_dir, symbol))
+        if artifact is not None:
+            model, features_list = artifact.get_model('advanced'), artifact.features
+        else:
+            # Model pickle cũ chưa migrate: không có quantile / horizon / metadata
+            with span('model_load'):
+                model, _, features_list = load_symbol_models(models_dir, symbol)
         
         # Fetch data
+        # Features chỉ cần phiên mới nhất: fetch đủ warmup cho một dòng (get_required_bars());
+        # HISTORY_POINTS điểm biểu đồ chỉ là giá close nên đọc thẳng từ bar store, không tính features
         end_date = datetime.now().strftime('%Y-%m-%d')
-        start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
-        quote = vnstock.Quote(symbol=symbol, source='VCI')
-        df_raw = quote.history(start=start_date, end=end_date, interval='1D')
+        start_date = get_lookback_start_date(end_date)
+        with span('quote_history'):
+            df_raw = fetch_bars(symbol, start_date, end_date, interval='1D')
         
         if df_raw.empty:
             return {"error": "No data available"}
             
         # Process features
-        df_processed = prepare_features(df_raw, symbol, start_date, end_date, vnstock)
+        with span('prepare_features'):
+            df_processed = prepare_features(df_raw, symbol, start_date, end_date, inference=True)
+            if pooled is not None:
+                df_processed = add_pooled_features(df_processed, symbol, pooled.metadata['symbol_ids'])
+                # Cột pooled mà mã này không có (vd thiếu chỉ số tài chính) -> NaN như lúc train
+                missing = [col for col in features_list if col not in df_processed.columns]
+                if missing:
+                    df_processed = df_processed.reindex(columns=list(df_processed.columns) + missing)
         latest_row = df_processed.iloc[-1]
         
-        # Predict
-        X = df_processed[features_list]
-        latest_features = X.iloc[-1:].values
-        prediction = model.predict(latest_features)[0]
-        latest_close = latest_row['close']
+        with span('predict'):
+            # Predict (pooled model dự đoán lợi suất -> đổi về giá)
+            latest_features = build_feature_matrix(df_processed, features_list, target_col=None, rows=slice(-1, None)).values
+            prediction = model.predict(latest_features)[0]
+            latest_close = latest_row['close']
+            if pooled is not None:
+                prediction = latest_close * (1 + prediction)
         
-        # Get historical data for chart (last 30 points)
-        history_df = df_processed.tail(30).reset_index()
+            # Khoảng dự đoán: một lần predict cho mọi quantile head
+            quantile_model, quantiles = artifact.quantile_model() if artifact is not None else (None, None)
+            interval = None
+            if quantile_model is not None and quantiles:
+                quantile_values = np.sort(quantile_model.predict(latest_features)[0])
+                if pooled is not None:
+                    quantile_values = latest_close * (1 + quantile_values)
+                interval = {
+                    "prediction_low": float(quantile_values[0]),
+                    "prediction_high": float(quantile_values[-1]),
+                    "confidence": interval_confidence(latest_close, prediction, quantile_values, quantiles),
+                }
+        
+            # Nhiều horizon: horizon 1 phiên là prediction, các horizon dài từ booster nhiều output
+            # trên cùng latest_features (không tính lại features)
+            horizons = {"1d": float(prediction)}
+            horizon_model, horizon_list = artifact.horizon_model() if artifact is not None else (None, None)
+            if horizon_model is not None and horizon_list:
+                horizon_values = np.atleast_1d(horizon_model.predict(latest_features)[0])
+                if pooled is not None:
+                    horizon_values = latest_close * (1 + horizon_values)
+                horizons.update({f"{h}d": float(v) for h, v in zip(horizon_list, horizon_values)})
+        
+        # Monitor drift: log dự đoán + cập nhật thống kê streaming (lỗi monitor không ảnh hưởng response)
+        try:
+            model_metadata = artifact.metadata if artifact is not None else {}
+            with span('monitor'):
+                get_monitor().observe(symbol, df_processed, prediction, latest_features[0], model_metadata)
+        except Exception as e:
+            log(f"⚠ Monitor error for {symbol}: {e}")
+        
+        # Get historical data for chart (last HISTORY_POINTS points)
+        history_df = get_bar_store().read(symbol, '1D', end=end_date, limit=HISTORY_POINTS)
         history_data = []
         for _, row in history_df.iterrows():
             history_data.append({
@@ -203,6 +387,11 @@ def get_prediction_data(symbol='VCB'):
             "prediction": float(prediction),
             "change": float(prediction - latest_close),
             "change_pct": float(((prediction - latest_close) / latest_close) * 100),
+            "model": "pooled" if pooled is not None else "symbol",
+            "model_version": artifact.manifest.get('created_at') if artifact is not None else None,
+            "feature_hash": feature_hash(latest_features),
+            **(interval or {}),
+            "horizons": horizons,
             "indicators": {
                 "rsi": float(latest_row.get('RSI', 0)),
                 "macd": float(latest_row.get('MACD', 0)),
@@ -230,25 +419,64 @@ def get_prediction_data(symbol='VCB'):
                 {"feature": f, "importance": float(i)} for f, i in importance[:5]
             ]
         
-        # Save to cache
         result['cached'] = False
-        import json
-        try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
-            log(f"✓ Cached prediction for {symbol}")
-        except Exception as cache_err:
-            log(f"⚠ Failed to save cache: {cache_err}")
-            
+        result['stale'] = False
         return result
         
     except Exception as e:
         return {"error": str(e)}
 
+
+def most_requested_symbols(n=REFRESH_TOP_N):
+    """N mã được yêu cầu dự đoán nhiều nhất"""
+    with _request_lock:
+        return [symbol for symbol, _ in _request_counts.most_common(n)]
+
+
+def refresh_popular_predictions(top_n=REFRESH_TOP_N, margin=REFRESH_INTERVAL):
+    """
+    Refresh nền cho các mã phổ biến có entry sắp hết hạn (trong `margin` giây) hoặc đã hết hạn,
+    để request tiếp theo luôn đọc được từ cache
+
+    Returns:
+        Số refresh đã khởi động
+    """
+    cache = get_cache()
+    ttl = cache.namespaces['prediction']['ttl']
+    started = 0
+    for symbol in most_requested_symbols(top_n):
+        entry = cache.get('prediction', symbol, allow_stale=True)
+        if entry is None or entry.age >= ttl - margin:
+            started += cache.refresh_in_background('prediction', symbol, lambda s=symbol: _refresh_prediction(s))
+    return started
+
+
+def start_prediction_refresher(top_n=REFRESH_TOP_N, interval=REFRESH_INTERVAL):
+    """
+    Thread nền: mỗi `interval` giây, trong giờ giao dịch, giữ ấm cache cho top_n mã
+    """
+    def run():
+        while True:
+            try:
+                if is_market_open():
+                    started = refresh_popular_predictions(top_n, margin=interval)
+                    if started:
+                        log(f"🔄 Refreshing {started} popular predictions")
+            except Exception as e:
+                log(f"⚠ Prediction refresher error: {e}")
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='prediction-refresher', daemon=True)
+    thread.start()
+    log(f"🔄 Prediction refresher started (top {top_n}, every {interval}s)")
+    return thread
+
 def get_market_overview():
     """
     Get market overview data (Indices + Top Stocks)
     """
+    from data_source import get_data_source
+    
     # Use StringIO to capture any accidental stdout and redirect it to stderr
     with redirect_stdout(sys.stderr):
         try:
@@ -261,8 +489,7 @@ def get_market_overview():
             log(f"📊 Fetching market overview indices...")
             for idx in indices:
                 try:
-                    quote = vnstock.Quote(symbol=idx, source='VCI')
-                    hist = quote.history(start=start_date, end=end_date, interval='1D')
+                    hist = get_data_source().history(idx, start_date, end_date, interval='1D')
                     if not hist.empty:
                         latest = hist.iloc[-1]
                         prev = hist.iloc[-2] if len(hist) > 1 else latest
@@ -284,8 +511,7 @@ def get_market_overview():
             log(f"🏢 Fetching top stocks data...")
             for sym in top_symbols:
                 try:
-                    quote = vnstock.Quote(symbol=sym, source='VCI')
-                    hist = quote.history(start=start_date, end=end_date, interval='1D')
+                    hist = get_data_source().history(sym, start_date, end_date, interval='1D')
                     if not hist.empty:
                         latest = hist.iloc[-1]
                         prev = hist.iloc[-2] if len(hist) > 1 else latest
@@ -0,0 +1,277 @@
+"""
+Prediction Log - log append-only các dự đoán đã phục vụ (cho drift monitoring / đánh giá offline)
+
+- Ghi qua buffer trong bộ nhớ: request chỉ append một dict (không I/O trên hot path),
+  thread nền flush theo chu kỳ (FLUSH_SECONDS) hoặc khi buffer đủ FLUSH_ROWS dòng
+- Lưu dạng cột (Parquet) chia partition theo ngày: <LOG_DIR>/date=YYYY-MM-DD/part-<ns>-<pid>.parquet
+  (mỗi lần flush một file mới, ghi tmp + rename nên reader không thấy file dở dang)
+- Không có pyarrow: fallback sang JSON lines cùng cấu trúc thư mục
+
+Usage:
+    python prediction_log.py [YYYY-MM-DD] [--compact]
+"""
+
+import os
+import sys
+import json
+import time
+import atexit
+import hashlib
+import threading
+from datetime import datetime
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+LOG_DIR = os.getenv('AI_PREDICTION_LOG_DIR', os.path.join(CURRENT_DIR, 'logs', 'predictions'))
+LOG_ENABLED = os.getenv('AI_PREDICTION_LOG', '1') != '0'
+FLUSH_ROWS = int(os.getenv('AI_PREDICTION_LOG_FLUSH_ROWS', 500))
+FLUSH_SECONDS = float(os.getenv('AI_PREDICTION_LOG_FLUSH_SECONDS', 30))
+
+# Cột -> kiểu Arrow (thứ tự cột của file)
+SCHEMA = [
+    ('logged_at', 'float64'),
+    ('symbol', 'string'),
+    ('latest_date', 'string'),
+    ('latest_close', 'float64'),
+    ('prediction', 'float64'),
+    ('prediction_low', 'float64'),
+    ('prediction_high', 'float64'),
+    ('horizons', 'string'),
+    ('model', 'string'),
+    ('model_version', 'string'),
+    ('feature_hash', 'string'),
+    ('latency_ms', 'float64'),
+    ('cached', 'bool_'),
+    ('stale', 'bool_'),
+    ('error', 'string'),
+]
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def feature_hash(features):
+    """Hash ngắn của vector features (float32) - cùng input cho cùng hash"""
+    import numpy as np
+    values = np.ascontiguousarray(features, dtype=np.float32)
+    return hashlib.blake2b(values.tobytes(), digest_size=8).hexdigest()
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        return pa, pq
+    except ImportError:
+        return None, None
+
+
+class PredictionLog:
+    """
+    Buffer trong bộ nhớ + flush nền ra các file Parquet theo ngày
+
+    Args:
+        root: Thư mục gốc của log
+        flush_rows: Flush ngay khi buffer đạt số dòng này
+        flush_seconds: Chu kỳ flush nền
+    """
+
+    def __init__(self, root=LOG_DIR, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+        self.written = 0
+        atexit.register(self.close)
+
+    def append(self, record):
+        """Thêm một dòng (dict theo SCHEMA) vào buffer - không I/O"""
+        with self._lock:
+            self._buffer.append(record)
+            full = len(self._buffer) >= self.flush_rows
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='prediction-log', daemon=True)
+                self._thread.start()
+        if full:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                log(f"⚠ Prediction log flush error: {e}")
+
+    def flush(self):
+        """
+        Ghi toàn bộ buffer: mỗi ngày một file part mới
+
+        Returns:
+            Số dòng đã ghi
+        """
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+
+            by_date = {}
+            for row in rows:
+                date = datetime.fromtimestamp(row['logged_at']).strftime('%Y-%m-%d')
+                by_date.setdefault(date, []).append(row)
+            for date, date_rows in by_date.items():
+                self._write_part(date, date_rows)
+            self.written += len(rows)
+            return len(rows)
+
+    def _write_part(self, date, rows):
+        directory = os.path.join(self.root, f'date={date}')
+        os.makedirs(directory, exist_ok=True)
+        name = f'part-{time.time_ns()}-{os.getpid()}'
+        pa, pq = _pyarrow()
+        if pa is not None:
+            schema = pa.schema([(column, getattr(pa, kind)()) for column, kind in SCHEMA])
+            table = pa.table({column: [row.get(column) for row in rows] for column, _ in SCHEMA}, schema=schema)
+            path = os.path.join(directory, name + '.parquet')
+            pq.write_table(table, path + '.tmp')
+        else:
+            path = os.path.join(directory, name + '.jsonl')
+            with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                for row in rows:
+                    f.write(json.dumps({column: row.get(column) for column, _ in SCHEMA}) + '\n')
+        os.replace(path + '.tmp', path)
+        return path
+
+    def partitions(self):
+        """Danh sách ngày đã có log"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name[len('date='):] for name in os.listdir(self.root) if name.startswith('date='))
+
+    def _parts(self, date):
+        directory = os.path.join(self.root, f'date={date}')
+        return sorted(os.path.join(directory, name) for name in os.listdir(directory)
+                      if name.endswith('.parquet') or name.endswith('.jsonl'))
+
+    def read(self, start=None, end=None, symbols=None):
+        """
+        Đọc log trong khoảng ngày [start, end] (chuỗi YYYY-MM-DD, None = không giới hạn)
+
+        Returns:
+            DataFrame theo SCHEMA (chỉ các dòng đã flush)
+        """
+        import pandas as pd
+        frames = []
+        for date in self.partitions():
+            if (start and date < start) or (end and date > end):
+                continue
+            for path in self._parts(date):
+                frames.append(pd.read_parquet(path) if path.endswith('.parquet')
+                              else pd.read_json(path, lines=True, dtype=False))
+        if not frames:
+            return pd.DataFrame(columns=[column for column, _ in SCHEMA])
+        df = pd.concat(frames, ignore_index=True)
+        if symbols:
+            df = df[df['symbol'].isin(symbols)]
+        return df.sort_values('logged_at', ignore_index=True)
+
+    def compact(self, date):
+        """
+        Gộp các file part của một ngày (đã kết thúc) thành một file Parquet
+
+        Returns:
+            Số file part đã gộp
+        """
+        pa, pq = _pyarrow()
+        parts = self._parts(date)
+        if pa is None or len(parts) < 2:
+            return 0
+        df = self.read(date, date)
+        schema = pa.schema([(column, getattr(pa, kind)()) for column, kind in SCHEMA])
+        table = pa.Table.from_pandas(df[[column for column, _ in SCHEMA]], schema=schema, preserve_index=False)
+        path = os.path.join(self.root, f'date={date}', f'part-{time.time_ns()}-compacted.parquet')
+        pq.write_table(table, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        for part in parts:
+            os.remove(part)
+        return len(parts)
+
+    def close(self):
+        """Flush phần còn lại trong buffer (gọi tự động khi process thoát)"""
+        self._closed = True
+        self._wake.set()
+        try:
+            self.flush()
+        except Exception as e:
+            log(f"⚠ Prediction log flush error: {e}")
+
+
+def record_prediction(symbol, result, latency_ms):
+    """
+    Ghi một dự đoán đã phục vụ (kết quả của get_prediction_data) vào log dùng chung.
+    Không bao giờ raise: lỗi log không được làm hỏng response
+    """
+    if not LOG_ENABLED:
+        return
+    try:
+        horizons = result.get('horizons')
+        get_prediction_log().append({
+            'logged_at': time.time(),
+            'symbol': symbol,
+            'latest_date': result.get('latest_date'),
+            'latest_close': result.get('latest_close'),
+            'prediction': result.get('prediction'),
+            'prediction_low': result.get('prediction_low'),
+            'prediction_high': result.get('prediction_high'),
+            'horizons': json.dumps(horizons) if horizons else None,
+            'model': result.get('model'),
+            'model_version': result.get('model_version'),
+            'feature_hash': result.get('feature_hash'),
+            'latency_ms': round(latency_ms, 3),
+            'cached': bool(result.get('cached', False)),
+            'stale': bool(result.get('stale', False)),
+            'error': result.get('error') or result.get('status'),
+        })
+    except Exception as e:
+        log(f"⚠ Prediction log error: {e}")
+
+
+_prediction_log = None
+_prediction_log_lock = threading.Lock()
+
+
+def get_prediction_log():
+    """Log dùng chung cho cả process"""
+    global _prediction_log
+    if _prediction_log is None:
+        with _prediction_log_lock:
+            if _prediction_log is None:
+                _prediction_log = PredictionLog()
+    return _prediction_log
+
+
+if __name__ == '__main__':
+    args = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    prediction_log = get_prediction_log()
+    dates = args or prediction_log.partitions()
+    for date in dates:
+        if '--compact' in sys.argv and date < datetime.now().strftime('%Y-%m-%d'):
+            merged = prediction_log.compact(date)
+            if merged:
+                print(f"🗜 {date}: compacted {merged} parts")
+        df = prediction_log.read(date, date)
+        if df.empty:
+            print(f"   {date}: no predictions")
+            continue
+        served = df[df['error'].isna()]
+        print(f"   {date}: {len(df):,} predictions, {df['symbol'].nunique()} symbols, "
+              f"cache hit {served['cached'].mean():.0%}, p50 {served['latency_ms'].median():.1f} ms, "
+              f"p95 {served['latency_ms'].quantile(0.95):.1f} ms")
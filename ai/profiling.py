@@ -0,0 +1,127 @@
+"""
+Profiling - profile một request (cProfile + snapshot cấp phát bộ nhớ tracemalloc)
+
+- Opt-in: ép profile một request (data.profile = true / worker.py --profile), hoặc lấy mẫu
+  ngẫu nhiên 1/N request bằng AI_PROFILE_EVERY=N để có thể bật thường trực trên production
+- Mỗi lần profile ghi vào PROFILE_DIR, tên file theo request id:
+    <ts>-<request_id>-<cmd>.prof        (pstats, mở bằng snakeviz / python -m pstats)
+    <ts>-<request_id>-<cmd>.txt         (top hàm theo cumulative time + top cấp phát theo dòng code)
+- Mỗi process chỉ profile một request tại một thời điểm (cProfile chỉ đo thread đã bật nó,
+  tracemalloc là global); request khác trong lúc đó chạy bình thường, không bị profile
+
+Usage:
+    python profiling.py <file.prof> [n]   # in top n hàm theo cumulative time
+"""
+
+import os
+import io
+import re
+import sys
+import time
+import random
+import threading
+from contextlib import contextmanager
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PROFILE_DIR = os.getenv('AI_PROFILE_DIR', os.path.join(CURRENT_DIR, 'logs', 'profiles'))
+PROFILE_EVERY = int(os.getenv('AI_PROFILE_EVERY', 0))  # 0 = chỉ khi được yêu cầu
+PROFILE_TOP_N = int(os.getenv('AI_PROFILE_TOP_N', 40))
+TRACEMALLOC_FRAMES = int(os.getenv('AI_PROFILE_TRACEMALLOC_FRAMES', 1))
+
+_active = threading.Lock()
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def should_profile(requested=False):
+    """Request này có được profile không: được yêu cầu, hoặc trúng mẫu 1/AI_PROFILE_EVERY"""
+    if requested:
+        return True
+    return PROFILE_EVERY > 0 and random.random() < 1.0 / PROFILE_EVERY
+
+
+def _safe_name(value):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', str(value))[:80] or 'request'
+
+
+@contextmanager
+def profile_request(request_id, label='request', enabled=True, directory=None):
+    """
+    Profile block code của một request:
+
+        with profile_request(message_id, 'predict', enabled=should_profile(data.get('profile'))):
+            result = get_prediction_data(symbol)
+
+    Yields:
+        Đường dẫn file .prof sẽ được ghi (None nếu request này không được profile)
+    """
+    if not enabled or not _active.acquire(blocking=False):
+        yield None
+        return
+
+    import cProfile
+    import tracemalloc
+
+    directory = directory or PROFILE_DIR
+    base = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{_safe_name(request_id)}-{_safe_name(label)}")
+    started_tracing = not tracemalloc.is_tracing()
+    profiler = cProfile.Profile()
+    try:
+        if started_tracing:
+            tracemalloc.start(TRACEMALLOC_FRAMES)
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield base + '.prof'
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+            try:
+                _write_profile(base, profiler, snapshot, elapsed, peak, request_id, label)
+                log(f"🔬 Profiled {label} ({request_id}) in {elapsed * 1000:.0f} ms -> {base}.prof")
+            except OSError as e:
+                log(f"⚠ Could not write profile: {e}")
+    finally:
+        _active.release()
+
+
+def _write_profile(base, profiler, snapshot, elapsed, peak, request_id, label):
+    import pstats
+    import tracemalloc
+
+    os.makedirs(os.path.dirname(base), exist_ok=True)
+    profiler.dump_stats(base + '.prof')
+
+    report = io.StringIO()
+    report.write(f"request: {request_id}\ncommand: {label}\nwall time: {elapsed * 1000:.1f} ms\n"
+                 f"peak traced memory: {peak / 1024 / 1024:.1f} MB\n\n")
+    pstats.Stats(profiler, stream=report).sort_stats('cumulative').print_stats(PROFILE_TOP_N)
+
+    # Bỏ cấp phát của chính tracemalloc / profiler khỏi thống kê
+    snapshot = snapshot.filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        tracemalloc.Filter(False, '<unknown>'),
+    ])
+    report.write(f"\nTop {PROFILE_TOP_N} allocations (live at end of request):\n")
+    for stat in snapshot.statistics('lineno')[:PROFILE_TOP_N]:
+        report.write(f"{stat}\n")
+
+    with open(base + '.txt', 'w', encoding='utf-8') as f:
+        f.write(report.getvalue())
+
+
+if __name__ == '__main__':
+    import pstats
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+    top_n = int(sys.argv[2]) if len(sys.argv) > 2 else PROFILE_TOP_N
+    pstats.Stats(sys.argv[1]).sort_stats('cumulative').print_stats(top_n)
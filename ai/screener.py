@@ -0,0 +1,391 @@
+"""
+Screener - lọc toàn thị trường theo điều kiện chỉ báo
+Giữ dòng chỉ báo mới nhất của mỗi mã trong một bảng cột (numpy) trong bộ nhớ,
+biểu thức lọc (vd "RSI < 30 and volume_ratio > 1.5") được biên dịch một lần
+và tính vector hoá trên toàn bộ các mã
+
+Usage:
+    python screener.py "RSI < 30 and volume_ratio > 1.5" [--sort=-volume_ratio] [--limit=20]
+"""
+
+import os
+import sys
+import ast
+import time
+import threading
+from datetime import datetime
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from feature_engineering import TECHNICAL_INDICATOR_COLUMNS, SECTORS
+from trading_calendar import last_completed_bar_date, is_market_open
+
+PANEL_COLUMNS = ['open', 'high', 'low', 'close', 'volume'] + TECHNICAL_INDICATOR_COLUMNS
+
+# Cột luôn trả về trong kết quả (cộng thêm các cột có trong biểu thức lọc / sort)
+DEFAULT_RESULT_COLUMNS = ['close', 'RSI', 'volume_ratio', 'momentum_1d']
+DEFAULT_LIMIT = 50
+
+SCREEN_WORKERS = int(os.getenv('AI_SCREEN_WORKERS', 16))
+# Trong phiên, panel được làm mới nền sau mỗi N giây (ngoài phiên: khi có nến ngày mới)
+SCREEN_REFRESH_SECONDS = int(os.getenv('AI_SCREEN_REFRESH_SECONDS', 5 * 60))
+
+# Hàm được phép dùng trong biểu thức lọc
+FUNCTIONS = {
+    'abs': np.abs,
+    'log': np.log,
+    'min': np.minimum,
+    'max': np.maximum,
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub, ast.UAdd, ast.Invert,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div, ast.BitAnd, ast.BitOr,
+    ast.Compare, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+    ast.Name, ast.Load, ast.Constant, ast.Call,
+)
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+class FilterError(ValueError):
+    """Biểu thức lọc không hợp lệ"""
+
+
+class _Vectorize(ast.NodeTransformer):
+    """and/or/not và so sánh chuỗi (a < b < c) -> phép toán bitwise trên mảng boolean"""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        left, parts = node.left, []
+        for op, right in zip(node.ops, node.comparators):
+            parts.append(ast.Compare(left=left, ops=[op], comparators=[right]))
+            left = right
+        result = parts[0]
+        for part in parts[1:]:
+            result = ast.BinOp(left=result, op=ast.BitAnd(), right=part)
+        return result
+
+
+@lru_cache(maxsize=256)
+def compile_filter(expression, columns):
+    """
+    Kiểm tra + biên dịch biểu thức lọc
+
+    Args:
+        expression: vd "RSI < 30 and volume_ratio > 1.5"
+        columns: tuple tên cột hợp lệ
+
+    Returns:
+        (code object, tuple các cột được dùng)
+    """
+    try:
+        tree = ast.parse(expression, mode='eval')
+    except SyntaxError as e:
+        raise FilterError(f"Invalid filter expression: {e.msg}") from None
+
+    used = []
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise FilterError(f"Unsupported syntax in filter: {type(node).__name__}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise FilterError(f"Unsupported constant in filter: {node.value!r}")
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise FilterError("Unsupported function call in filter")
+        elif isinstance(node, ast.Name) and node.id not in FUNCTIONS:
+            if node.id not in columns:
+                raise FilterError(f"Unknown column: {node.id}")
+            if node.id not in used:
+                used.append(node.id)
+
+    tree = ast.fix_missing_locations(_Vectorize().visit(tree))
+    return compile(tree, '<filter>', 'eval'), tuple(used)
+
+
+def evaluate_expression(expression, table):
+    """
+    Tính biểu thức (lọc hoặc số học, vd "close * 1.07") trên các cột
+
+    Args:
+        table: dict tên cột -> np.ndarray (cùng độ dài) - panel hoặc DataFrame một mã theo thời gian
+
+    Returns:
+        np.ndarray độ dài bằng số dòng của table
+    """
+    columns = tuple(table.keys()) if isinstance(table, dict) else tuple(table.columns)
+    code, used = compile_filter(expression, columns)
+    env = {name: np.asarray(table[name], dtype=np.float64) for name in used}
+    env.update(FUNCTIONS)
+    length = len(table[columns[0]]) if columns else 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        result = eval(code, {'__builtins__': {}}, env)
+    return np.broadcast_to(np.asarray(result), (length,))
+
+
+def evaluate_filter(expression, table):
+    """
+    Tính biểu thức lọc trên các cột
+
+    Returns:
+        np.ndarray bool (NaN trong phép so sánh -> False)
+    """
+    return evaluate_expression(expression, table).astype(bool)
+
+
+class IndicatorPanel:
+    """
+    Bảng cột: mỗi cột là một mảng float64 liên tục, mỗi dòng là chỉ báo mới nhất của một mã
+    """
+
+    def __init__(self, columns=PANEL_COLUMNS, capacity=2048):
+        self.columns = list(columns)
+        self._index = {name: i for i, name in enumerate(self.columns)}
+        self._data = np.full((len(self.columns), capacity), np.nan)
+        self._rows = {}
+        self.symbols = []
+        self.bar_dates = []
+        self.bar_date = None
+        self.refreshed_at = None
+
+    def __len__(self):
+        return len(self.symbols)
+
+    def update(self, symbol, values, bar_date=None):
+        """Ghi đè dòng của một mã (thêm mới nếu chưa có); cột không có trong values giữ NaN"""
+        row = self._rows.get(symbol)
+        if row is None:
+            row = len(self.symbols)
+            if row == self._data.shape[1]:
+                grown = np.full((len(self.columns), row * 2), np.nan)
+                grown[:, :row] = self._data
+                self._data = grown
+            self._rows[symbol] = row
+            self.symbols.append(symbol)
+            self.bar_dates.append(bar_date)
+        else:
+            self.bar_dates[row] = bar_date
+        column = self._data[:, row]
+        column[:] = np.nan
+        for name, value in values.items():
+            i = self._index.get(name)
+            if i is not None and value is not None:
+                column[i] = value
+
+    def column(self, name):
+        """View (không copy) của một cột cho toàn bộ các mã"""
+        return self._data[self._index[name], :len(self.symbols)]
+
+    def table(self):
+        """dict tên cột -> mảng, dùng cho evaluate_filter"""
+        n = len(self.symbols)
+        return {name: self._data[i, :n] for i, name in enumerate(self.columns)}
+
+    def row(self, symbol):
+        i = self._rows[symbol]
+        return {name: self._data[j, i] for j, name in enumerate(self.columns)}
+
+
+def screen(panel, expression, sort=None, limit=DEFAULT_LIMIT, columns=None):
+    """
+    Lọc toàn bộ panel theo biểu thức và xếp hạng kết quả
+
+    Args:
+        panel: IndicatorPanel
+        expression: Biểu thức lọc, vd "RSI < 30 and volume_ratio > 1.5"
+        sort: Cột xếp hạng; tiền tố '-' để giảm dần (vd '-volume_ratio')
+        limit: Số mã tối đa trả về
+        columns: Cột trả về thêm cho mỗi mã
+
+    Returns:
+        dict {matches: [{symbol, ...}], total, universe, elapsed_ms}
+    """
+    start = time.perf_counter()
+    table = panel.table()
+    mask = evaluate_filter(expression, table)
+    matches = np.flatnonzero(mask)
+
+    if sort:
+        key = sort.lstrip('-')
+        if key not in table:
+            raise FilterError(f"Unknown sort column: {key}")
+        values = table[key][matches]
+        if sort.startswith('-'):
+            values = -values
+        # NaN xếp cuối
+        matches = matches[np.argsort(values, kind='stable')]
+    matches = matches[:limit]
+
+    _, used = compile_filter(expression, tuple(table.keys()))
+    result_columns = list(dict.fromkeys(
+        DEFAULT_RESULT_COLUMNS + list(used) + ([sort.lstrip('-')] if sort else []) + list(columns or [])
+    ))
+    unknown = [c for c in result_columns if c not in table]
+    if unknown:
+        raise FilterError(f"Unknown column: {unknown[0]}")
+
+    rows = []
+    for i in matches:
+        row = {'symbol': panel.symbols[i], 'bar_date': panel.bar_dates[i]}
+        for name in result_columns:
+            value = float(table[name][i])
+            row[name] = None if np.isnan(value) else value
+        rows.append(row)
+
+    return {
+        'filter': expression,
+        'matches': rows,
+        'total': int(mask.sum()),
+        'universe': len(panel),
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def get_universe():
+    """
+    Danh sách mã để screen: AI_SCREEN_UNIVERSE (phân tách bằng dấu phẩy),
+    nếu không có thì lấy toàn bộ mã niêm yết từ data source, lỗi thì dùng các mã VN30 đã biết
+    """
+    universe = os.getenv('AI_SCREEN_UNIVERSE')
+    if universe:
+        return [s.strip().upper() for s in universe.split(',') if s.strip()]
+    try:
+        from data_source import get_data_source
+        return [s for s in map(str, get_data_source().list_symbols()) if len(s) == 3]
+    except Exception as e:
+        log(f"⚠ Could not load listing, using VN30 symbols: {e}")
+        return sorted(SECTORS)
+
+
+def _latest_indicators(symbol, end_date):
+    """Dòng chỉ báo mới nhất của một mã từ nến ngày trong bar store"""
+    from bar_store import fetch_bars
+    from feature_engineering import add_technical_indicators, get_lookback_start_date
+
+    bars = fetch_bars(symbol, get_lookback_start_date(end_date), end_date, interval='1D')
+    if bars.empty:
+        return None
+    df = add_technical_indicators(bars, copy=False)
+    latest = df.iloc[-1]
+    return {name: float(latest[name]) for name in PANEL_COLUMNS}, str(latest['time'])[:10]
+
+
+def load_panel(symbols=None, end_date=None, panel=None, max_workers=SCREEN_WORKERS):
+    """
+    Tính dòng chỉ báo mới nhất cho từng mã (song song) và ghi vào panel
+    """
+    symbols = symbols or get_universe()
+    end_date = end_date or datetime.now().strftime('%Y-%m-%d')
+    panel = panel or IndicatorPanel()
+    start = time.perf_counter()
+
+    def load(symbol):
+        try:
+            return symbol, _latest_indicators(symbol, end_date)
+        except Exception as e:
+            log(f"⚠ Could not load indicators for {symbol}: {e}")
+            return symbol, None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for symbol, loaded in executor.map(load, symbols):
+            if loaded is not None:
+                values, bar_date = loaded
+                panel.update(symbol, values, bar_date)
+
+    panel.refreshed_at = time.time()
+    panel.bar_date = str(last_completed_bar_date())
+    log(f"✓ Screener panel loaded: {len(panel)} symbols in {time.perf_counter() - start:.1f}s")
+    return panel
+
+
+_panel = None
+_panel_lock = threading.Lock()
+_refreshing = threading.Event()
+
+
+def _panel_is_stale(panel):
+    if panel.bar_date != str(last_completed_bar_date()):
+        return True
+    return is_market_open() and time.time() - panel.refreshed_at >= SCREEN_REFRESH_SECONDS
+
+
+def get_panel():
+    """
+    Panel dùng chung cho cả process: lần đầu load đồng bộ,
+    sau đó khi cũ (nến ngày mới / quá SCREEN_REFRESH_SECONDS trong phiên) thì làm mới ở thread nền
+    """
+    global _panel
+    if _panel is None:
+        with _panel_lock:
+            if _panel is None:
+                _panel = load_panel()
+        return _panel
+
+    if _panel_is_stale(_panel) and not _refreshing.is_set():
+        _refreshing.set()
+
+        def refresh():
+            global _panel
+            try:
+                _panel = load_panel()
+            finally:
+                _refreshing.clear()
+
+        threading.Thread(target=refresh, name='screener-refresh', daemon=True).start()
+    return _panel
+
+
+def run_screen(data):
+    """
+    Handler cho worker command 'screen'
+
+    Args:
+        data: {filter, sort?, limit?, columns?}
+    """
+    expression = data.get('filter')
+    if not expression:
+        return {"error": "Missing 'filter' expression"}
+    try:
+        return screen(get_panel(), expression, sort=data.get('sort'),
+                      limit=int(data.get('limit', DEFAULT_LIMIT)), columns=data.get('columns'))
+    except FilterError as e:
+        return {"error": str(e)}
+
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    sort = next((a.split('=', 1)[1] for a in sys.argv if a.startswith('--sort=')), None)
+    limit = next((int(a.split('=', 1)[1]) for a in sys.argv if a.startswith('--limit=')), 20)
+
+    result = run_screen({'filter': args[0], 'sort': sort, 'limit': limit})
+    if 'error' in result:
+        print(f"❌ {result['error']}")
+        sys.exit(1)
+    print(f"\n🔎 {result['total']} / {result['universe']} symbols match: {result['filter']} "
+          f"({result['elapsed_ms']:.2f} ms)")
+    for row in result['matches']:
+        print(f"   {row['symbol']:<6} " + "  ".join(
+            f"{k}={v:,.2f}" for k, v in row.items() if k not in ('symbol', 'bar_date') and v is not None
+        ))
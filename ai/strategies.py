@@ -0,0 +1,183 @@
+"""
+Strategies - bộ quy tắc tín hiệu BUY/SELL dùng chung cho signal realtime và backtest
+(cùng logic với GenerateSignalsUseCase bên NestJS), tính vector hoá cho nhiều mã / nhiều phiên một lần
+
+Mỗi chiến lược là các biểu thức theo cú pháp của screener trên các cột chỉ báo:
+- buy / sell: điều kiện (buy được ưu tiên nếu cả hai cùng đúng; sell có thể bỏ trống)
+- target_buy / target_sell: giá mục tiêu (mặc định là giá AI dự đoán, không có thì là giá đóng cửa)
+"""
+
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from screener import evaluate_filter, evaluate_expression
+
+# Danh sách mã theo dõi mặc định của signal cron
+WATCH_LIST = ['VCB', 'VNM', 'FPT', 'VIC', 'HPG']
+SIGNAL_WORKERS = int(os.getenv('AI_SIGNAL_WORKERS', 8))
+
+STRATEGIES = [
+    {
+        'name': 'OPTIMIZED_BOUNCE',
+        'buy': 'RSI < 40 and MACD > MACD_signal and prediction > close and volume_ratio > 1.2',
+        'sell': 'RSI > 60 and MACD < MACD_signal and prediction < close',
+        'confidence': 80,
+    },
+    {
+        'name': 'AI_HIGH_CONVICTION',
+        'buy': 'top_importance > 0.15 and change_pct > 4',
+        'sell': 'top_importance > 0.15 and change_pct < -4',
+        'confidence': 90,
+    },
+    {
+        'name': 'VN_EXTREME_RSI',
+        'buy': 'RSI < 25 and volume_ratio > 1.5',
+        'sell': 'RSI > 75 and volume_ratio > 1.5',
+        'confidence': 70,
+        'target_buy': 'close * 1.07',
+        'target_sell': 'close * 0.93',
+    },
+    {
+        'name': 'SMART_BB_BREAKOUT',
+        'buy': 'close > BB_high and volume_ratio > 1.8',
+        'sell': 'close < BB_low and volume_ratio > 1.8',
+        'confidence': 75,
+    },
+    {
+        'name': 'TREND_CONFIRMATION',
+        'buy': 'EMA_12 > EMA_26 and SMA20 > SMA50',
+        'sell': 'EMA_12 < EMA_26 and SMA20 < SMA50',
+        'confidence': 70,
+    },
+]
+
+# Bộ quy tắc của backtest (chỉ BUY, giữ lệnh vài phiên): không backtrack được AI prediction từng ngày cũ
+# nên AI_TREND giả lập xu hướng AI bằng momentum thực tế, và OPTIMIZED_BOUNCE bỏ điều kiện prediction > close
+BACKTEST_STRATEGIES = [
+    {'name': 'OPTIMIZED_BOUNCE', 'buy': 'RSI < 40 and MACD > MACD_signal and volume_ratio > 1.2'},
+    {'name': 'AI_TREND', 'buy': 'momentum_5d > 0.05 and volume_ratio > 1.3'},
+    {'name': 'VN_EXTREME_RSI', 'buy': 'RSI < 25 and volume_ratio > 1.5'},
+    {'name': 'SMART_BB_BREAKOUT', 'buy': 'close > BB_high and volume_ratio > 1.6'},
+    {'name': 'TREND_CONFIRMATION', 'buy': 'EMA_12 > EMA_26 and SMA20 > SMA50'},
+]
+
+# Tên trong 'indicators' của get_prediction_data -> tên cột chỉ báo
+PREDICTION_INDICATORS = {
+    'rsi': 'RSI',
+    'macd': 'MACD',
+    'macd_signal': 'MACD_signal',
+    'bb_pos': 'BB_position',
+    'bb_upper': 'BB_high',
+    'bb_lower': 'BB_low',
+    'sma20': 'SMA20',
+    'sma50': 'SMA50',
+    'ema12': 'EMA_12',
+    'ema26': 'EMA_26',
+    'volume_ratio': 'volume_ratio',
+}
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def evaluate_strategies(table, strategies=STRATEGIES):
+    """
+    Tính tín hiệu của mọi chiến lược trên mọi dòng của table trong một lượt
+
+    Args:
+        table: dict / DataFrame cột -> mảng (dòng = mã, hoặc = phiên khi backtest)
+            cần có close và các cột mà biểu thức của strategies dùng tới
+            (STRATEGIES: prediction, change_pct, top_importance + chỉ báo)
+
+    Returns:
+        dict tên chiến lược -> {'type': mảng 'BUY'/'SELL'/'HOLD', 'target': mảng giá mục tiêu,
+                                'confidence': int hoặc None}
+    """
+    results = {}
+    target_column = 'prediction' if 'prediction' in table else 'close'
+    for strategy in strategies:
+        buy = evaluate_filter(strategy['buy'], table)
+        sell = evaluate_filter(strategy['sell'], table) & ~buy if 'sell' in strategy else np.zeros_like(buy)
+        types = np.where(buy, 'BUY', np.where(sell, 'SELL', 'HOLD'))
+
+        target = np.asarray(table[target_column], dtype=np.float64).copy()
+        if 'target_buy' in strategy:
+            target[buy] = evaluate_expression(strategy['target_buy'], table)[buy]
+        if 'target_sell' in strategy:
+            target[sell] = evaluate_expression(strategy['target_sell'], table)[sell]
+
+        results[strategy['name']] = {'type': types, 'target': target, 'confidence': strategy.get('confidence')}
+    return results
+
+
+def build_signal_table(predictions):
+    """
+    Gom kết quả get_prediction_data của nhiều mã thành bảng cột
+
+    Returns:
+        (symbols, dict cột -> np.ndarray)
+    """
+    symbols = [p['symbol'] for p in predictions]
+    columns = {name: np.full(len(predictions), np.nan) for name in
+               ['close', 'prediction', 'change_pct', 'top_importance'] + list(PREDICTION_INDICATORS.values())}
+    for i, p in enumerate(predictions):
+        columns['close'][i] = p['latest_close']
+        columns['prediction'][i] = p['prediction']
+        columns['change_pct'][i] = (p['prediction'] - p['latest_close']) / p['latest_close'] * 100
+        top_features = p.get('top_features') or []
+        if top_features:
+            columns['top_importance'][i] = top_features[0]['importance']
+        for key, name in PREDICTION_INDICATORS.items():
+            if key in p.get('indicators', {}):
+                columns[name][i] = p['indicators'][key]
+    return symbols, columns
+
+
+def generate_signals(symbols=None, max_workers=SIGNAL_WORKERS):
+    """
+    Tín hiệu BUY/SELL cho toàn bộ danh sách mã theo dõi trong một lần gọi
+    (prediction lấy qua cache của get_prediction_data, chiến lược tính vector hoá)
+
+    Returns:
+        dict {signals: [{symbol, strategy, type, confidence, price, target_price}], evaluated, errors, elapsed_ms}
+    """
+    from predict import get_prediction_data
+
+    start = time.perf_counter()
+    symbols = symbols or WATCH_LIST
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(get_prediction_data, symbols))
+
+    predictions, errors = [], {}
+    for symbol, result in zip(symbols, results):
+        if 'error' in result or 'status' in result or not result.get('indicators'):
+            errors[symbol] = result.get('error', result.get('status', 'No indicators'))
+        else:
+            predictions.append(result)
+
+    signals = []
+    if predictions:
+        names, table = build_signal_table(predictions)
+        for strategy, evaluated in evaluate_strategies(table).items():
+            for i in np.flatnonzero(evaluated['type'] != 'HOLD'):
+                signals.append({
+                    'symbol': names[i],
+                    'strategy': strategy,
+                    'type': str(evaluated['type'][i]),
+                    'confidence': evaluated['confidence'],
+                    'price': float(table['close'][i]),
+                    'target_price': float(evaluated['target'][i]),
+                })
+
+    return {
+        'signals': signals,
+        'evaluated': len(predictions),
+        'errors': errors,
+        'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+    }
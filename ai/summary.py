@@ -2,22 +2,25 @@
 Demo đơn giản - Hiển thị kết quả training
 """
 
-import joblib
 import os
+from model_artifact import read_manifest, artifact_dir, MODELS_DIR
 
 print("\n" + "="*70)
 print(" " * 15 + "📊 STOCK PREDICTION MODEL - SUMMARY")
 print("="*70)
 
 # Check files
-models_dir = "models"
-files = [f for f in os.listdir(models_dir) if 'VCB' in f and f.endswith('.pkl')]
+models_dir = MODELS_DIR
+files = [os.path.join(models_dir, f) for f in os.listdir(models_dir) if 'VCB' in f and f.endswith('.pkl')]
+vcb_artifact = artifact_dir(models_dir, 'VCB')
+if os.path.isdir(vcb_artifact):
+    files += [os.path.join(vcb_artifact, f) for f in os.listdir(vcb_artifact)]
 
 print(f"\n✅ MODELS CREATED: {len(files)} files")
 print("-" * 70)
 for f in sorted(files):
-    size = os.path.getsize(os.path.join(models_dir, f))
-    print(f"   {f:<35} {size/1024:>10,.1f} KB")
+    size = os.path.getsize(f)
+    print(f"   {os.path.relpath(f, models_dir):<50} {size/1024:>10,.1f} KB")
 
 # Load and show info
 print("\n" + "="*70)
@@ -25,22 +28,43 @@ print(" " * 20 + "📈 MODEL DETAILS")
 print("="*70)
 
 try:
-    # Advanced model
-    model_adv = joblib.load('models/model_VCB_advanced.pkl')
-    print(f"\n🤖 ADVANCED MODEL (Gradient Boosting)")
-    print(f"   Algorithm:      {type(model_adv).__name__}")
-    print(f"   Estimators:     {model_adv.n_estimators}")
-    print(f"   Max Depth:      {model_adv.max_depth}")
-    print(f"   Learning Rate:  {model_adv.learning_rate}")
+    # Artifact mới: đọc metadata + metrics từ manifest, không load model
+    manifest = read_manifest(artifact_dir(models_dir, 'VCB'))
     
-    # Simple model
-    model_simple = joblib.load('models/model_VCB_simple.pkl')
-    print(f"\n📝 SIMPLE MODEL (Linear Regression)")
-    print(f"   Algorithm:      {type(model_simple).__name__}")
-    print(f"   Coefficients:   {len(model_simple.coef_)}")
+    if manifest is not None:
+        metadata = manifest['metadata']
+        metrics = manifest.get('metrics', {})
+        print(f"\n🤖 ADVANCED MODEL (Gradient Boosting)")
+        print(f"   Algorithm:      {metadata.get('advanced_type', 'N/A')}")
+        print(f"   Test MAE:       {metrics.get('advanced', {}).get('mae', 0):,.2f}")
+        print(f"   Test R²:        {metrics.get('advanced', {}).get('r2', 0):.4f}")
+        print(f"   Trained:        {metadata.get('start_date')} → {metadata.get('last_bar_date')}")
+        
+        print(f"\n📝 SIMPLE MODEL (Linear Regression)")
+        print(f"   Algorithm:      {metadata.get('simple_type', 'N/A')}")
+        print(f"   Test MAE:       {metrics.get('simple', {}).get('mae', 0):,.2f}")
+        
+        features = manifest['features']
+    else:
+        import joblib
+        
+        # Advanced model
+        model_adv = joblib.load(os.path.join(models_dir, 'model_VCB_advanced.pkl'))
+        print(f"\n🤖 ADVANCED MODEL (Gradient Boosting)")
+        print(f"   Algorithm:      {type(model_adv).__name__}")
+        print(f"   Estimators:     {model_adv.n_estimators}")
+        print(f"   Max Depth:      {model_adv.max_depth}")
+        print(f"   Learning Rate:  {model_adv.learning_rate}")
+        
+        # Simple model
+        model_simple = joblib.load(os.path.join(models_dir, 'model_VCB_simple.pkl'))
+        print(f"\n📝 SIMPLE MODEL (Linear Regression)")
+        print(f"   Algorithm:      {type(model_simple).__name__}")
+        print(f"   Coefficients:   {len(model_simple.coef_)}")
+        
+        features = joblib.load(os.path.join(models_dir, 'features_VCB.pkl'))
     
     # Features
-    features = joblib.load('models/features_VCB.pkl')
     print(f"\n📊 FEATURES")
     print(f"   Total Features: {len(features)}")
     print(f"\n   Feature List:")
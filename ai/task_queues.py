@@ -0,0 +1,357 @@
+"""
+Task Queues - tách task interactive (người dùng đang chờ) khỏi task batch (backtest, train)
+
+NestJS vẫn gửi mọi request vào queue `ai_tasks`; router đọc ai_tasks và publish lại sang queue theo loại
+command (giữ nguyên reply_to / correlation_id, message contract không đổi):
+    ai_tasks.interactive   predict, sentiment, market, screen, signals_batch, cache_stats, metrics, monitor, queues
+    ai_tasks.batch         backtest, retrain (+ predict cần train model)
+Mỗi queue có nhóm consumer riêng (AI_INTERACTIVE_CONSUMERS / AI_BATCH_CONSUMERS, mỗi consumer một kết nối,
+prefetch 1), nên predict không phải xếp hàng sau một backtest 10 phút. Predict cho mã chưa có model không
+train tại consumer interactive mà được chuyển sang queue batch (consumer batch train xong mới reply).
+
+Deadline: router gắn header x-deadline = lúc nhận + deadline của command (DEADLINES, đổi bằng
+AI_DEADLINE_<CMD>=giây, hoặc data.timeout_ms của từng request). RPC đã quá hạn bị bỏ (không chạy / không reply)
+vì phía NestJS đã timeout; job không cần reply (retrain) không có deadline.
+
+Thống kê theo queue: độ sâu (đọc định kỳ), thời gian chờ trong queue (p50 / p95), số task xử lý / hết hạn /
+chuyển queue / lỗi - qua command 'queues' và metrics (queue_depth, queue_wait_p95_ms, queue_tasks_total...)
+
+Usage:
+    AI_WORKER_MODE=routed python worker_service.py
+    python task_queues.py [interactive] [batch] [router]   # chỉ chạy một phần (mặc định: tất cả)
+"""
+
+import os
+import sys
+import json
+import time
+import math
+import threading
+from collections import deque
+
+from worker_service import RABBITMQ_URL, PRELOAD, preload, run_command, parse_request
+from instrumentation import get_registry, start_exporters
+from profiling import profile_request, should_profile
+
+INGRESS_QUEUE = 'ai_tasks'
+QUEUES = {
+    'interactive': 'ai_tasks.interactive',
+    'batch': 'ai_tasks.batch',
+}
+BATCH_COMMANDS = {'backtest', 'retrain'}
+CONSUMERS = {
+    'interactive': int(os.getenv('AI_INTERACTIVE_CONSUMERS', 2)),
+    'batch': int(os.getenv('AI_BATCH_CONSUMERS', 1)),
+}
+
+# Deadline mặc định (giây) của RPC theo command; command khác dùng DEFAULT_DEADLINE
+DEADLINES = {
+    'predict': 60,
+    'sentiment': 60,
+    'market': 60,
+    'screen': 120,
+    'backtest': 900,
+    # Cron signal chạy mỗi 30 giây: kết quả cũ hơn một chu kỳ không còn dùng được
+    'signals_batch': 30,
+}
+DEFAULT_DEADLINE = 60
+
+QUEUE_STATS_INTERVAL = int(os.getenv('AI_QUEUE_STATS_INTERVAL', 10))
+RECONNECT_DELAY = 5
+WAIT_SAMPLES = 500
+
+# Header của message đã qua router
+ENQUEUED_HEADER = 'x-enqueued-at'
+DEADLINE_HEADER = 'x-deadline'
+TRAIN_HEADER = 'x-train'
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def command_class(cmd):
+    return 'batch' if cmd in BATCH_COMMANDS else 'interactive'
+
+
+def _positive_seconds(value):
+    """float > 0 hữu hạn, hoặc None nếu giá trị không hợp lệ (chuỗi rác, NaN, âm...)"""
+    try:
+        seconds = float(value)
+    except (TypeError, ValueError):
+        return None
+    return seconds if math.isfinite(seconds) and seconds > 0 else None
+
+
+def deadline_seconds(cmd, data):
+    """
+    Deadline (giây) của một RPC: data.timeout_ms > AI_DEADLINE_<CMD> > DEADLINES
+    Giá trị không hợp lệ bị bỏ qua (không bao giờ raise)
+    """
+    if isinstance(data, dict) and data.get('timeout_ms'):
+        seconds = _positive_seconds(data['timeout_ms'])
+        if seconds is not None:
+            return seconds / 1000
+    seconds = _positive_seconds(os.getenv(f'AI_DEADLINE_{str(cmd).upper()}'))
+    if seconds is not None:
+        return seconds
+    return DEADLINES.get(cmd, DEFAULT_DEADLINE) if isinstance(cmd, str) else DEFAULT_DEADLINE
+
+
+def _header_time(headers, name):
+    """Timestamp trong header (float), None nếu thiếu hoặc không hợp lệ"""
+    return _positive_seconds(headers.get(name))
+
+
+class QueueStats:
+    """Thống kê theo loại queue (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._depth = {cls: None for cls in QUEUES}
+        self._waits = {cls: deque(maxlen=WAIT_SAMPLES) for cls in QUEUES}
+        self._counts = {cls: {'processed': 0, 'expired': 0, 'forwarded': 0, 'errors': 0} for cls in QUEUES}
+        self._in_flight = {cls: 0 for cls in QUEUES}
+
+    def set_depth(self, cls, depth):
+        with self._lock:
+            self._depth[cls] = depth
+
+    def observe_wait(self, cls, seconds):
+        with self._lock:
+            self._waits[cls].append(seconds)
+
+    def count(self, cls, result):
+        with self._lock:
+            self._counts[cls][result] += 1
+
+    def started(self, cls):
+        with self._lock:
+            self._in_flight[cls] += 1
+
+    def finished(self, cls):
+        with self._lock:
+            self._in_flight[cls] -= 1
+
+    @staticmethod
+    def _percentile(values, q):
+        if not values:
+            return None
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 1)
+
+    def snapshot(self):
+        with self._lock:
+            return {cls: {
+                'queue': QUEUES[cls],
+                'depth': self._depth[cls],
+                'in_flight': self._in_flight[cls],
+                'wait_p50_ms': self._percentile(self._waits[cls], 0.5),
+                'wait_p95_ms': self._percentile(self._waits[cls], 0.95),
+                **self._counts[cls],
+            } for cls in QUEUES}
+
+    def samples(self):
+        """Collector cho instrumentation (metrics export)"""
+        samples = []
+        for cls, stats in self.snapshot().items():
+            labels = {'class': cls}
+            for name in ('depth', 'in_flight', 'wait_p50_ms', 'wait_p95_ms'):
+                if stats[name] is not None:
+                    samples.append((f'queue_{name}', labels, stats[name]))
+            for result in ('processed', 'expired', 'forwarded', 'errors'):
+                samples.append(('queue_tasks_total', {**labels, 'result': result}, stats[result]))
+        return samples
+
+
+_stats = QueueStats()
+get_registry().register_collector(_stats.samples)
+
+
+def get_queue_stats():
+    return _stats
+
+
+def _connect():
+    import pika
+    connection = pika.BlockingConnection(pika.URLParameters(RABBITMQ_URL))
+    channel = connection.channel()
+    channel.queue_declare(queue=INGRESS_QUEUE, durable=True)
+    for queue in QUEUES.values():
+        channel.queue_declare(queue=queue, durable=True)
+    return connection, channel
+
+
+def _republish(ch, queue, body, props, headers):
+    import pika
+    ch.basic_publish(
+        exchange='',
+        routing_key=queue,
+        body=body,
+        properties=pika.BasicProperties(
+            reply_to=props.reply_to,
+            correlation_id=props.correlation_id,
+            content_type=props.content_type,
+            delivery_mode=2,
+            headers=headers,
+        ),
+    )
+
+
+def route_message(ch, method, props, body):
+    """Router: ai_tasks -> queue theo loại command, gắn thời điểm nhận + deadline"""
+    _, cmd, data = parse_request(body)
+    cls = command_class(cmd)
+    now = time.time()
+    headers = dict(props.headers) if isinstance(props.headers, dict) else {}
+    enqueued = _header_time(headers, ENQUEUED_HEADER)
+    if enqueued is None:
+        enqueued = headers[ENQUEUED_HEADER] = now
+    if props.reply_to and _header_time(headers, DEADLINE_HEADER) is None:
+        headers[DEADLINE_HEADER] = enqueued + deadline_seconds(cmd, data)
+    # Publish (có publisher confirm) rồi mới ack: router chết giữa chừng thì message được giao lại
+    _republish(ch, QUEUES[cls], body, props, headers)
+    ch.basic_ack(delivery_tag=method.delivery_tag)
+
+
+def _reply(ch, props, response):
+    import pika
+    ch.basic_publish(
+        exchange='',
+        routing_key=props.reply_to,
+        properties=pika.BasicProperties(correlation_id=props.correlation_id),
+        body=json.dumps(response),
+    )
+
+
+def handle_message(cls, ch, method, props, body):
+    """Consumer của một loại queue: bỏ RPC quá hạn, chạy command, reply"""
+    headers = props.headers if isinstance(props.headers, dict) else {}
+    now = time.time()
+    enqueued = _header_time(headers, ENQUEUED_HEADER)
+    _stats.observe_wait(cls, max(0.0, now - enqueued) if enqueued is not None else 0.0)
+    deadline = _header_time(headers, DEADLINE_HEADER)
+    message, cmd, data = parse_request(body)
+
+    # Predict được chuyển sang để train: vẫn train dù client đã timeout (request sau sẽ có model)
+    if deadline and now > deadline and not headers.get(TRAIN_HEADER):
+        log(f"⌛ Dropping expired {cmd} for {data.get('symbol', 'VCB')} ({now - deadline:.1f}s past deadline)")
+        _stats.count(cls, 'expired')
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+        return
+
+    _stats.started(cls)
+    symbol = None
+    try:
+        symbol = data.get('symbol', 'VCB')
+        if cmd is None:
+            raise ValueError('Invalid message')
+        log(f"📥 [{cls}] Received request: {cmd} for symbol: {symbol}")
+        request_id = message.get('id') or f"{cmd}-{symbol}"
+        with profile_request(request_id, cmd, enabled=should_profile(data.get('profile'))):
+            result = run_command(cmd, data, train=cls != 'interactive')
+
+        if cls == 'interactive' and cmd == 'predict' and result.get('status') == 'training_required':
+            log(f"⚙️ {symbol} needs training, forwarding to {QUEUES['batch']}")
+            _republish(ch, QUEUES['batch'], body, props, {**headers, TRAIN_HEADER: True})
+            _stats.count(cls, 'forwarded')
+            return
+        response = {"err": None, "response": result, "id": message.get('id')}
+        outcome = 'processed'
+    except Exception as e:
+        log(f"❌ Error: {e}")
+        response = {"err": str(e), "response": None, "id": message.get('id')}
+        outcome = 'errors'
+    finally:
+        _stats.finished(cls)
+        ch.basic_ack(delivery_tag=method.delivery_tag)
+
+    if props.reply_to:
+        if deadline and time.time() > deadline:
+            log(f"⌛ {cmd} for {symbol} finished after its deadline, reply dropped")
+            outcome = 'expired'
+        else:
+            _reply(ch, props, response)
+    _stats.count(cls, outcome)
+
+
+def _run_forever(name, target):
+    """Chạy target() trong thread, kết nối lại khi mất kết nối RabbitMQ"""
+    def run():
+        while True:
+            try:
+                target()
+            except Exception as e:
+                log(f"⚠ {name}: {e}, reconnecting in {RECONNECT_DELAY}s")
+                time.sleep(RECONNECT_DELAY)
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
+def consume_class(cls):
+    connection, channel = _connect()
+    try:
+        channel.basic_qos(prefetch_count=1)
+        channel.basic_consume(queue=QUEUES[cls],
+                              on_message_callback=lambda ch, method, props, body: handle_message(cls, ch, method, props, body))
+        channel.start_consuming()
+    finally:
+        connection.close()
+
+
+def consume_ingress():
+    connection, channel = _connect()
+    try:
+        channel.confirm_delivery()
+        channel.basic_qos(prefetch_count=50)
+        channel.basic_consume(queue=INGRESS_QUEUE, on_message_callback=route_message)
+        channel.start_consuming()
+    finally:
+        connection.close()
+
+
+def poll_queue_depths():
+    """Đọc độ sâu các queue mỗi QUEUE_STATS_INTERVAL giây (queue_declare passive)"""
+    connection, channel = _connect()
+    try:
+        while True:
+            for cls, queue in QUEUES.items():
+                _stats.set_depth(cls, channel.queue_declare(queue=queue, passive=True).method.message_count)
+            connection.sleep(QUEUE_STATS_INTERVAL)
+    finally:
+        connection.close()
+
+
+def run_routed_worker(parts=('router', 'interactive', 'batch')):
+    print(f"🚀 Starting routed AI Worker ({', '.join(parts)}; consumers: "
+          f"{', '.join(f'{cls} {CONSUMERS[cls]}' for cls in QUEUES if cls in parts)})...")
+    if PRELOAD:
+        preload()
+
+    threads = []
+    if 'router' in parts:
+        threads.append(_run_forever('queue-router', consume_ingress))
+    for cls in QUEUES:
+        if cls in parts:
+            threads += [_run_forever(f'{cls}-consumer-{i}', lambda cls=cls: consume_class(cls))
+                        for i in range(CONSUMERS[cls])]
+    _run_forever('queue-stats', poll_queue_depths)
+
+    if 'interactive' in parts:
+        from predict import start_prediction_refresher, REFRESH_TOP_N
+        if REFRESH_TOP_N > 0:
+            start_prediction_refresher()
+    start_exporters()
+    print("⌛ Waiting for messages. To exit press CTRL+C")
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    run_routed_worker(tuple(sys.argv[1:]) or ('router', 'interactive', 'batch'))
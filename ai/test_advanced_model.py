@@ -2,10 +2,11 @@
 Test và so sánh Advanced Model với Simple Model
 """
 
-import joblib
-import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from model_artifact import load_symbol_models, MODELS_DIR
+from model_evaluation import load_evaluation_frame, regression_metrics, evaluate_universe, print_report
+
+EVAL_DAYS = 5
 
 
 def test_models(symbol='VCB'):
@@ -16,101 +17,73 @@ def test_models(symbol='VCB'):
     print("🧪 TESTING ADVANCED STOCK PREDICTION MODEL")
     print("=" * 60)
     
-    # Load models
+    # Load models (artifact mới hoặc pickle cũ)
     try:
-        model_advanced = joblib.load(f'models/model_{symbol}_advanced.pkl')
+        model_advanced, model_simple, feature_cols = load_symbol_models(MODELS_DIR, symbol)
         print(f"✓ Loaded advanced model (Gradient Boosting)")
-    except Exception as e:
-        print(f"❌ Could not load advanced model: {e}")
-        return
-    
-    try:
-        model_simple = joblib.load(f'models/model_{symbol}_simple.pkl')
-        print(f"✓ Loaded simple model (Linear Regression)")
-    except Exception as e:
-        print(f"⚠ Could not load simple model: {e}")
-        model_simple = None
-    
-    try:
-        feature_cols = joblib.load(f'models/features_{symbol}.pkl')
+        if model_simple is not None:
+            print(f"✓ Loaded simple model (Linear Regression)")
+        else:
+            print(f"⚠ Could not load simple model")
         print(f"✓ Loaded feature columns ({len(feature_cols)} features)")
     except Exception as e:
-        print(f"❌ Could not load feature columns: {e}")
+        print(f"❌ Could not load advanced model: {e}")
         return
     
-    # Get latest data
+    # Get latest data (5 ngày đánh giá + phiên hiện tại, cache theo ngày)
     print(f"\n📥 Fetching latest data for {symbol}...")
-    import vnstock
-    from feature_engineering import prepare_features
-    
-    end_date = datetime.now().strftime('%Y-%m-%d')
-    start_date = (datetime.now() - timedelta(days=90)).strftime('%Y-%m-%d')
+    from feature_engineering import build_feature_matrix
     
-    quote = vnstock.Quote(symbol=symbol, source='VCI')
-    df_raw = quote.history(start=start_date, end=end_date, interval='1D')
-    
-    if df_raw.empty:
+    df_processed = load_evaluation_frame(symbol, rows=EVAL_DAYS + 1)
+    if df_processed is None:
         print("❌ No data fetched")
         return
     
-    # Prepare features
-    df_processed = prepare_features(df_raw, symbol, start_date, end_date, vnstock)
-    
-    # Get features
-    X = df_processed[feature_cols]
-    
-    print(f"\n✓ Data prepared: {len(X)} samples")
-    
-    # Make predictions for last 5 days
-    print(f"\n🔮 PREDICTIONS FOR LAST 5 DAYS:")
-    print(f"   {'-'*70}")
-    print(f"   {'Date':<12} {'Actual':<12} {'Advanced':<12} {'Simple':<12} {'Error (Adv)':<12}")
-    print(f"   {'-'*70}")
-    
-    errors_advanced = []
-    errors_simple = []
-    
-    for i in range(-5, 0):
-        if i + 1 < len(df_processed):
-            actual = df_processed.iloc[i + 1]['close'] if i + 1 < len(df_processed) else None
+    print(f"\n✓ Data prepared: {len(df_processed)} samples")
+    
+    # Predict 5 ngày cuối + phiên hiện tại trong một lần gọi mỗi model
+    X = build_feature_matrix(df_processed, feature_cols, rows=slice(-(EVAL_DAYS + 1), None))
+    pred_advanced = model_advanced.predict(X.values)
+    pred_simple = model_simple.predict(X.values.astype(np.float64)) if model_simple is not None else np.zeros(len(X))
+    dates = df_processed['time'].astype(str).str[:10].to_numpy()[-len(X):]
+    actual = X.target
+    
+    print(f"\n🔮 PREDICTIONS FOR LAST {EVAL_DAYS} DAYS:")
+    print(f"   {'-'*83}")
+    print(f"   {'Date':<12} {'Actual':<12} {'Advanced':<12} {'Simple':<12} {'Error (Adv)':<12} {'Error (Sim)':<12}")
+    print(f"   {'-'*83}")
+    
+    errors_advanced = np.abs(actual - pred_advanced)
+    errors_simple = np.abs(actual - pred_simple)
+    for i in range(len(X)):
+        if np.isnan(actual[i]):
+            print(f"   {dates[i]:<12} {'N/A':<12} {pred_advanced[i]:<12,.0f} {pred_simple[i]:<12,.0f} {'N/A':<12} {'N/A':<12}")
         else:
-            actual = None
-            
-        features = X.iloc[i:i+1].values
-        pred_advanced = model_advanced.predict(features)[0]
-        pred_simple = model_simple.predict(features)[0] if model_simple else 0
+            error_simple = f"{errors_simple[i]:<12,.0f}" if model_simple is not None else f"{'N/A':<12}"
+            print(f"   {dates[i]:<12} {actual[i]:<12,.0f} {pred_advanced[i]:<12,.0f} {pred_simple[i]:<12,.0f} "
+                  f"{errors_advanced[i]:<12,.0f} {error_simple}")
+    
+    # Metrics trên các phiên đã có giá thực tế
+    known = ~np.isnan(actual)
+    if known.any():
+        previous_close = df_processed['close'].to_numpy()[-len(X):][known]
+        metrics_adv = regression_metrics(actual[known], pred_advanced[known], previous_close)
         
-        date_str = df_processed.iloc[i]['time'].strftime('%Y-%m-%d') if hasattr(df_processed.iloc[i]['time'], 'strftime') else str(df_processed.iloc[i]['time'])[:10]
-        
-        if actual:
-            error_advanced = abs(actual - pred_advanced)
-            error_simple = abs(actual - pred_simple) if model_simple else 0
-            errors_advanced.append(error_advanced)
-            if model_simple:
-                errors_simple.append(error_simple)
-            
-            print(f"   {date_str:<12} {actual:<12,.0f} {pred_advanced:<12,.0f} {pred_simple:<12,.0f} {error_advanced:<12,.0f}")
-        else:
-            print(f"   {date_str:<12} {'N/A':<12} {pred_advanced:<12,.0f} {pred_simple:<12,.0f} {'N/A':<12}")
-    
-    # Calculate average errors
-    if errors_advanced:
-        avg_error_adv = np.mean(errors_advanced)
-        avg_error_sim = np.mean(errors_simple) if errors_simple else 0
-        
-        print(f"   {'-'*70}")
-        print(f"   {'Average Error':<12} {'':<12} {avg_error_adv:<12,.0f} {avg_error_sim:<12,.0f}")
-        
-        if errors_simple:
-            improvement = ((avg_error_sim - avg_error_adv) / avg_error_sim) * 100
+        print(f"   {'-'*83}")
+        if model_simple is not None:
+            metrics_sim = regression_metrics(actual[known], pred_simple[known], previous_close)
+            print(f"   {'Average Error':<12} {'':<12} {metrics_adv['mae']:<12,.0f} {metrics_sim['mae']:<12,.0f}")
+            improvement = ((metrics_sim['mae'] - metrics_adv['mae']) / metrics_sim['mae']) * 100
             print(f"\n   💡 Advanced model is {improvement:.1f}% better than simple model")
+        else:
+            print(f"   {'Average Error':<12} {'':<12} {metrics_adv['mae']:<12,.0f}")
+        print(f"   RMSE: {metrics_adv['rmse']:,.0f}   Directional accuracy: {metrics_adv['directional_accuracy'] * 100:.1f}%")
     
     # Predict next day
     print(f"\n🔮 PREDICTION FOR NEXT TRADING DAY:")
     print(f"   {'-'*40}")
     
-    latest_features = X.iloc[-1:].values
-    prediction_advanced = model_advanced.predict(latest_features)[0]
+    prediction_advanced = pred_advanced[-1]
     latest_close = df_processed.iloc[-1]['close']
     change_pct = ((prediction_advanced - latest_close) / latest_close) * 100
     
@@ -138,10 +111,37 @@ def test_models(symbol='VCB'):
     print(f"{'='*60}\n")
 
 
+def test_universe(symbols=None, window=None):
+    """
+    Đánh giá out-of-sample song song cho mọi mã đã train (gate trước khi promote model)
+    
+    Args:
+        symbols: Danh sách mã (mặc định: mọi mã có model)
+        window: Số phiên cuối để đánh giá (mặc định: các phiên sau ngày train cuối)
+    """
+    import time
+    
+    print("=" * 60)
+    print("🧪 EVALUATING ALL TRAINED MODELS")
+    print("=" * 60)
+    
+    start = time.perf_counter()
+    results = evaluate_universe(symbols, window=window)
+    elapsed = time.perf_counter() - start
+    
+    print_report(results)
+    print(f"\n   ⏱ Evaluated {len(results)} symbols in {elapsed:.1f}s")
+    return results
+
+
 if __name__ == "__main__":
     import sys
     
-    # Kiểm tra arguments
-    symbol = sys.argv[1] if len(sys.argv) > 1 else 'VCB'
-    
-    test_models(symbol)
+    # Kiểm tra arguments: --all [--window=N] để đánh giá toàn bộ universe
+    if '--all' in sys.argv:
+        window = next((int(a.split('=')[1]) for a in sys.argv if a.startswith('--window=')), None)
+        symbols = [a.upper() for a in sys.argv[1:] if not a.startswith('--')]
+        test_universe(symbols or None, window=window)
+    else:
+        symbol = sys.argv[1] if len(sys.argv) > 1 else 'VCB'
+        test_models(symbol)
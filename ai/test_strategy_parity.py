@@ -0,0 +1,169 @@
+"""
+Test parity của strategies.py với logic gốc trên một bộ dữ liệu cố định
+- Signal realtime (generate_signals): so với từng hàm check* của GenerateSignalsUseCase (NestJS)
+- Backtest (simulate_strategies): so với vòng lặp từng phiên của backtest_strategies bản cũ
+
+Usage:
+    python test_strategy_parity.py
+    python -m pytest test_strategy_parity.py
+"""
+
+import numpy as np
+import pandas as pd
+
+from strategies import generate_signals
+from backtest_strategies import simulate_strategies, HOLD_DAYS
+
+N_ROWS = 400
+
+
+def fixed_predictions(n=N_ROWS, seed=7):
+    """Kết quả get_prediction_data giả lập, trải đều quanh mọi ngưỡng của các chiến lược"""
+    rng = np.random.default_rng(seed)
+    predictions = []
+    for i in range(n):
+        close = float(rng.uniform(10_000, 100_000))
+        predictions.append({
+            'symbol': f'S{i:03d}',
+            'latest_close': close,
+            'prediction': close * (1 + rng.normal(0, 0.05)),
+            'top_features': [{'importance': float(rng.uniform(0, 0.3))}] if i % 10 else [],
+            'indicators': {
+                'rsi': float(rng.uniform(10, 90)),
+                'macd': float(rng.normal(0, 1)),
+                'macd_signal': float(rng.normal(0, 1)),
+                'volume_ratio': float(rng.uniform(0.5, 2.5)),
+                'bb_upper': close * (1 + rng.normal(0, 0.03)),
+                'bb_lower': close * (1 - abs(rng.normal(0, 0.05))),
+                'sma20': close * (1 + rng.normal(0, 0.03)),
+                'sma50': close * (1 + rng.normal(0, 0.03)),
+                'ema12': close * (1 + rng.normal(0, 0.03)),
+                'ema26': close * (1 + rng.normal(0, 0.03)),
+            },
+        })
+    return predictions
+
+
+def reference_signals(data):
+    """Các hàm check* của GenerateSignalsUseCase, giữ nguyên thứ tự if / else"""
+    price, prediction, ind = data['latest_close'], data['prediction'], data['indicators']
+    results = []
+
+    bullish = ind['rsi'] < 40 and ind['macd'] > ind['macd_signal'] and prediction > price and ind['volume_ratio'] > 1.2
+    bearish = ind['rsi'] > 60 and ind['macd'] < ind['macd_signal'] and prediction < price
+    results.append(('OPTIMIZED_BOUNCE', 'BUY' if bullish else 'SELL' if bearish else 'HOLD', 80, None))
+
+    change_pct = (prediction - price) / price * 100
+    top = data['top_features']
+    high_confidence = bool(top) and top[0]['importance'] > 0.15
+    signal = 'HOLD'
+    if high_confidence and change_pct > 4:
+        signal = 'BUY'
+    if high_confidence and change_pct < -4:
+        signal = 'SELL'
+    results.append(('AI_HIGH_CONVICTION', signal, 90, None))
+
+    signal = 'HOLD'
+    if ind['rsi'] < 25 and ind['volume_ratio'] > 1.5:
+        signal = 'BUY'
+    if ind['rsi'] > 75 and ind['volume_ratio'] > 1.5:
+        signal = 'SELL'
+    results.append(('VN_EXTREME_RSI', signal, 70, price * 1.07 if signal == 'BUY' else price * 0.93))
+
+    signal = 'HOLD'
+    if price > ind['bb_upper'] and ind['volume_ratio'] > 1.8:
+        signal = 'BUY'
+    if price < ind['bb_lower'] and ind['volume_ratio'] > 1.8:
+        signal = 'SELL'
+    results.append(('SMART_BB_BREAKOUT', signal, 75, None))
+
+    signal = 'HOLD'
+    if ind['ema12'] > ind['ema26'] and ind['sma20'] > ind['sma50']:
+        signal = 'BUY'
+    if ind['ema12'] < ind['ema26'] and ind['sma20'] < ind['sma50']:
+        signal = 'SELL'
+    results.append(('TREND_CONFIRMATION', signal, 70, None))
+
+    # targetPrice: strategyResult.target || prediction
+    return {(data['symbol'], name, signal, confidence, round(target or prediction, 6))
+            for name, signal, confidence, target in results if signal != 'HOLD'}
+
+
+def fixed_frame(n=N_ROWS, seed=11):
+    """Các phiên giả lập (đã có chỉ báo) cho backtest"""
+    rng = np.random.default_rng(seed)
+    close = 50_000 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        'close': close,
+        'RSI': rng.uniform(10, 90, n),
+        'MACD': rng.normal(0, 1, n),
+        'MACD_signal': rng.normal(0, 1, n),
+        'volume_ratio': rng.uniform(0.5, 2.5, n),
+        'momentum_5d': rng.normal(0, 0.05, n),
+        'BB_high': close * (1 + rng.normal(0, 0.03, n)),
+        'EMA_12': close * (1 + rng.normal(0, 0.03, n)),
+        'EMA_26': close * (1 + rng.normal(0, 0.03, n)),
+        'SMA20': close * (1 + rng.normal(0, 0.03, n)),
+        'SMA50': close * (1 + rng.normal(0, 0.03, n)),
+    })
+
+
+# Điều kiện BUY của backtest_strategies bản cũ (trước khi dùng chung strategies.py)
+REFERENCE_BACKTEST = {
+    'OPTIMIZED_BOUNCE': lambda r: r['RSI'] < 40 and r['MACD'] > r['MACD_signal'] and r['volume_ratio'] > 1.2,
+    'AI_TREND': lambda r: r['momentum_5d'] > 0.05 and r['volume_ratio'] > 1.3,
+    'VN_EXTREME_RSI': lambda r: r['RSI'] < 25 and r['volume_ratio'] > 1.5,
+    'SMART_BB_BREAKOUT': lambda r: r['close'] > r['BB_high'] and r['volume_ratio'] > 1.6,
+    'TREND_CONFIRMATION': lambda r: r['EMA_12'] > r['EMA_26'] and r['SMA20'] > r['SMA50'],
+}
+
+
+def reference_backtest(df):
+    profits = {name: [] for name in REFERENCE_BACKTEST}
+    for i in range(len(df) - HOLD_DAYS):
+        row = df.iloc[i]
+        for name, check in REFERENCE_BACKTEST.items():
+            if check(row):
+                entry_price = df.iloc[i]['close']
+                exit_price = df.iloc[i + HOLD_DAYS]['close']
+                profits[name].append((exit_price - entry_price) / entry_price * 100)
+    return profits
+
+
+def test_live_signals_match_nestjs_rules():
+    import predict
+
+    by_symbol = {p['symbol']: p for p in fixed_predictions()}
+    original = predict.__dict__.get('get_prediction_data')
+    predict.get_prediction_data = lambda symbol: by_symbol[symbol]
+    try:
+        result = generate_signals(list(by_symbol), max_workers=1)
+    finally:
+        if original is None:
+            del predict.get_prediction_data
+        else:
+            predict.get_prediction_data = original
+
+    expected = set().union(*(reference_signals(p) for p in by_symbol.values()))
+    actual = {(s['symbol'], s['strategy'], s['type'], s['confidence'], round(s['target_price'], 6))
+              for s in result['signals']}
+    assert result['evaluated'] == len(by_symbol)
+    assert {s[1] for s in expected} == {'OPTIMIZED_BOUNCE', 'AI_HIGH_CONVICTION', 'VN_EXTREME_RSI',
+                                        'SMART_BB_BREAKOUT', 'TREND_CONFIRMATION'}
+    assert actual == expected
+
+
+def test_backtest_matches_row_loop():
+    df = fixed_frame()
+    expected = reference_backtest(df)
+    actual = simulate_strategies(df)
+    assert list(actual) == list(REFERENCE_BACKTEST)
+    for name, profits in expected.items():
+        assert len(profits) > 0, name
+        np.testing.assert_allclose(actual[name], profits, err_msg=name)
+
+
+if __name__ == '__main__':
+    for test in (test_live_signals_match_nestjs_rules, test_backtest_matches_row_loop):
+        test()
+        print(f"✓ {test.__name__}")
@@ -0,0 +1,379 @@
+"""
+Tiered Cache - cache dùng chung cho prediction, sentiment và tỷ giá
+Tier 1: LRU trong bộ nhớ (mỗi process)
+Tier 2: SQLite trên đĩa (WAL, dùng chung giữa các worker trên cùng host)
+
+- TTL riêng cho từng namespace + khoảng stale (stale-while-revalidate)
+- Namespace theo lịch giao dịch: key gắn với nến ngày đã đóng cửa, hết hạn ngay sau giờ đóng cửa
+- Ghi atomic (transaction SQLite), giới hạn dung lượng (evict theo LRU)
+- Đếm hit/miss theo namespace để theo dõi hit-rate
+"""
+
+import os
+import sys
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict, namedtuple, defaultdict
+from datetime import timedelta
+
+from trading_calendar import last_completed_bar_date, previous_trading_day, is_market_open
+from instrumentation import get_registry
+
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.getenv('AI_CACHE_PATH', os.path.join(CURRENT_DIR, 'cache', 'cache.db'))
+MEMORY_ITEMS = int(os.getenv('AI_CACHE_MEMORY_ITEMS', 1024))
+MAX_DISK_BYTES = int(os.getenv('AI_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Kiểm tra dung lượng / dọn entry hết hạn sau mỗi N lần ghi
+EVICTION_CHECK_EVERY = 100
+
+# ttl: còn "fresh" trong bao lâu; stale_ttl: sau khi hết fresh vẫn được phục vụ (stale) thêm bao lâu
+# calendar: key gắn với nến ngày đã đóng cửa gần nhất -> ngoài giờ giao dịch entry không hết hạn,
+#           sang phiên mới (sau giờ đóng cửa) thì tự động miss; ttl chỉ áp dụng trong phiên
+NAMESPACES = {
+    'prediction': {'ttl': 30 * 60, 'stale_ttl': 24 * 3600, 'calendar': True},
+    'sentiment': {'ttl': 24 * 3600, 'stale_ttl': 7 * 24 * 3600, 'calendar': True},
+    'fx': {'ttl': 24 * 3600, 'stale_ttl': 7 * 24 * 3600, 'calendar': True},
+}
+DEFAULT_NAMESPACE = {'ttl': 3600, 'stale_ttl': 0}
+
+# Entry theo lịch được giữ trên đĩa đủ lâu để qua kỳ nghỉ dài nhất (Tết)
+CALENDAR_RETENTION = 14 * 24 * 3600
+
+CacheEntry = namedtuple('CacheEntry', ['value', 'age', 'stale'])
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+class TieredCache:
+    """
+    Cache 2 tầng: LRU trong bộ nhớ + SQLite trên đĩa
+    """
+
+    def __init__(self, path=CACHE_PATH, memory_items=MEMORY_ITEMS, max_disk_bytes=MAX_DISK_BYTES,
+                 namespaces=None):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_disk_bytes = max_disk_bytes
+        self.namespaces = dict(NAMESPACES, **(namespaces or {}))
+
+        self._memory = OrderedDict()  # (namespace, key) -> (payload, created_at)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self._refreshing = set()
+        self._stats = defaultdict(lambda: defaultdict(int))
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._connect().executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                PRIMARY KEY (namespace, key)
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries (accessed_at);
+        ''')
+
+    def _connect(self):
+        """Mỗi thread một connection SQLite"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def _config(self, namespace):
+        return self.namespaces.get(namespace, DEFAULT_NAMESPACE)
+
+    def _remember(self, cache_key, payload, created_at):
+        with self._lock:
+            self._memory[cache_key] = (payload, created_at)
+            self._memory.move_to_end(cache_key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def _retention(self, config):
+        """Entry cũ hơn ngưỡng này bị xoá khỏi đĩa"""
+        if config.get('calendar'):
+            return max(CALENDAR_RETENTION, config['ttl'] + config['stale_ttl'])
+        return config['ttl'] + config['stale_ttl']
+
+    def _storage_key(self, namespace, key, bar_date=None):
+        """Key lưu trữ; namespace theo lịch được gắn thêm ngày nến đã đóng cửa"""
+        if not self._config(namespace).get('calendar'):
+            return (namespace, str(key))
+        return (namespace, f'{key}@{bar_date or last_completed_bar_date()}')
+
+    def _lookup(self, cache_key, ttl, now):
+        """
+        Tìm entry ở memory rồi tới SQLite
+
+        Returns:
+            (payload, created_at, tier) hoặc None
+        """
+        with self._lock:
+            cached = self._memory.get(cache_key)
+            if cached is not None:
+                self._memory.move_to_end(cache_key)
+        tier = 'memory_hits'
+
+        # Bản trong bộ nhớ không còn fresh -> xem worker khác đã ghi bản mới hơn xuống đĩa chưa
+        if cached is None or now - cached[1] >= ttl:
+            try:
+                row = self._connect().execute(
+                    'SELECT value, created_at FROM entries WHERE namespace = ? AND key = ?', cache_key
+                ).fetchone()
+            except sqlite3.Error as e:
+                log(f"⚠ Cache read error: {e}")
+                row = None
+            if row is not None and (cached is None or row[1] > cached[1]):
+                cached = (row[0], row[1])
+                self._remember(cache_key, *cached)
+                tier = 'disk_hits'
+
+        if cached is None:
+            return None
+        return cached[0], cached[1], tier
+
+    def get(self, namespace, key, max_age=None, allow_stale=False):
+        """
+        Đọc một entry
+
+        Args:
+            namespace: 'prediction' / 'sentiment' / 'fx' / ...
+            key: Khoá trong namespace (vd symbol)
+            max_age: Ghi đè TTL của namespace (giây); namespace theo lịch vẫn giới hạn tuổi entry
+                bằng max_age cả ngoài giờ giao dịch
+            allow_stale: True để nhận cả entry đã hết fresh nhưng còn trong stale_ttl
+                (namespace theo lịch: cả entry của phiên trước)
+
+        Returns:
+            CacheEntry(value, age, stale) hoặc None
+        """
+        config = self._config(namespace)
+        ttl = config['ttl'] if max_age is None else max_age
+        limit = ttl + config['stale_ttl'] if allow_stale else ttl
+        now = time.time()
+        stats = self._stats[namespace]
+
+        if config.get('calendar'):
+            bar_date = last_completed_bar_date()
+            # Ngoài giờ giao dịch dữ liệu ngày không đổi -> entry của phiên hiện tại luôn fresh
+            # (trừ khi caller đặt max_age: khi đó max_age là giới hạn trên)
+            if not is_market_open() and max_age is None:
+                ttl = limit = float('inf')
+            cache_key = self._storage_key(namespace, key, bar_date)
+            found = self._lookup(cache_key, ttl, now)
+            if found is None and allow_stale:
+                # Phiên mới vừa đóng cửa: phục vụ entry của phiên trước (stale) trong lúc refresh
+                cache_key = self._storage_key(
+                    namespace, key, previous_trading_day(bar_date - timedelta(days=1))
+                )
+                found = self._lookup(cache_key, 0, now)
+                ttl, limit = 0, self._retention(config)
+        else:
+            cache_key = self._storage_key(namespace, key)
+            found = self._lookup(cache_key, ttl, now)
+
+        if found is None:
+            stats['misses'] += 1
+            return None
+
+        payload, created_at, tier = found
+        age = now - created_at
+        if age >= limit:
+            stats['misses'] += 1
+            return None
+
+        stale = age >= ttl
+        stats['stale_hits' if stale else tier] += 1
+        if tier == 'disk_hits':
+            try:
+                self._connect().execute(
+                    'UPDATE entries SET accessed_at = ? WHERE namespace = ? AND key = ?', (now, *cache_key)
+                )
+            except sqlite3.Error:
+                pass
+        return CacheEntry(json.loads(payload), age, stale)
+
+    def set(self, namespace, key, value, bar_date=None):
+        """
+        Ghi entry vào cả 2 tier (SQLite transaction -> atomic, reader không thấy dữ liệu dở dang)
+
+        Args:
+            bar_date: Nến ngày mà value được tính từ đó (namespace theo lịch), lấy lúc bắt đầu compute;
+                mặc định last_completed_bar_date() lúc ghi. Compute chạy qua giờ đóng cửa vẫn được
+                ghi vào phiên cũ thay vì bị coi là fresh cho phiên mới
+        """
+        cache_key = self._storage_key(namespace, key, bar_date)
+        payload = json.dumps(value, ensure_ascii=False, default=str)
+        now = time.time()
+        self._remember(cache_key, payload, now)
+
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO entries (namespace, key, value, created_at, accessed_at, size) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (*cache_key, payload, now, now, len(payload))
+            )
+        except sqlite3.Error as e:
+            log(f"⚠ Cache write error: {e}")
+            return
+
+        self._stats[namespace]['writes'] += 1
+        with self._lock:
+            self._writes += 1
+            check = self._writes % EVICTION_CHECK_EVERY == 0
+        if check:
+            self.evict()
+
+    def delete(self, namespace, key):
+        cache_key = self._storage_key(namespace, key)
+        with self._lock:
+            self._memory.pop(cache_key, None)
+        self._connect().execute('DELETE FROM entries WHERE namespace = ? AND key = ?', cache_key)
+
+    def evict(self):
+        """
+        Xoá entry quá hạn (hết cả stale_ttl) rồi evict LRU cho tới khi dưới max_disk_bytes
+        """
+        conn = self._connect()
+        now = time.time()
+        evicted = 0
+        try:
+            for namespace, config in self.namespaces.items():
+                cursor = conn.execute(
+                    'DELETE FROM entries WHERE namespace = ? AND created_at < ?',
+                    (namespace, now - self._retention(config))
+                )
+                evicted += cursor.rowcount
+
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            while total > self.max_disk_bytes:
+                rows = conn.execute(
+                    'SELECT namespace, key, size FROM entries ORDER BY accessed_at LIMIT 100'
+                ).fetchall()
+                if not rows:
+                    break
+                victims = []
+                for ns, k, size in rows:
+                    if total <= self.max_disk_bytes:
+                        break
+                    victims.append((ns, k))
+                    total -= size
+                conn.executemany('DELETE FROM entries WHERE namespace = ? AND key = ?', victims)
+                evicted += len(victims)
+        except sqlite3.Error as e:
+            log(f"⚠ Cache eviction error: {e}")
+        self._stats['_all']['evictions'] += evicted
+        return evicted
+
+    def refresh_in_background(self, namespace, key, compute):
+        """
+        Chạy compute() ở thread nền rồi ghi kết quả vào cache.
+        Dedup: mỗi (namespace, key) chỉ có tối đa một refresh đang chạy trong process.
+
+        Returns:
+            True nếu đã khởi động refresh mới, False nếu đang có refresh chạy
+        """
+        cache_key = (namespace, str(key))
+        with self._lock:
+            if cache_key in self._refreshing:
+                return False
+            self._refreshing.add(cache_key)
+
+        def run():
+            try:
+                bar_date = last_completed_bar_date()
+                value = compute()
+                if value is not None:
+                    self.set(namespace, key, value, bar_date=bar_date)
+            except Exception as e:
+                log(f"⚠ Background refresh failed for {namespace}/{key}: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(cache_key)
+
+        threading.Thread(target=run, name=f'cache-refresh-{namespace}-{key}', daemon=True).start()
+        return True
+
+    def get_or_compute(self, namespace, key, compute, max_age=None):
+        """
+        Stale-while-revalidate:
+        - fresh -> trả về ngay
+        - stale -> trả về entry cũ ngay + refresh nền (dedup)
+        - miss -> compute đồng bộ rồi ghi cache
+
+        Returns:
+            CacheEntry (age = 0 nếu vừa compute)
+        """
+        entry = self.get(namespace, key, max_age=max_age, allow_stale=True)
+        if entry is not None:
+            if entry.stale:
+                self.refresh_in_background(namespace, key, compute)
+            return entry
+
+        bar_date = last_completed_bar_date()
+        value = compute()
+        if value is not None:
+            self.set(namespace, key, value, bar_date=bar_date)
+        return CacheEntry(value, 0.0, False)
+
+    def stats(self):
+        """
+        Hit-rate theo namespace
+
+        Returns:
+            dict namespace -> {memory_hits, disk_hits, stale_hits, misses, writes, hit_rate}
+        """
+        result = {}
+        for namespace, counters in self._stats.items():
+            counters = dict(counters)
+            hits = counters.get('memory_hits', 0) + counters.get('disk_hits', 0) + counters.get('stale_hits', 0)
+            lookups = hits + counters.get('misses', 0)
+            if lookups:
+                counters['hit_rate'] = round(hits / lookups, 4)
+            result[namespace] = counters
+        return result
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Cache dùng chung cho cả process"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TieredCache()
+    return _cache
+
+
+def _cache_metrics():
+    """Counter hit/miss theo namespace cho metrics export (chỉ khi cache đã được tạo)"""
+    if _cache is None:
+        return []
+    samples = []
+    for namespace, counters in _cache.stats().items():
+        for event, value in counters.items():
+            if event == 'hit_rate':
+                samples.append(('cache_hit_rate', {'namespace': namespace}, value))
+            else:
+                samples.append(('cache_events_total', {'namespace': namespace, 'event': event}, value))
+    return samples
+
+
+get_registry().register_collector(_cache_metrics)
@@ -0,0 +1,170 @@
+"""
+Trading Calendar cho sàn HOSE/HNX
+Tính ngày giao dịch (bỏ cuối tuần và ngày nghỉ lễ Việt Nam)
+"""
+
+from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+
+# Mùng 1 Tết Nguyên Đán (âm lịch) - sàn nghỉ từ 2 ngày trước đến mùng 4
+LUNAR_NEW_YEAR = {
+    2020: date(2020, 1, 25),
+    2021: date(2021, 2, 12),
+    2022: date(2022, 2, 1),
+    2023: date(2023, 1, 22),
+    2024: date(2024, 2, 10),
+    2025: date(2025, 1, 29),
+    2026: date(2026, 2, 17),
+    2027: date(2027, 2, 6),
+    2028: date(2028, 1, 26),
+    2029: date(2029, 2, 13),
+    2030: date(2030, 2, 3),
+}
+
+# Giỗ Tổ Hùng Vương (10/3 âm lịch)
+HUNG_KINGS_DAY = {
+    2020: date(2020, 4, 2),
+    2021: date(2021, 4, 21),
+    2022: date(2022, 4, 10),
+    2023: date(2023, 4, 29),
+    2024: date(2024, 4, 18),
+    2025: date(2025, 4, 7),
+    2026: date(2026, 4, 26),
+    2027: date(2027, 4, 16),
+    2028: date(2028, 4, 4),
+    2029: date(2029, 4, 23),
+    2030: date(2030, 4, 12),
+}
+
+TET_DAYS_BEFORE = 2
+TET_DAYS_AFTER = 3
+
+# Phiên giao dịch HOSE/HNX (giờ Việt Nam), gồm cả ATO/ATC
+# UTC+7 cố định (Việt Nam không đổi giờ mùa hè) - không cần tzdata trên Windows
+VN_TZ = timezone(timedelta(hours=7), 'ICT')
+SESSION_OPEN = time(9, 0)
+SESSION_CLOSE = time(15, 0)
+
+
+def _to_date(value):
+    """Chuẩn hoá str 'YYYY-MM-DD' / datetime / date về date"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value)[:10], '%Y-%m-%d').date()
+
+
+def _observed(day):
+    """Ngày lễ rơi vào cuối tuần được nghỉ bù vào ngày làm việc kế tiếp"""
+    while day.weekday() >= 5:
+        day += timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=None)
+def vn_holidays(year):
+    """
+    Danh sách ngày sàn HOSE/HNX đóng cửa trong năm (không tính cuối tuần)
+
+    Args:
+        year: Năm dương lịch
+
+    Returns:
+        frozenset các date nghỉ lễ
+    """
+    holidays = set()
+
+    # Ngày lễ dương lịch cố định (nghỉ bù nếu rơi vào cuối tuần)
+    for month, day in [(1, 1), (4, 30), (5, 1)]:
+        holidays.add(_observed(date(year, month, day)))
+
+    # Quốc khánh 2/9 + 1 ngày liền kề (từ 2021)
+    national_day = date(year, 9, 2)
+    holidays.add(_observed(national_day))
+    if year >= 2021:
+        extra = national_day - timedelta(days=1) if national_day.weekday() == 1 else national_day + timedelta(days=1)
+        holidays.add(_observed(extra))
+
+    # Tết Nguyên Đán
+    tet = LUNAR_NEW_YEAR.get(year)
+    if tet:
+        for offset in range(-TET_DAYS_BEFORE, TET_DAYS_AFTER + 1):
+            holidays.add(tet + timedelta(days=offset))
+
+    # Giỗ Tổ Hùng Vương
+    hung_kings = HUNG_KINGS_DAY.get(year)
+    if hung_kings:
+        holidays.add(_observed(hung_kings))
+
+    return frozenset(d for d in holidays if d.weekday() < 5)
+
+
+def is_trading_day(value):
+    """Kiểm tra một ngày có phải ngày giao dịch không"""
+    day = _to_date(value)
+    return day.weekday() < 5 and day not in vn_holidays(day.year)
+
+
+def now_vn():
+    """Thời điểm hiện tại theo giờ Việt Nam"""
+    return datetime.now(VN_TZ)
+
+
+def is_market_open(now=None):
+    """Sàn đang trong phiên giao dịch (ngày giao dịch, 9:00 - 15:00 giờ VN)"""
+    now = now or now_vn()
+    return is_trading_day(now) and SESSION_OPEN <= now.time() < SESSION_CLOSE
+
+
+def last_completed_bar_date(now=None):
+    """
+    Ngày của nến ngày đã hoàn tất gần nhất: hôm nay nếu đã qua giờ đóng cửa,
+    ngược lại là ngày giao dịch trước đó (qua đêm, cuối tuần, ngày lễ không đổi)
+    """
+    now = now or now_vn()
+    today = now.date()
+    if is_trading_day(today) and now.time() >= SESSION_CLOSE:
+        return today
+    return previous_trading_day(today - timedelta(days=1))
+
+
+def previous_trading_day(value):
+    """Ngày giao dịch gần nhất <= value"""
+    day = _to_date(value)
+    while not is_trading_day(day):
+        day -= timedelta(days=1)
+    return day
+
+
+def trading_days_between(start, end):
+    """
+    Danh sách ngày giao dịch trong khoảng [start, end]
+    """
+    day, end = _to_date(start), _to_date(end)
+    days = []
+    while day <= end:
+        if is_trading_day(day):
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+
+def start_date_for_bars(end, n_bars):
+    """
+    Ngày bắt đầu sao cho khoảng [start, end] chứa đúng n_bars phiên giao dịch
+
+    Args:
+        end: Ngày kết thúc (str/date/datetime)
+        n_bars: Số phiên cần lấy
+
+    Returns:
+        str 'YYYY-MM-DD' dùng trực tiếp cho Quote.history(start=...)
+    """
+    day = previous_trading_day(end)
+    remaining = n_bars - 1
+    while remaining > 0:
+        day -= timedelta(days=1)
+        if is_trading_day(day):
+            remaining -= 1
+    return day.strftime('%Y-%m-%d')
@@ -0,0 +1,304 @@
+"""
+Async Worker - worker RabbitMQ chạy trên asyncio (aio-pika), giữ nguyên contract với NestJS:
+    request  { pattern: {cmd} | cmd, data, id }   ->   reply { err, response, id } (qua reply_to)
+
+- Event loop lo toàn bộ I/O với RabbitMQ; mỗi message là một task, command là coroutine
+- Phần CPU (features, predict, backtest, screener, chấm sentiment) chạy trên CPU executor nhỏ
+  (AI_ASYNC_CPU_WORKERS); train model là subprocess chờ bằng asyncio (không giữ thread nào)
+- Sentiment: tải trang tin bằng aiohttp (coroutine, không chiếm thread), chỉ phần parse + chấm điểm
+  chạy trên CPU executor; thiếu aiohttp thì chạy bản đồng bộ trên I/O executor
+- Còn chạy đồng bộ trên I/O executor (AI_ASYNC_IO_WORKERS): market, monitor - vnstock không có API async.
+  Predict fetch dữ liệu (vnstock) ngay trong get_prediction_data nên vẫn nằm trên CPU executor
+- Backpressure: prefetch (AI_ASYNC_PREFETCH) giới hạn số message chưa ack broker được gửi tới,
+  semaphore (AI_ASYNC_MAX_IN_FLIGHT) giới hạn số command chạy đồng thời, không vượt tổng số thread
+  của hai executor (command chờ executor không giữ message mà không làm gì)
+- Profile (data.profile / AI_PROFILE_EVERY) như worker đồng bộ: cProfile chỉ đo thread gọi nó nên
+  mỗi lần chạy trên executor của request được chọn được profile ngay trong thread executor
+- SIGTERM / SIGINT: ngừng nhận message, chờ các command đang chạy xong rồi đóng kết nối
+
+Usage:
+    AI_WORKER_MODE=async python worker_service.py
+    python worker_async.py
+"""
+
+import os
+import sys
+import json
+import signal
+import asyncio
+import functools
+from contextvars import ContextVar
+from concurrent.futures import ThreadPoolExecutor
+
+from worker_service import RABBITMQ_URL, PRELOAD, preload, run_command, training_args, parse_request
+from instrumentation import collect_timings, get_registry, start_exporters
+from profiling import profile_request, should_profile
+
+CPU_WORKERS = int(os.getenv('AI_ASYNC_CPU_WORKERS', os.cpu_count() or 2))
+IO_WORKERS = int(os.getenv('AI_ASYNC_IO_WORKERS', 16))
+MAX_IN_FLIGHT = min(int(os.getenv('AI_ASYNC_MAX_IN_FLIGHT', CPU_WORKERS + IO_WORKERS)), CPU_WORKERS + IO_WORKERS)
+PREFETCH = int(os.getenv('AI_ASYNC_PREFETCH', MAX_IN_FLIGHT))
+QUEUE_NAME = 'ai_tasks'
+
+# Command chạy bằng run_command của worker_service, theo loại executor
+CPU_COMMANDS = {'backtest', 'screen', 'signals_batch'}
+IO_COMMANDS = {'market', 'monitor'}
+INLINE_COMMANDS = {'cache_stats', 'metrics', 'queues'}
+
+_cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix='ai-cpu')
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='ai-io')
+_in_flight = 0
+_http_session = None
+# [request_id, cmd, số lần chạy trên executor] khi request của task hiện tại được profile
+_profiling = ContextVar('profiling', default=None)
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def _in_flight_metrics():
+    return [('async_in_flight', {}, _in_flight)]
+
+
+get_registry().register_collector(_in_flight_metrics)
+
+
+def _run_profiled(request_id, label, func, *args):
+    with profile_request(request_id, label):
+        return func(*args)
+
+
+def _executor_call(func):
+    """func, hoặc func được bọc profile_request nếu request của task hiện tại được chọn profile"""
+    profiling = _profiling.get()
+    if profiling is None:
+        return func
+    # Request chạy executor nhiều lần (vd predict -> train -> predict): mỗi lần một file profile
+    request_id, cmd, calls = profiling
+    profiling[2] = calls = calls + 1
+    return functools.partial(_run_profiled, request_id, cmd if calls == 1 else f'{cmd}-{calls}', func)
+
+
+async def run_cpu(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_cpu_executor, _executor_call(func), *args)
+
+
+async def run_io(func, *args):
+    return await asyncio.get_running_loop().run_in_executor(_io_executor, _executor_call(func), *args)
+
+
+async def run_training(symbol, incremental=False):
+    """Train trong subprocess, chờ bằng asyncio. Returns: (returncode, stderr)"""
+    process = await asyncio.create_subprocess_exec(
+        *training_args(symbol, incremental), stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+    _, stderr = await process.communicate()
+    return process.returncode, stderr.decode(errors='replace')
+
+
+def _predict(symbol, with_timings):
+    from predict import get_prediction_data
+    with collect_timings(enabled=with_timings) as timings:
+        result = get_prediction_data(symbol)
+    return result, timings
+
+
+async def predict_command(data):
+    symbol = data.get('symbol', 'VCB')
+    with_timings = bool(data.get('timings'))
+    result, timings = await run_cpu(_predict, symbol, with_timings)
+
+    if result.get('status') == 'training_required':
+        log(f"⚙️ Training model for {symbol}...")
+        returncode, stderr = await run_training(symbol)
+        if returncode == 0:
+            result, timings = await run_cpu(_predict, symbol, with_timings)
+        else:
+            result = {"error": f"Training failed: {stderr}"}
+
+    # Copy để không sửa dict trong cache
+    if with_timings:
+        result = {**result, 'timings': timings}
+    return result
+
+
+async def retrain_command(data):
+    symbol = data.get('symbol', 'VCB')
+    mode = data.get('mode', 'incremental')
+    log(f"🔁 Retraining {symbol} ({mode}): {'; '.join(data.get('reasons', []))}")
+    returncode, stderr = await run_training(symbol, mode == 'incremental')
+    result = {"symbol": symbol, "mode": mode, "success": returncode == 0}
+    if returncode != 0:
+        result["error"] = f"Training failed: {stderr}"
+    return result
+
+
+def get_http_session():
+    """aiohttp.ClientSession dùng chung cho cả worker (None nếu chưa cài aiohttp)"""
+    global _http_session
+    if _http_session is None:
+        try:
+            import aiohttp
+        except ImportError:
+            return None
+        _http_session = aiohttp.ClientSession()
+    return _http_session
+
+
+async def close_http_session():
+    global _http_session
+    if _http_session is not None:
+        await _http_session.close()
+        _http_session = None
+
+
+async def sentiment_command(data):
+    from news_scraper import load_cached_news, fetch_news_pages_async, news_data_from_pages
+
+    symbol = data.get('symbol', 'VCB')
+    session = get_http_session()
+    if session is None:
+        return await run_io(run_command, 'sentiment', data)
+
+    cached = await run_io(load_cached_news, symbol)  # SQLite, không chạy trên event loop
+    if cached is not None:
+        return cached
+    log(f"📰 Fetching sentiment for {symbol}...")
+    pages = await fetch_news_pages_async(session, symbol)
+    return await run_cpu(news_data_from_pages, symbol, pages)
+
+
+async def run_command_async(cmd, data, request_id=None):
+    """
+    Bản asyncio của worker_service.run_command (cùng command, cùng kết quả)
+
+    Profile opt-in (data.profile) hoặc lấy mẫu 1/AI_PROFILE_EVERY request như worker_service
+    """
+    profiling = None
+    if should_profile(data.get('profile')):
+        profiling = [request_id or f"{cmd}-{data.get('symbol', 'VCB')}", cmd, 0]
+    token = _profiling.set(profiling)
+    try:
+        return await _dispatch(cmd, data)
+    finally:
+        _profiling.reset(token)
+
+
+async def _dispatch(cmd, data):
+    if cmd == 'predict':
+        return await predict_command(data)
+    if cmd == 'retrain':
+        return await retrain_command(data)
+    if cmd == 'sentiment':
+        return await sentiment_command(data)
+    if cmd in CPU_COMMANDS:
+        return await run_cpu(run_command, cmd, data)
+    if cmd in IO_COMMANDS:
+        return await run_io(run_command, cmd, data)
+    if cmd in INLINE_COMMANDS:
+        return run_command(cmd, data)
+    return {"error": f"Unknown command: {cmd}"}
+
+
+async def process_message(channel, message, semaphore):
+    global _in_flight
+    import aio_pika
+
+    async with semaphore:
+        _in_flight += 1
+        request_id = None
+        try:
+            # Cùng parser với worker_service / task_queues: message hỏng nhận cùng reply lỗi ở mọi chế độ worker
+            request, cmd, data = parse_request(message.body)
+            request_id = request.get('id')
+            if cmd is None:
+                raise ValueError('Invalid message')
+            log(f"📥 [Async] Received request: {cmd} for symbol: {data.get('symbol', 'VCB')}")
+            response = {"err": None, "response": await run_command_async(cmd, data, request_id), "id": request_id}
+        except Exception as e:
+            log(f"❌ Error: {e}")
+            response = {"err": str(e), "response": None, "id": request_id}
+        finally:
+            _in_flight -= 1
+
+        try:
+            # Job nội bộ như 'retrain' không cần reply
+            if message.reply_to:
+                await channel.default_exchange.publish(
+                    aio_pika.Message(body=json.dumps(response).encode(), correlation_id=message.correlation_id),
+                    routing_key=message.reply_to,
+                )
+        finally:
+            await message.ack()
+
+
+async def serve(stop=None):
+    """Kết nối RabbitMQ và xử lý message tới khi `stop` (asyncio.Event) được set"""
+    import aio_pika
+
+    stop = stop or asyncio.Event()
+    connection = await aio_pika.connect_robust(RABBITMQ_URL)
+    tasks = set()
+    try:
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=PREFETCH)
+        queue = await channel.declare_queue(QUEUE_NAME, durable=True)
+        semaphore = asyncio.Semaphore(MAX_IN_FLIGHT)
+
+        async def on_message(message):
+            task = asyncio.current_task()
+            tasks.add(task)
+            try:
+                await process_message(channel, message, semaphore)
+            finally:
+                tasks.discard(task)
+
+        consumer_tag = await queue.consume(on_message)
+        log(f"✅ Connected to RabbitMQ at {RABBITMQ_URL.split('@')[-1]} "
+            f"(prefetch {PREFETCH}, in-flight {MAX_IN_FLIGHT}, cpu {CPU_WORKERS}, io {IO_WORKERS})")
+        await stop.wait()
+
+        log(f"🛑 Stopping: waiting for {len(tasks)} in-flight requests...")
+        await queue.cancel(consumer_tag)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await close_http_session()
+        await connection.close()
+
+
+async def main():
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: dừng bằng Ctrl+C (KeyboardInterrupt)
+
+    if PRELOAD:
+        preload()
+    from predict import start_prediction_refresher, REFRESH_TOP_N
+    if REFRESH_TOP_N > 0:
+        start_prediction_refresher()
+    start_exporters()
+    await serve(stop)
+
+
+def run_async_worker():
+    log("🚀 Starting RabbitMQ AI Worker (asyncio)...")
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        log(f"❌ RabbitMQ Error: {e}")
+        sys.exit(1)
+    finally:
+        _cpu_executor.shutdown(wait=False, cancel_futures=True)
+        _io_executor.shutdown(wait=False, cancel_futures=True)
+
+
+if __name__ == '__main__':
+    run_async_worker()
@@ -0,0 +1,258 @@
+"""
+Worker Pool - process master preload thư viện + model một lần rồi fork N worker RabbitMQ (copy-on-write)
+
+- Master import module của mọi command (worker_service.preload), load toàn bộ artifact trong
+  MODELS_DIR (model_artifact.preload_artifacts) và pooled model, rồi gc.freeze() trước khi fork:
+  object đã có trước fork nằm ở generation vĩnh viễn, GC của process con không duyệt (ghi header)
+  chúng nên trang nhớ dùng chung không bị copy chỉ vì một lần gc
+- Master KHÔNG mở kết nối nào (RabbitMQ, SQLite) - mỗi process con tự kết nối sau fork
+- Giám sát: con chết (crash) thì fork lại (chết liên tục ngay sau khi khởi động thì chờ backoff);
+  con tự thoát sau AI_WORKER_MAX_TASKS task (recycle, tránh phình bộ nhớ) và được thay bằng con mới
+- Báo cáo bộ nhớ định kỳ (Linux, /proc/<pid>/smaps_rollup): RSS / PSS / USS của master và từng con;
+  USS của con = bộ nhớ riêng mỗi worker thêm vào
+
+Cấu hình:
+    AI_WORKER_PROCESSES        số process con (mặc định: số CPU)
+    AI_WORKER_MAX_TASKS        recycle con sau N task (0 = không recycle, mặc định 1000)
+    AI_WORKER_MEMORY_REPORT    chu kỳ log bộ nhớ (giây, 0 = tắt, mặc định 300)
+    AI_METRICS_PORT / AI_METRICS_FILE: con thứ i dùng port + i / file.i
+
+Usage:
+    python worker_pool.py [n_processes]
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import traceback
+
+POOL_SIZE = int(os.getenv('AI_WORKER_PROCESSES', os.cpu_count() or 2))
+MAX_TASKS = int(os.getenv('AI_WORKER_MAX_TASKS', 1000))
+MEMORY_REPORT_INTERVAL = int(os.getenv('AI_WORKER_MEMORY_REPORT', 300))
+# Con chết trước khi chạy được ngần này giây -> coi là crash loop, chờ backoff (tăng gấp đôi, tối đa 60s)
+MIN_UPTIME = 10
+RESTART_BACKOFF = 1.0
+MAX_RESTART_BACKOFF = 60.0
+STOP_TIMEOUT = 30
+
+
+# Custom logger to stderr
+def log(*args, **kwargs):
+    print(*args, file=sys.stderr, **kwargs)
+
+
+def process_memory(pid='self'):
+    """
+    Bộ nhớ của một process (MB): rss, pss (chia đều trang dùng chung), uss (trang riêng)
+
+    Returns:
+        dict hoặc None nếu không đọc được (không phải Linux / process đã thoát)
+    """
+    try:
+        with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+            values = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(':') and parts[1].isdigit():
+                    values[parts[0][:-1]] = int(parts[1])  # kB
+    except OSError:
+        return None
+    uss = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return {
+        'rss_mb': round(values.get('Rss', 0) / 1024, 1),
+        'pss_mb': round(values.get('Pss', 0) / 1024, 1),
+        'uss_mb': round(uss / 1024, 1),
+    }
+
+
+def prepare_master(models_dir=None, freeze=True):
+    """
+    Import thư viện + load model một lần trong master, rồi đóng băng heap trước khi fork
+
+    Returns:
+        Số model đã load
+    """
+    # Tắt GC trong lúc preload: tránh lần gc giữa chừng để lại lỗ hổng trong các trang nhớ sẽ dùng chung
+    gc.disable()
+    import worker_service
+    from model_artifact import preload_artifacts, MODELS_DIR
+    from predict import load_pooled_model
+
+    worker_service.preload()
+    models_dir = models_dir or MODELS_DIR
+    loaded = preload_artifacts(models_dir)
+    load_pooled_model(models_dir)
+    gc.collect()
+    if freeze:
+        gc.freeze()
+    gc.enable()
+    return loaded
+
+
+def fork_child(target, *args):
+    """
+    Fork một process con chạy target(*args); con thoát bằng os._exit (không chạy lại cleanup của master)
+
+    Returns:
+        pid của process con
+    """
+    pid = os.fork()
+    if pid:
+        return pid
+
+    code = 0
+    try:
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        target(*args)
+    except SystemExit as e:
+        code = e.code if isinstance(e.code, int) else 1
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def run_child(slot, max_tasks):
+    """Process con: kết nối RabbitMQ và xử lý task tới khi đủ max_tasks"""
+    from worker_service import consume
+    from instrumentation import start_exporters, METRICS_PORT, METRICS_FILE
+
+    def start_background():
+        # Refresher chỉ chạy ở con slot 0 (cache dùng chung, các con khác không cần làm lại)
+        if slot == 0:
+            from predict import start_prediction_refresher, REFRESH_TOP_N
+            if REFRESH_TOP_N > 0:
+                start_prediction_refresher()
+        start_exporters(port=METRICS_PORT + slot if METRICS_PORT else 0,
+                        path=f'{METRICS_FILE}.{slot}' if METRICS_FILE else None)
+
+    handled = consume(max_tasks=max_tasks, on_connected=start_background)
+    log(f"♻️ Worker {slot} (pid {os.getpid()}) recycling after {handled} tasks")
+
+
+class WorkerPool:
+    """Master: fork, giám sát và fork lại các process con"""
+
+    def __init__(self, size=POOL_SIZE, max_tasks=MAX_TASKS, target=run_child):
+        self.size = size
+        self.max_tasks = max_tasks
+        self.target = target
+        self.children = {}  # pid -> (slot, started_at)
+        self.backoff = {}  # slot -> giây chờ trước lần fork tiếp theo
+        self.pending = {}  # slot -> thời điểm được fork lại
+        self.stopping = False
+
+    def spawn(self, slot):
+        pid = fork_child(self.target, slot, self.max_tasks)
+        self.children[pid] = (slot, time.monotonic())
+        log(f"👷 Worker {slot} started (pid {pid})")
+
+    def reap(self):
+        """Thu các con đã thoát, lên lịch fork lại"""
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot, started = self.children.pop(pid)
+            uptime = time.monotonic() - started
+            code = os.waitstatus_to_exitcode(status)
+            if self.stopping:
+                continue
+            delay = 0.0
+            if code != 0:
+                log(f"💥 Worker {slot} (pid {pid}) exited with code {code} after {uptime:.0f}s")
+            if code != 0 and uptime < MIN_UPTIME:
+                delay = self.backoff.get(slot, RESTART_BACKOFF)
+                self.backoff[slot] = min(delay * 2, MAX_RESTART_BACKOFF)
+                log(f"   Restarting worker {slot} in {delay:.0f}s")
+            else:
+                self.backoff.pop(slot, None)
+            self.pending[slot] = time.monotonic() + delay
+
+    def memory_report(self):
+        """Log RSS / PSS / USS của master và từng con"""
+        master = process_memory()
+        if master is None:
+            return None
+        children = {slot: process_memory(pid) for pid, (slot, _) in sorted(self.children.items(), key=lambda c: c[1][0])}
+        children = {slot: memory for slot, memory in children.items() if memory is not None}
+        log(f"🧠 Master: RSS {master['rss_mb']} MB, PSS {master['pss_mb']} MB")
+        for slot, memory in children.items():
+            log(f"   Worker {slot}: RSS {memory['rss_mb']} MB, PSS {memory['pss_mb']} MB, USS {memory['uss_mb']} MB")
+        if children:
+            per_worker = sum(memory['uss_mb'] for memory in children.values()) / len(children)
+            total = master['pss_mb'] + sum(memory['pss_mb'] for memory in children.values())
+            log(f"   ≈ {per_worker:.1f} MB per extra worker (USS), {total:.1f} MB total (PSS)")
+        return {'master': master, 'workers': children}
+
+    def stop(self, *_):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.size):
+            self.spawn(slot)
+
+        next_report = time.monotonic() + min(MEMORY_REPORT_INTERVAL, 30) if MEMORY_REPORT_INTERVAL else None
+        while not self.stopping:
+            self.reap()
+            now = time.monotonic()
+            for slot, due in list(self.pending.items()):
+                if due <= now and not self.stopping:
+                    del self.pending[slot]
+                    self.spawn(slot)
+            if next_report is not None and now >= next_report:
+                self.memory_report()
+                next_report = now + MEMORY_REPORT_INTERVAL
+            time.sleep(0.5)
+        self.shutdown()
+
+    def shutdown(self):
+        log(f"🛑 Stopping {len(self.children)} workers...")
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + STOP_TIMEOUT
+        while self.children and time.monotonic() < deadline:
+            self.reap()
+            time.sleep(0.1)
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self.children.pop(pid)
+
+
+def run_pool(size=POOL_SIZE):
+    if not hasattr(os, 'fork'):
+        # Windows: không có fork -> chạy một worker thường
+        log("⚠ os.fork is not available, running a single worker")
+        from worker_service import run_worker
+        run_worker()
+        return
+
+    log(f"🚀 Starting AI worker pool ({size} processes, recycle after {MAX_TASKS or '∞'} tasks)...")
+    start = time.perf_counter()
+    loaded = prepare_master()
+    memory = process_memory()
+    log(f"📦 Preloaded modules + {loaded} models in {time.perf_counter() - start:.1f}s"
+        + (f" (master RSS {memory['rss_mb']} MB)" if memory else ''))
+    WorkerPool(size).run()
+
+
+if __name__ == '__main__':
+    run_pool(int(sys.argv[1]) if len(sys.argv) > 1 else POOL_SIZE)
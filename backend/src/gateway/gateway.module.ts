@@ -1,8 +1,9 @@
 import { Module } from '@nestjs/common';
 import { TradingGateway } from './trading.gateway';
+import { MarketSnapshotConsumer } from './market-snapshot.consumer';
 
 @Module({
-  providers: [TradingGateway],
+  providers: [TradingGateway, MarketSnapshotConsumer],
   exports: [TradingGateway],
 })
 export class GatewayModule {}
@@ -31,4 +31,9 @@ export class TradingGateway
   broadcastSignal(signal: any) {
     this.server.emit('trading_signal', signal);
   }
+
+  // Live bars are superseded every second, so slow clients may drop them
+  broadcastMarketSnapshot(snapshot: unknown) {
+    this.server.volatile.emit('market_snapshot', snapshot);
+  }
 }
@@ -0,0 +1,54 @@
+import {
+  Injectable,
+  Inject,
+  InternalServerErrorException,
+} from '@nestjs/common';
+import { IPredictionQueue } from '../../domain/services/prediction-queue.interface';
+
+export interface BatchSignal {
+  symbol: string;
+  strategy: string;
+  type: string;
+  confidence: number;
+  price: number;
+  target_price: number;
+}
+
+export interface SignalsBatchResult {
+  signals: BatchSignal[];
+  evaluated: number;
+  errors: Record<string, string>;
+  elapsed_ms: number;
+  error?: string;
+}
+
+@Injectable()
+export class GetSignalsBatchUseCase {
+  constructor(
+    @Inject(IPredictionQueue)
+    private readonly predictionQueue: IPredictionQueue,
+  ) {}
+
+  async execute(symbols: string[]): Promise<SignalsBatchResult> {
+    try {
+      const result = (await this.predictionQueue.dispatchSignalsBatch(
+        symbols,
+      )) as SignalsBatchResult;
+
+      if (!result || result.error || !Array.isArray(result.signals)) {
+        throw new InternalServerErrorException(
+          result?.error || 'Invalid signals_batch response from AI service',
+        );
+      }
+
+      return result;
+    } catch (error: unknown) {
+      if (error instanceof InternalServerErrorException) throw error;
+      throw new InternalServerErrorException(
+        error instanceof Error
+          ? error.message
+          : 'Error communicating with AI Queue for batch signals',
+      );
+    }
+  }
+}
@@ -4,6 +4,7 @@ export interface IPredictionQueue {
   dispatchPredictionJob(symbol: string): Promise<PredictionResult>;
   dispatchBacktestJob(symbol: string, days?: number): Promise<any>;
   getSentiment(symbol: string): Promise<any>;
+  dispatchSignalsBatch(symbols: string[]): Promise<any>;
 }
 
 export const IPredictionQueue = Symbol('IPredictionQueue');
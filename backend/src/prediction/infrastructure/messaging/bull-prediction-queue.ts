@@ -28,4 +28,11 @@ export class BullPredictionQueue implements IPredictionQueue {
       error: 'Sentiment analysis not yet implemented for Bull queue',
     });
   }
+
+  // eslint-disable-next-line @typescript-eslint/no-unused-vars
+  dispatchSignalsBatch(_symbols: string[]): Promise<unknown> {
+    return Promise.resolve({
+      error: 'Batch signals not yet implemented for Bull queue',
+    });
+  }
 }
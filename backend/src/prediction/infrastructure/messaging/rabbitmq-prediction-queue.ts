@@ -1,9 +1,12 @@
 import { Injectable, Inject, Logger } from '@nestjs/common';
 import { ClientProxy } from '@nestjs/microservices';
-import { firstValueFrom } from 'rxjs';
+import { firstValueFrom, timeout } from 'rxjs';
 import { IPredictionQueue } from '../../domain/services/prediction-queue.interface';
 import { PredictionResult } from '../../domain/entities/prediction.entity';
 
+// The signal cron runs every 30s; a batch older than one cycle is stale
+const SIGNALS_BATCH_TIMEOUT_MS = 30000;
+
 @Injectable()
 export class RabbitMqPredictionQueue implements IPredictionQueue {
   private readonly logger = new Logger(RabbitMqPredictionQueue.name);
@@ -66,4 +69,29 @@ export class RabbitMqPredictionQueue implements IPredictionQueue {
       throw error;
     }
   }
+
+  async dispatchSignalsBatch(symbols: string[]): Promise<unknown> {
+    this.logger.log(
+      `Dispatching batch signals job for ${symbols.length} symbols via RabbitMQ`,
+    );
+
+    try {
+      // One request for the whole watch list; the worker evaluates all strategies at once
+      const result = await firstValueFrom<unknown>(
+        this.client
+          .send(
+            { cmd: 'signals_batch' },
+            { symbols, timeout_ms: SIGNALS_BATCH_TIMEOUT_MS },
+          )
+          .pipe(timeout(SIGNALS_BATCH_TIMEOUT_MS)),
+      );
+
+      return result;
+    } catch (error: unknown) {
+      this.logger.error(
+        `Failed to get batch signals: ${error instanceof Error ? error.message : String(error)}`,
+      );
+      throw error;
+    }
+  }
 }
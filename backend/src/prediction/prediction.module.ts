@@ -10,6 +10,7 @@ import { IPredictionQueue } from './domain/services/prediction-queue.interface';
 import { RabbitMqPredictionQueue } from './infrastructure/messaging/rabbitmq-prediction-queue';
 import { GetPredictionUseCase } from './application/use-cases/get-prediction.use-case';
 import { RunBacktestUseCase } from './application/use-cases/run-backtest.use-case';
+import { GetSignalsBatchUseCase } from './application/use-cases/get-signals-batch.use-case';
 
 @Module({
   imports: [QueueModule, PrismaModule, RabbitMqModule],
@@ -18,6 +19,7 @@ import { RunBacktestUseCase } from './application/use-cases/run-backtest.use-cas
     PredictionService,
     GetPredictionUseCase,
     RunBacktestUseCase,
+    GetSignalsBatchUseCase,
     {
       provide: IPredictionRepository,
       useClass: PrismaPredictionRepository,
@@ -27,6 +29,11 @@ import { RunBacktestUseCase } from './application/use-cases/run-backtest.use-cas
       useClass: RabbitMqPredictionQueue,
     },
   ],
-  exports: [PredictionService, GetPredictionUseCase, RunBacktestUseCase],
+  exports: [
+    PredictionService,
+    GetPredictionUseCase,
+    RunBacktestUseCase,
+    GetSignalsBatchUseCase,
+  ],
 })
 export class PredictionModule {}
@@ -3,6 +3,7 @@ import { GenerateSignalsUseCase } from './generate-signals.use-case';
 import { ISignalRepository } from '../../domain/repositories/signal.repository.interface';
 import { IBroadcastService } from '../../domain/services/broadcast.service.interface';
 import { GetPredictionUseCase } from '../../../prediction/application/use-cases/get-prediction.use-case';
+import { GetSignalsBatchUseCase } from '../../../prediction/application/use-cases/get-signals-batch.use-case';
 
 describe('GenerateSignalsUseCase', () => {
   let useCase: GenerateSignalsUseCase;
@@ -22,13 +23,22 @@ describe('GenerateSignalsUseCase', () => {
     execute: jest.fn(),
   };
 
+  const mockGetSignalsBatchUseCase = {
+    execute: jest.fn(),
+  };
+
   beforeEach(async () => {
+    jest.clearAllMocks();
     const module: TestingModule = await Test.createTestingModule({
       providers: [
         GenerateSignalsUseCase,
         { provide: ISignalRepository, useValue: mockSignalRepository },
         { provide: IBroadcastService, useValue: mockBroadcastService },
         { provide: GetPredictionUseCase, useValue: mockGetPredictionUseCase },
+        {
+          provide: GetSignalsBatchUseCase,
+          useValue: mockGetSignalsBatchUseCase,
+        },
       ],
     }).compile();
 
@@ -65,4 +75,52 @@ describe('GenerateSignalsUseCase', () => {
     const result = useCase.checkMaCrossover('VCB', 100, indicators);
     expect(result.type).toBe('BUY');
   });
+
+  it('should save and broadcast every signal from a single signals_batch call', async () => {
+    mockGetSignalsBatchUseCase.execute.mockResolvedValue({
+      signals: [
+        {
+          symbol: 'VCB',
+          strategy: 'VN_EXTREME_RSI',
+          type: 'BUY',
+          confidence: 70,
+          price: 100,
+          target_price: 107,
+        },
+      ],
+      evaluated: 5,
+      errors: {},
+      elapsed_ms: 1,
+    });
+    mockSignalRepository.save.mockImplementation((data: object) =>
+      Promise.resolve({ id: 1, ...data }),
+    );
+
+    await useCase.execute();
+
+    expect(mockGetSignalsBatchUseCase.execute).toHaveBeenCalledTimes(1);
+    expect(mockGetPredictionUseCase.execute).not.toHaveBeenCalled();
+    expect(mockSignalRepository.save).toHaveBeenCalledWith(
+      expect.objectContaining({
+        symbol: 'VCB',
+        strategy: 'VN_EXTREME_RSI',
+        priceAtTime: 100,
+        targetPrice: 107,
+        confidence: 70,
+      }),
+    );
+    expect(mockBroadcastService.broadcastSignal).toHaveBeenCalledTimes(1);
+  });
+
+  it('should fall back to per-symbol predictions when signals_batch fails', async () => {
+    mockGetSignalsBatchUseCase.execute.mockRejectedValue(
+      new Error('Unknown command: signals_batch'),
+    );
+    mockGetPredictionUseCase.execute.mockResolvedValue(null);
+
+    await useCase.execute();
+
+    expect(mockGetPredictionUseCase.execute).toHaveBeenCalledTimes(5);
+    expect(mockSignalRepository.save).not.toHaveBeenCalled();
+  });
 });
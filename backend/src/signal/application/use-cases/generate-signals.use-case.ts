@@ -7,6 +7,10 @@ import {
   SignalStatus,
 } from '../../domain/entities/signal.entity';
 import { GetPredictionUseCase } from '../../../prediction/application/use-cases/get-prediction.use-case';
+import {
+  GetSignalsBatchUseCase,
+  SignalsBatchResult,
+} from '../../../prediction/application/use-cases/get-signals-batch.use-case';
 
 interface StrategyResult {
   strategy: string;
@@ -26,11 +30,70 @@ export class GenerateSignalsUseCase {
     @Inject(IBroadcastService)
     private readonly broadcastService: IBroadcastService,
     private readonly getPredictionUseCase: GetPredictionUseCase,
+    private readonly getSignalsBatchUseCase: GetSignalsBatchUseCase,
   ) {}
 
   async execute() {
     this.logger.log('🚀 Generating multi-strategy signals...');
 
+    // One signals_batch call evaluates every strategy for the whole watch list
+    let batch: SignalsBatchResult;
+    try {
+      batch = await this.getSignalsBatchUseCase.execute(this.watchList);
+    } catch (error: unknown) {
+      this.logger.warn(
+        `Batch signals unavailable, falling back to per-symbol checks: ${error instanceof Error ? error.message : String(error)}`,
+      );
+      await this.generatePerSymbol();
+      return;
+    }
+
+    for (const signal of batch.signals) {
+      try {
+        await this.emitSignal(
+          signal.symbol,
+          signal.strategy,
+          signal.type,
+          signal.confidence,
+          signal.price,
+          signal.target_price,
+        );
+      } catch (error: unknown) {
+        this.logger.error(
+          `Error saving signal for ${signal.symbol}: ${error instanceof Error ? error.message : String(error)}`,
+        );
+      }
+    }
+  }
+
+  private async emitSignal(
+    symbol: string,
+    strategy: string,
+    type: string,
+    confidence: number,
+    price: number,
+    targetPrice: number,
+  ) {
+    const signalData: Partial<Signal> = {
+      symbol,
+      type: type as SignalType,
+      strategy,
+      priceAtTime: price,
+      targetPrice,
+      confidence,
+      status: SignalStatus.ACTIVE,
+    };
+
+    const newSignal = await this.signalRepository.save(signalData);
+
+    this.broadcastService.broadcastSignal({
+      ...newSignal,
+      message: `[${strategy}] 🔥 ${type} ${symbol} @ ${price}`,
+    } as Signal & { message: string });
+  }
+
+  // Fallback for AI workers without the signals_batch command
+  private async generatePerSymbol() {
     for (const symbol of this.watchList) {
       try {
         const data = await this.getPredictionUseCase.execute(symbol);
@@ -61,22 +124,14 @@ export class GenerateSignalsUseCase {
 
         for (const strategyResult of strategies) {
           if (strategyResult && strategyResult.type !== 'HOLD') {
-            const signalData: Partial<Signal> = {
+            await this.emitSignal(
               symbol,
-              type: strategyResult.type as SignalType,
-              strategy: strategyResult.strategy,
-              priceAtTime: priceNum,
-              targetPrice: strategyResult.target || predNum,
-              confidence: strategyResult.confidence,
-              status: SignalStatus.ACTIVE,
-            };
-
-            const newSignal = await this.signalRepository.save(signalData);
-
-            this.broadcastService.broadcastSignal({
-              ...newSignal,
-              message: `[${strategyResult.strategy}] 🔥 ${strategyResult.type} ${symbol} @ ${priceNum}`,
-            } as Signal & { message: string });
+              strategyResult.strategy,
+              strategyResult.type,
+              strategyResult.confidence,
+              priceNum,
+              strategyResult.target || predNum,
+            );
           }
         }
       } catch (error: unknown) {
@@ -39,6 +39,23 @@ describe('SignalService', () => {
     expect(mockGenerateSignalsUseCase.execute).toHaveBeenCalled();
   });
 
+  it('generateSignals should skip while a previous run is still in progress', async () => {
+    let finish: () => void = () => undefined;
+    mockGenerateSignalsUseCase.execute.mockClear();
+    mockGenerateSignalsUseCase.execute.mockReturnValueOnce(
+      new Promise<void>((resolve) => (finish = resolve)),
+    );
+
+    const first = service.generateSignals();
+    await service.generateSignals();
+    expect(mockGenerateSignalsUseCase.execute).toHaveBeenCalledTimes(1);
+
+    finish();
+    await first;
+    await service.generateSignals();
+    expect(mockGenerateSignalsUseCase.execute).toHaveBeenCalledTimes(2);
+  });
+
   it('validateSignalAccuracy should call EvaluateSignalAccuracyUseCase', async () => {
     await service.validateSignalAccuracy();
     expect(mockEvaluateSignalAccuracyUseCase.execute).toHaveBeenCalled();
@@ -7,6 +7,7 @@ import { GetSignalStatsUseCase } from './application/use-cases/get-signal-stats.
 @Injectable()
 export class SignalService {
   private readonly logger = new Logger(SignalService.name);
+  private generatingSignals = false;
 
   constructor(
     private readonly generateSignalsUseCase: GenerateSignalsUseCase,
@@ -16,7 +17,17 @@ export class SignalService {
 
   @Cron('*/30 * * * * *')
   async generateSignals() {
-    await this.generateSignalsUseCase.execute();
+    // Skip this tick if the previous run has not finished yet
+    if (this.generatingSignals) {
+      this.logger.warn('Previous signal generation still running, skipping');
+      return;
+    }
+    this.generatingSignals = true;
+    try {
+      await this.generateSignalsUseCase.execute();
+    } finally {
+      this.generatingSignals = false;
+    }
   }
 
   @Cron('0 */5 * * * *')
@@ -17,6 +17,10 @@ def main():
         return
 
     symbol = sys.argv[1].upper()
+    # --timings: thêm thời gian từng stage (ms) vào JSON trả về
+    with_timings = '--timings' in sys.argv[2:]
+    # --profile: ghi cProfile + snapshot tracemalloc của request này (AI_PROFILE_DIR)
+    with_profile = '--profile' in sys.argv[2:]
     
     # Save original stdout fd to restore it later
     original_stdout_fd = os.dup(sys.stdout.fileno())
@@ -25,12 +29,19 @@ def main():
         # Redirect stdout (fd 1) to stderr (fd 2) for ALL low-level output
         os.dup2(sys.stderr.fileno(), 1)
         
-        if symbol == 'MARKET':
-            from ai.predict import get_market_overview
-            result = get_market_overview()
-        else:
-            from ai.predict import get_prediction_data
-            result = get_prediction_data(symbol)
+        from profiling import profile_request, should_profile
+        label = 'market' if symbol == 'MARKET' else 'predict'
+        with profile_request(f"cli-{symbol}-{os.getpid()}", label, enabled=should_profile(with_profile)):
+            if symbol == 'MARKET':
+                from ai.predict import get_market_overview
+                result = get_market_overview()
+            else:
+                from ai.predict import get_prediction_data
+                from instrumentation import collect_timings
+                with collect_timings(enabled=with_timings) as timings:
+                    result = get_prediction_data(symbol)
+                if with_timings:
+                    result = {**result, 'timings': timings}
             
         # Restore original stdout to print the final JSON
         os.dup2(original_stdout_fd, 1)